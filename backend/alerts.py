@@ -0,0 +1,154 @@
+"""
+Alert rules and the persisted `alerts` table.
+
+Rules run once per assistant facts rebuild (i.e. once per forecast
+refresh / billing batch), not per GET. Every alert has a dedup_key
+(type, forecast date, food), so re-evaluating the same situation updates
+the existing row instead of adding a new one; open alerts the rules no
+longer produce are marked resolved. /alerts is then a plain indexed read.
+"""
+from database import bump_version
+
+
+SEVERITY_RANK = {"danger": 0, "warning": 1, "info": 2}
+SEVERITY_ORDER = "CASE severity " + " ".join(
+    f"WHEN '{s}' THEN {rank}" for s, rank in SEVERITY_RANK.items()
+) + f" ELSE {len(SEVERITY_RANK)} END"
+ALERT_COLUMNS = """
+    id, type, severity, title, message, food_name, forecast_date,
+    created_at, updated_at, read_at, acked_at, resolved_at
+"""
+
+
+def alert_rules(facts):
+    """Alerts for the current facts snapshot, each with a dedup_key."""
+    insights = facts["insights"]
+    waste = facts["waste"]
+    day = facts["forecast_date"]
+
+    alerts_list = [{
+        "dedup_key": f"cost:{day}",
+        "type": "cost",
+        "severity": "danger" if waste.get("estimated_waste_cost", 0) > 200 else "info",
+        "title": "Estimated Waste Cost Risk",
+        "message": f"Potential loss: ₹{waste.get('estimated_waste_cost', 0)}",
+        "food_name": None,
+    }]
+
+    for item in insights.get("waste_risk", [])[:5]:
+        alerts_list.append({
+            "dedup_key": f"waste:{day}:{item['food_name']}",
+            "type": "waste",
+            "severity": "warning",
+            "title": item["title"],
+            "message": item["message"],
+            "food_name": item["food_name"],
+        })
+
+    for item in insights.get("high_demand", [])[:5]:
+        alerts_list.append({
+            "dedup_key": f"demand:{day}:{item['food_name']}",
+            "type": "demand",
+            "severity": "info",
+            "title": item["title"],
+            "message": item["message"],
+            "food_name": item["food_name"],
+        })
+
+    for a in alerts_list:
+        a["forecast_date"] = day
+    return alerts_list
+
+
+def sync_alerts(conn, alerts_list):
+    """
+    Upserts alerts_list and resolves every other open alert, in one
+    transaction. Unchanged alerts are not rewritten; a severity change
+    makes an alert unread again. Returns {"open", "resolved", "changed"}.
+    """
+    before = conn.total_changes
+    conn.executemany("""
+        INSERT INTO alerts (dedup_key, type, severity, title, message, food_name, forecast_date, updated_at)
+        VALUES (:dedup_key, :type, :severity, :title, :message, :food_name, :forecast_date, CURRENT_TIMESTAMP)
+        ON CONFLICT(dedup_key) DO UPDATE SET
+            read_at = CASE WHEN excluded.severity != alerts.severity THEN NULL ELSE alerts.read_at END,
+            severity = excluded.severity,
+            title = excluded.title,
+            message = excluded.message,
+            resolved_at = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE alerts.resolved_at IS NOT NULL
+           OR alerts.severity != excluded.severity
+           OR alerts.title != excluded.title
+           OR alerts.message != excluded.message
+    """, alerts_list)
+
+    keys = [a["dedup_key"] for a in alerts_list]
+    resolved = conn.execute(f"""
+        UPDATE alerts SET resolved_at = CURRENT_TIMESTAMP
+        WHERE resolved_at IS NULL
+          AND dedup_key NOT IN ({", ".join("?" * len(keys))})
+    """, keys).rowcount
+
+    changed = conn.total_changes - before
+    if changed:
+        bump_version(conn, "alerts")
+    conn.commit()
+    return {"open": len(keys), "resolved": resolved, "changed": changed}
+
+
+def _row(r):
+    a = dict(r)
+    a["read"] = a["read_at"] is not None
+    a["acked"] = a["acked_at"] is not None
+    return a
+
+
+def open_alerts(conn, limit=50, unread_only=False):
+    """Open alerts, most severe first (then newest)."""
+    rows = conn.execute(f"""
+        SELECT {ALERT_COLUMNS}
+        FROM alerts
+        WHERE resolved_at IS NULL {"AND read_at IS NULL" if unread_only else ""}
+        ORDER BY {SEVERITY_ORDER}, id DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
+    return [_row(r) for r in rows]
+
+
+def unread_counts(conn):
+    """{"unread": n, "by_severity": {severity: n}} for open alerts."""
+    rows = conn.execute("""
+        SELECT severity, COUNT(*) as n
+        FROM alerts
+        WHERE resolved_at IS NULL AND read_at IS NULL
+        GROUP BY severity
+    """).fetchall()
+    by_severity = {r["severity"]: r["n"] for r in rows}
+    return {"unread": sum(by_severity.values()), "by_severity": by_severity}
+
+
+def mark_alerts(conn, action, ids=None):
+    """
+    action "read" or "ack" (ack also marks read) on the given alerts, or
+    on every open alert when ids is None. Returns the number changed.
+    """
+    sets = {
+        "read": "read_at = CURRENT_TIMESTAMP",
+        "ack": "acked_at = CURRENT_TIMESTAMP, read_at = IFNULL(read_at, CURRENT_TIMESTAMP)",
+    }[action]
+    column = "read_at" if action == "read" else "acked_at"
+
+    sql = f"UPDATE alerts SET {sets} WHERE {column} IS NULL"
+    params = []
+    if ids is None:
+        sql += " AND resolved_at IS NULL"
+    else:
+        sql += f" AND id IN ({', '.join('?' * len(ids))})"
+        params = list(ids)
+
+    changed = conn.execute(sql, params).rowcount
+    if changed:
+        bump_version(conn, "alerts")
+    conn.commit()
+    return changed
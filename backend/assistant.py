@@ -0,0 +1,303 @@
+"""
+AI assistant (/ai/chat) helpers: the Gemini client and the reply cache.
+
+The Gemini call runs on a small dedicated thread pool over one pooled
+HTTP session, so a request thread only waits up to AI_CHAT_WAIT seconds
+for it. If the model is slower than that the request answers "pending"
+and the call keeps running; its reply lands in the cache, so asking the
+same question again returns it. Replies are cached per (question,
+language, data version), and identical questions asked at the same time
+share one upstream call.
+
+Point GEMINI_API_URL at a local server (see benchmarks/gemini_stub.py)
+to run the whole path without a real API key.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from forecast_cache import ResultCache
+from metrics import inc
+
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+GEMINI_MODEL = "gemini-1.5-flash"
+
+CHAT_CACHE_SIZE = int(os.getenv("AI_CHAT_CACHE_SIZE", "512"))
+CHAT_CACHE_TTL = int(os.getenv("AI_CHAT_CACHE_TTL", "3600"))
+FACTS_CHECK_SECONDS = float(os.getenv("AI_FACTS_CHECK_SECONDS", "5"))
+
+HELP_REPLY = (
+    "✅ I can answer based on dashboard + billing + forecast data.\n"
+    "Try: 'top items', 'waste risk', 'increase tomorrow', 'today revenue'."
+)
+PENDING_REPLY = "⏳ Still thinking about that one. Ask again in a few seconds."
+
+
+def normalize_question(message):
+    return " ".join(message.lower().split())
+
+
+def build_prompt(language, facts, message):
+    return f"""
+You are an AI assistant for a Food Waste Reduction system.
+
+Answer in {language}.
+
+TODAY STATS:
+Revenue: ₹{facts["today"]["revenue"]:.2f}
+Total quantity sold: {facts["today"]["qty"]}
+
+TOP SELLING FOODS (Last 7 days):
+{facts["top_7d"]}
+
+TOMORROW FORECAST:
+{facts["forecasts"][:8]}
+
+Now answer the user query in a short clear way.
+
+User: {message}"""
+
+
+# ======================================
+# ✅ Assistant facts snapshot
+# ======================================
+def sales_facts(conn):
+    """Today's totals and top sellers, all from the daily_sales rollup."""
+    today = conn.execute("""
+        SELECT 
+            IFNULL(SUM(revenue), 0) as revenue,
+            IFNULL(SUM(qty), 0) as qty
+        FROM daily_sales
+        WHERE day = DATE('now')
+    """).fetchone()
+
+    def top(days):
+        return [dict(r) for r in conn.execute("""
+            SELECT food_name, SUM(qty) as qty
+            FROM daily_sales
+            WHERE day >= DATE('now', ?)
+            GROUP BY food_name
+            ORDER BY qty DESC
+            LIMIT 5
+        """, (f"-{days} day",)).fetchall()]
+
+    return {
+        "today": {"revenue": float(today["revenue"]), "qty": int(today["qty"])},
+        "top_7d": top(7),
+        "top_30d": top(30),
+    }
+
+
+class AssistantFacts:
+    """
+    Materialized answers for the assistant's local intents, also served by
+    /smart-insights, /waste-cost and /alerts.
+
+    Readers get the last built snapshot straight from memory. It is rebuilt
+    on a background thread when its version key changes: right away after
+    mark_stale() (called by the write endpoints), and otherwise checked
+    every FACTS_CHECK_SECONDS so writes from other processes show up too.
+    Only the very first get() waits for a build.
+
+    build_fn(key) -> facts dict, version_fn() -> key (cheap, one query).
+    Each fn in `listeners` gets every newly built snapshot.
+    """
+
+    def __init__(self, build_fn, version_fn, check_every=FACTS_CHECK_SECONDS):
+        self.build_fn = build_fn
+        self.version_fn = version_fn
+        self.check_every = check_every
+        self._facts = None
+        self._checked_at = 0.0
+        self._stale = False
+        self._refreshing = False
+        self._lock = threading.Lock()   # one build at a time
+        self._state_lock = threading.Lock()   # _refreshing hand-over
+        self.listeners = []
+        self.stats = {"reads": 0, "builds": 0}
+
+    def get(self):
+        facts = self._facts
+        if facts is None:
+            return self.refresh()
+        self.stats["reads"] += 1
+        if self._stale or time.monotonic() - self._checked_at > self.check_every:
+            self.refresh_async()
+        return facts
+
+    def mark_stale(self):
+        self._stale = True
+        self.refresh_async()
+
+    def refresh(self):
+        with self._lock:
+            self._stale = False   # a write landing during the build marks it again
+            key = self.version_fn()
+            if self._facts is None or self._facts["version"] != key:
+                facts = self.build_fn(key)
+                facts["version"] = key
+                facts["built_at"] = time.time()
+                self._facts = facts
+                self.stats["builds"] += 1
+                for fn in self.listeners:
+                    try:
+                        fn(facts)
+                    except Exception as e:
+                        print("⚠️ assistant facts listener failed:", e)
+            self._checked_at = time.monotonic()
+            return self._facts
+
+    def refresh_async(self):
+        with self._state_lock:
+            if self._refreshing:
+                return   # the running build re-checks _stale when it ends
+            self._refreshing = True
+
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print("⚠️ assistant facts refresh failed:", e)
+                # writes marked stale during the build get one more build
+                with self._state_lock:
+                    if not self._stale:
+                        self._refreshing = False
+                        return
+
+        threading.Thread(target=run, name="assistant-facts", daemon=True).start()
+
+
+def local_reply(message, facts):
+    """Keyword intents answered from the facts snapshot, or None."""
+    msg = message.lower()
+
+    if "increase" in msg or "tomorrow" in msg:
+        increase = facts["increase"]
+        return f"✅ Items to increase tomorrow: {', '.join(increase) if increase else 'No high demand items detected'}"
+
+    if "waste" in msg or "risk" in msg:
+        risk = facts["waste_risk"]
+        return f"⚠️ Waste risk items: {', '.join(risk) if risk else 'No waste risk items detected'}"
+
+    if "revenue" in msg or "sales" in msg:
+        today = facts["today"]
+        return f"📌 Today's Revenue: ₹{today['revenue']:.2f}, Total Qty Sold: {today['qty']}"
+
+    if "top" in msg:
+        if "month" in msg or "30" in msg:
+            top = [f"{x['food_name']} ({x['qty']})" for x in facts["top_30d"]]
+            return "🔥 Top selling foods (last 30 days): " + (", ".join(top) if top else "No data")
+        top = [f"{x['food_name']} ({x['qty']})" for x in facts["top_7d"]]
+        return "🔥 Top selling foods (last 7 days): " + (", ".join(top) if top else "No data")
+
+    return None
+
+
+# ======================================
+# ✅ Gemini client (pooled session + I/O pool)
+# ======================================
+def _reply_text(out):
+    return (
+        out.get("candidates", [{}])[0]
+        .get("content", {})
+        .get("parts", [{}])[0]
+        .get("text", "")
+    )
+
+
+class GeminiClient:
+    def __init__(self, api_key, url=None, model=None, timeout=None, workers=None):
+        self.api_key = api_key
+        self.url = (url or os.getenv("GEMINI_API_URL") or GEMINI_API_URL).format(
+            model=model or os.getenv("GEMINI_MODEL") or GEMINI_MODEL
+        )
+        self.timeout = float(timeout or os.getenv("GEMINI_TIMEOUT", "20"))
+        workers = int(workers or os.getenv("AI_LLM_WORKERS", "4"))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini")
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def generate(self, prompt):
+        """Blocking call, returns the reply text or "" on any failure."""
+        try:
+            r = self.session.post(
+                self.url,
+                params={"key": self.api_key},
+                json={"contents": [{"parts": [{"text": prompt}]}]},
+                timeout=self.timeout,
+            )
+            return _reply_text(r.json())
+        except Exception as e:
+            print("⚠️ Gemini call failed:", type(e).__name__)   # message would include the key
+            return ""
+
+    def submit(self, prompt):
+        return self.executor.submit(self.generate, prompt)
+
+
+# ======================================
+# ✅ Reply cache + in-flight calls
+# ======================================
+class ChatReplies:
+    def __init__(self, client, maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL):
+        self.client = client
+        self.cache = ResultCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = {}   # key -> Future on the client's pool
+        self._lock = threading.RLock()   # done callbacks can run inside ask()
+
+    @staticmethod
+    def key(question, language, version):
+        raw = repr((normalize_question(question), language.strip().lower(), version))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def ask(self, key, build_prompt_fn, wait):
+        """
+        Returns (reply, source): source is "cache", "llm" or "pending"
+        (reply None) when the call is still running after `wait` seconds.
+        build_prompt_fn is only called when a new upstream call is needed.
+        """
+        reply = self.cache.get(key)
+        if reply is not None:
+            inc("ai_chat_replies_total", source="cache")
+            return reply, "cache"
+
+        with self._lock:
+            fut = self._inflight.get(key)
+        if fut is None:
+            prompt = build_prompt_fn()   # may train a forecast, keep it outside the lock
+            with self._lock:
+                fut = self._inflight.get(key)
+                if fut is None:
+                    fut = self.client.submit(prompt)
+                    self._inflight[key] = fut
+                    fut.add_done_callback(lambda f, k=key: self._done(k, f))
+
+        try:
+            reply = fut.result(timeout=wait)
+        except FutureTimeout:
+            inc("ai_chat_replies_total", source="pending")
+            return None, "pending"
+
+        inc("ai_chat_replies_total", source="llm" if reply else "llm_error")
+        return reply, "llm"
+
+    def _done(self, key, fut):
+        reply = None if fut.cancelled() or fut.exception() else fut.result()
+        with self._lock:
+            self._inflight.pop(key, None)
+            if reply:
+                self.cache.put(key, reply)
@@ -0,0 +1,345 @@
+"""
+Rolling-origin backtest for the forecasting engine.
+
+For each cut-off day the models are trained only on the sales up to and
+including that day (same 60-day window /forecast uses), then predict the
+next `horizon` days, which are compared with what was actually sold.
+Every fold trains from scratch in a throwaway model registry, so timings
+are real and the app's model store is never touched.
+
+    cd backend
+    python -m backtest                         # app database
+    python -m backtest --synthetic --items 200 --days 180 --folds 14
+    python -m backtest --models per_item naive_last --json out.json
+    python -m backtest --profile fast
+    python -m backtest --select                # store the per-item forecaster choice
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from forecasting import (
+    forecast_days_from_sales, load_event_map, FORECAST_MODES, TRAINING_PROFILES
+)
+from forecasters import SalesMatrix, STAT_FORECASTERS, default_methods, save_selection
+from model_registry import ModelRegistry
+
+
+BASELINES = ("naive_last", "mean7", "seasonal_naive") + tuple(STAT_FORECASTERS)
+BACKTEST_MODELS = FORECAST_MODES + BASELINES
+TRAIN_DAYS = 60
+
+# LightGBM has to beat the statistical method's MAE by this share to be
+# picked for an item (it costs a model fit per refresh)
+SELECT_MARGIN = 0.05
+SELECT_FOLDS = 14
+
+
+# ======================================
+# ✅ Baselines
+# ======================================
+def _daily_matrix(train, cutoff):
+    """items x days qty matrix up to cutoff, missing days = 0"""
+    days = pd.date_range(train["day"].min(), cutoff, freq="D")
+    return (
+        train.pivot_table(index="food_name", columns="day", values="qty", aggfunc="sum", fill_value=0)
+        .reindex(columns=days, fill_value=0)
+        .sort_index()
+    )
+
+
+def baseline_forecasts(name, train, cutoff, dates):
+    """{food: [prediction per date]} for one of BASELINES."""
+    if name in STAT_FORECASTERS:
+        m = SalesMatrix(train, end=cutoff)
+        preds = STAT_FORECASTERS[name](m, dates)
+        return {f: [float(p) for p in preds[i]] for i, f in enumerate(m.foods)}
+
+    m = _daily_matrix(train, cutoff)
+    values = m.to_numpy(dtype=np.float64)
+    out = {}
+
+    for i, food_name in enumerate(m.index):
+        series = values[i]
+        if name == "naive_last":
+            preds = [series[-1]] * len(dates)
+        elif name == "mean7":
+            preds = [float(series[-7:].mean())] * len(dates)
+        else:
+            # same weekday, last week (two weeks back for steps 8..14)
+            preds = []
+            for h in range(1, len(dates) + 1):
+                back = 7 * ((h + 6) // 7) - h   # days before the cutoff
+                preds.append(series[-1 - back] if back < len(series) else 0.0)
+        out[food_name] = [float(p) for p in preds]
+
+    return out
+
+
+# ======================================
+# ✅ Metrics
+# ======================================
+def error_metrics(pred, actual):
+    pred = np.asarray(pred, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    err = np.abs(pred - actual)
+    nz = actual > 0
+    return {
+        "mae": round(float(err.mean()), 3) if len(err) else 0.0,
+        "mape": round(float((err[nz] / actual[nz]).mean() * 100), 2) if nz.any() else 0.0,
+        "wape": round(float(err.sum() / actual.sum() * 100), 2) if actual.sum() > 0 else 0.0,
+        "n": int(len(err)),
+    }
+
+
+# ======================================
+# ✅ Backtest
+# ======================================
+def _model_forecasts(mode, train, events_map, dates, workers, profile=None):
+    """
+    Trains mode as of the cut-off. Returns ({food: [pred per date]},
+    fit_s, predict_s): the second pass over the same registry only loads
+    cached models, so its time is the inference cost and the difference
+    is the training cost.
+    """
+    store = tempfile.mkdtemp(prefix="backtest_")
+    try:
+        registry = ModelRegistry(store)
+
+        t0 = time.perf_counter()
+        forecast_days_from_sales(train, events_map, dates, mode, workers, registry=registry, profile=profile,
+                                 engine="lgbm")
+        total = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        days = forecast_days_from_sales(train, events_map, dates, mode, workers, registry=registry,
+                                        profile=profile, engine="lgbm")
+        predict_s = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(store, ignore_errors=True)
+
+    out = {}
+    for day in days:
+        for f in day:
+            out.setdefault(f["food_name"], []).append(f["predicted_qty"])
+    return out, max(0.0, total - predict_s), predict_s
+
+
+def run_backtest(df, events_map, folds=7, horizon=1, models=BACKTEST_MODELS,
+                 train_days=TRAIN_DAYS, step=1, workers=None, profile=None):
+    """
+    df: daily sales (food_name, day datetime64, qty).
+    profile: training profile for the LightGBM models (default
+    FORECAST_PROFILE).
+    Cut-offs are the last `folds` origins (every `step` days) that still
+    leave `horizon` days of actuals after them.
+
+    Returns {"cutoffs", "horizon", "train_days", "models": [summary per
+    model], "items": {model: [per-item metrics, worst WAPE first]}}.
+    """
+    unknown = [m for m in models if m not in BACKTEST_MODELS]
+    if unknown:
+        raise ValueError(f"unknown models: {unknown}, expected {BACKTEST_MODELS}")
+
+    df = df.copy()
+    df["day"] = pd.to_datetime(df["day"]).dt.normalize()
+    last_day = df["day"].max()
+    cutoffs = [
+        last_day - pd.Timedelta(days=horizon + step * i)
+        for i in reversed(range(folds))
+    ]
+    cutoffs = [c for c in cutoffs if c >= df["day"].min()]
+
+    actual_map = df.groupby(["food_name", "day"])["qty"].sum().to_dict()
+
+    records = []    # (model, food_name, pred, actual)
+    timings = {m: [] for m in models}
+
+    for cutoff in cutoffs:
+        train = df[(df["day"] <= cutoff) & (df["day"] >= cutoff - pd.Timedelta(days=train_days))]
+        if train.empty:
+            continue
+        dates = [(cutoff + pd.Timedelta(days=h)).date() for h in range(1, horizon + 1)]
+
+        for model in models:
+            if model in BASELINES:
+                t0 = time.perf_counter()
+                preds = baseline_forecasts(model, train, cutoff, dates)
+                fit_s, predict_s = 0.0, time.perf_counter() - t0
+            else:
+                preds, fit_s, predict_s = _model_forecasts(model, train, events_map, dates, workers, profile)
+
+            fold_pred, fold_act = [], []
+            for food_name, values in preds.items():
+                for d, p in zip(dates, values):
+                    a = float(actual_map.get((food_name, pd.Timestamp(d)), 0.0))
+                    records.append((model, food_name, float(p), a))
+                    fold_pred.append(p)
+                    fold_act.append(a)
+
+            timings[model].append({
+                "cutoff": cutoff.strftime("%Y-%m-%d"),
+                "fit_s": round(fit_s, 3),
+                "predict_s": round(predict_s, 3),
+                **error_metrics(fold_pred, fold_act),
+            })
+
+    res = pd.DataFrame(records, columns=["model", "food_name", "pred", "actual"])
+
+    summary, items = [], {}
+    for model in models:
+        r = res[res["model"] == model]
+        folds_info = timings[model]
+        summary.append({
+            "model": model,
+            **error_metrics(r["pred"], r["actual"]),
+            "fit_s": round(sum(f["fit_s"] for f in folds_info), 3),
+            "predict_s": round(sum(f["predict_s"] for f in folds_info), 3),
+            "folds": folds_info,
+        })
+        per_item = [
+            {"food_name": food_name, **error_metrics(g["pred"], g["actual"])}
+            for food_name, g in r.groupby("food_name")
+        ]
+        per_item.sort(key=lambda x: x["wape"], reverse=True)
+        items[model] = per_item
+
+    return {
+        "cutoffs": [c.strftime("%Y-%m-%d") for c in cutoffs],
+        "horizon": horizon,
+        "train_days": train_days,
+        "models": summary,
+        "items": items,
+    }
+
+
+# ======================================
+# ✅ Forecaster selection
+# ======================================
+def select_forecasters(df, events_map, folds=SELECT_FOLDS, margin=SELECT_MARGIN, workers=None, profile=None):
+    """
+    Backtests the per-item LightGBM model against each item's
+    statistical method (forecasters.default_methods on the latest
+    window) and picks LightGBM only where its MAE beats that method's by
+    `margin`. Comparing with the best of all methods per item instead
+    picked on fold noise and lost accuracy on held-out days.
+
+    Returns {food: {"method", "lgbm_mae", "stat_method", "stat_mae"}}.
+    """
+    methods = sorted(STAT_FORECASTERS)
+    result = run_backtest(df, events_map, folds, 1, ("per_item",) + tuple(methods),
+                          workers=workers, profile=profile)
+    errors = {
+        model: {r["food_name"]: r["mae"] for r in rows}
+        for model, rows in result["items"].items()
+    }
+
+    last_day = pd.to_datetime(df["day"]).max()
+    m = SalesMatrix(df[pd.to_datetime(df["day"]) > last_day - pd.Timedelta(days=TRAIN_DAYS)])
+    defaults = dict(zip(m.foods, default_methods(m)))
+
+    selection = {}
+    for food_name, lgbm_mae in errors["per_item"].items():
+        stat_method = str(defaults.get(food_name, "ewma"))
+        stat_mae = errors[stat_method].get(food_name, float("inf"))
+        selection[food_name] = {
+            "method": "lgbm" if lgbm_mae < stat_mae * (1 - margin) else stat_method,
+            "lgbm_mae": lgbm_mae,
+            "stat_method": stat_method,
+            "stat_mae": stat_mae,
+        }
+    return selection
+
+
+def refresh_selection(conn, folds=SELECT_FOLDS, workers=None):
+    """Runs select_forecasters() on the app's sales and stores the result."""
+    df = load_sales(conn)
+    if df.empty:
+        return {}
+    selection = select_forecasters(df, load_event_map(conn), folds, workers=workers)
+    save_selection(conn, selection, folds)
+    return selection
+
+
+def load_sales(conn):
+    """All daily sales from the rollup, in the shape run_backtest() takes."""
+    rows = conn.execute("SELECT food_name, day, qty FROM daily_sales ORDER BY day").fetchall()
+    df = pd.DataFrame([dict(r) for r in rows], columns=["food_name", "day", "qty"])
+    df["day"] = pd.to_datetime(df["day"])
+    return df
+
+
+def print_summary(result, top_items=0):
+    print(f"cut-offs {result['cutoffs'][0]} .. {result['cutoffs'][-1]} "
+          f"({len(result['cutoffs'])} folds), horizon {result['horizon']}")
+    print(f"{'model':<15} {'MAE':>8} {'MAPE%':>8} {'WAPE%':>8} {'fit_s':>8} {'predict_s':>10}")
+    for m in result["models"]:
+        print(f"{m['model']:<15} {m['mae']:>8.3f} {m['mape']:>8.2f} {m['wape']:>8.2f} "
+              f"{m['fit_s']:>8.2f} {m['predict_s']:>10.3f}")
+
+    for model, rows in result["items"].items():
+        if not top_items:
+            break
+        print(f"\nworst items, {model}:")
+        for r in rows[:top_items]:
+            print(f"  {r['food_name']:<30} MAE {r['mae']:>7.2f}  WAPE {r['wape']:>7.2f}%")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rolling-origin forecast backtest")
+    ap.add_argument("--synthetic", action="store_true", help="use generated data instead of the app database")
+    ap.add_argument("--items", type=int, default=100, help="synthetic items")
+    ap.add_argument("--days", type=int, default=120, help="synthetic days of history")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--folds", type=int, default=None, help=f"default 7 ({SELECT_FOLDS} with --select)")
+    ap.add_argument("--horizon", type=int, default=1)
+    ap.add_argument("--step", type=int, default=1, help="days between cut-offs")
+    ap.add_argument("--train-days", type=int, default=TRAIN_DAYS)
+    ap.add_argument("--models", nargs="+", default=list(BACKTEST_MODELS), choices=BACKTEST_MODELS)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--profile", choices=list(TRAINING_PROFILES), default=None,
+                    help="training profile (default: FORECAST_PROFILE)")
+    ap.add_argument("--top-items", type=int, default=5, help="worst items to list per model")
+    ap.add_argument("--json", help="write the full result to this file")
+    ap.add_argument("--select", action="store_true",
+                    help="store the per-item forecaster choice (LightGBM vs statistical) in the app database")
+    args = ap.parse_args()
+
+    if args.select:
+        from database import db
+        with db() as conn:
+            selection = refresh_selection(conn, args.folds or SELECT_FOLDS, args.workers)
+        picked = [s["method"] for s in selection.values()]
+        print(f"{len(picked)} items: " + ", ".join(f"{m} {picked.count(m)}" for m in sorted(set(picked))))
+        raise SystemExit(0)
+
+    if args.synthetic:
+        from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+        df = synthetic_daily_sales(args.items, args.days, seed=args.seed)
+        end = df["day"].max().date() + timedelta(days=args.horizon)
+        events_map = synthetic_events(args.days, seed=args.seed, end=end)
+    else:
+        from database import db
+        with db() as conn:
+            df = load_sales(conn)
+            events_map = load_event_map(conn)
+
+    if df.empty:
+        raise SystemExit("no sales data to backtest")
+
+    result = run_backtest(
+        df, events_map, args.folds or 7, args.horizon, args.models,
+        args.train_days, args.step, args.workers, args.profile
+    )
+    print_summary(result, args.top_items)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nwrote {args.json}")
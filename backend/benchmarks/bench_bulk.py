@@ -0,0 +1,61 @@
+"""
+/billing/bulk throughput per input format vs one POST /billing per row.
+
+    cd backend
+    python -m benchmarks.bench_bulk --rows 50000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import load_synthetic_db, synthetic_billing_rows
+
+
+def payloads(rows):
+    dicts = [
+        {"food_name": f, "quantity": q, "total": t, "created_at": c}
+        for f, q, t, c in rows
+    ]
+    csv_body = "food_name,quantity,total,created_at\n" + "".join(
+        f"{f},{q},{t},{c}\n" for f, q, t, c in rows
+    )
+    return {
+        "json": {"json": dicts},
+        "ndjson": {"data": "\n".join(json.dumps(d) for d in dicts), "content_type": "application/x-ndjson"},
+        "csv": {"data": csv_body, "content_type": "text/csv"},
+    }
+
+
+def run(n_rows, single_rows):
+    tmp = tempfile.mkdtemp()
+    os.environ["MODEL_STORE_DIR"] = os.path.join(tmp, "models")
+    load_synthetic_db(os.path.join(tmp, "bulk.db"), n_rows=10_000, n_items=200, n_days=60)
+
+    import main
+    client = main.app.test_client()
+    rows = synthetic_billing_rows(n_rows, n_items=200, n_days=60, seed=7)
+
+    print(f"{'format':<10} {'rows':>8} {'seconds':>8} {'rows/s':>9}")
+
+    t0 = time.perf_counter()
+    for f, q, t, _ in rows[:single_rows]:
+        client.post("/billing", json={"food_name": f, "quantity": q, "total": t})
+    elapsed = time.perf_counter() - t0
+    print(f"{'single':<10} {single_rows:>8} {elapsed:>8.2f} {single_rows / elapsed:>9.0f}")
+
+    for fmt, kwargs in payloads(rows).items():
+        t0 = time.perf_counter()
+        r = client.post("/billing/bulk", **kwargs)
+        elapsed = time.perf_counter() - t0
+        assert r.json["inserted"] == n_rows, r.json.get("errors", [])[:3]
+        print(f"{fmt:<10} {n_rows:>8} {elapsed:>8.2f} {n_rows / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--single-rows", type=int, default=1000)
+    args = ap.parse_args()
+    run(args.rows, args.single_rows)
@@ -0,0 +1,110 @@
+"""
+Per-endpoint SQL latency on a large synthetic billing table, before
+(raw billing scans, no indexes) and after (indexes + daily_sales rollup).
+
+    cd backend
+    python -m benchmarks.bench_db --rows 5000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import database
+from benchmarks.synthetic import load_synthetic_db
+
+
+# endpoint -> queries it ran before the rollup/index work
+LEGACY = {
+    "/billing": ["""
+        SELECT id, food_name, quantity, total, created_at
+        FROM billing ORDER BY created_at DESC LIMIT 50
+    """],
+    "/dashboard": [
+        "SELECT food_name, SUM(quantity) as qty FROM billing GROUP BY food_name ORDER BY qty DESC LIMIT 1",
+        """SELECT DATE(created_at) as day, SUM(total) as revenue FROM billing
+           WHERE created_at >= DATE('now', '-7 day') GROUP BY day ORDER BY day""",
+        "SELECT strftime('%Y-%m', created_at) as month, SUM(total) as revenue FROM billing GROUP BY month ORDER BY month",
+    ],
+    "/forecast (data)": ["""
+        SELECT food_name, DATE(created_at) as day, SUM(quantity) as qty FROM billing
+        WHERE created_at >= DATE('now', '-60 day') GROUP BY food_name, day ORDER BY day
+    """],
+    "/forecast/accuracy": ["""
+        SELECT food_name, SUM(quantity) as qty FROM billing
+        WHERE DATE(created_at) = DATE('now') GROUP BY food_name
+    """],
+    "/ai/chat (data)": [
+        """SELECT IFNULL(SUM(total), 0) as revenue, IFNULL(SUM(quantity), 0) as qty
+           FROM billing WHERE DATE(created_at) = DATE('now')""",
+        """SELECT food_name, SUM(quantity) as qty FROM billing WHERE created_at >= DATE('now','-7 day')
+           GROUP BY food_name ORDER BY qty DESC LIMIT 5""",
+    ],
+}
+
+# endpoint -> queries it runs now
+CURRENT = {
+    "/billing": LEGACY["/billing"],
+    "/dashboard": [
+        "SELECT food_name, SUM(qty) as qty FROM daily_sales GROUP BY food_name ORDER BY qty DESC LIMIT 1",
+        """SELECT day, SUM(revenue) as revenue FROM daily_sales
+           WHERE day >= DATE('now', '-7 day') GROUP BY day ORDER BY day""",
+        "SELECT strftime('%Y-%m', day) as month, SUM(revenue) as revenue FROM daily_sales GROUP BY month ORDER BY month",
+    ],
+    "/forecast (data)": ["SELECT food_name, day, qty FROM daily_sales WHERE day >= DATE('now', '-60 day') ORDER BY day"],
+    "/forecast/accuracy": ["SELECT food_name, qty FROM daily_sales WHERE day = DATE('now')"],
+    "/ai/chat (data)": [
+        """SELECT IFNULL(SUM(revenue), 0) as revenue, IFNULL(SUM(qty), 0) as qty
+           FROM daily_sales WHERE day = DATE('now')""",
+        """SELECT food_name, SUM(qty) as qty FROM daily_sales WHERE day >= DATE('now','-7 day')
+           GROUP BY food_name ORDER BY qty DESC LIMIT 5""",
+    ],
+}
+
+NEW_INDEXES = ["idx_billing_created_at", "idx_billing_food_created"]
+
+
+def time_queries(conn, queries, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for sql in queries:
+            conn.execute(sql).fetchall()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def run(n_rows, n_items, n_days, repeat):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    t0 = time.perf_counter()
+    load_synthetic_db(path, n_rows, n_items, n_days)
+    print(f"loaded {n_rows:,} billing rows in {time.perf_counter() - t0:.1f}s")
+
+    conn = database.get_db()
+
+    for name in NEW_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+    before = {ep: time_queries(conn, qs, repeat) for ep, qs in LEGACY.items()}
+
+    conn.execute("PRAGMA user_version = 0")
+    database.migrate_schema(conn)
+    conn.commit()
+    after = {ep: time_queries(conn, qs, repeat) for ep, qs in CURRENT.items()}
+
+    conn.close()
+
+    print(f"{'endpoint':<22} {'before_ms':>10} {'after_ms':>10} {'speedup':>9}")
+    for ep in LEGACY:
+        print(f"{ep:<22} {before[ep]:>10.1f} {after[ep]:>10.2f} {before[ep] / max(after[ep], 1e-6):>8.0f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--items", type=int, default=300)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    run(args.rows, args.items, args.days, args.repeat)
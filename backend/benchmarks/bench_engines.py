@@ -0,0 +1,80 @@
+"""
+Per-item engine: LightGBM for every item vs the auto selector.
+
+A synthetic menu where slow_share of the items are slow movers. The
+selection (backtest.select_forecasters) is run once on the history
+before the test nights; then every night each engine trains from
+scratch on the last 60 days and predicts the next day, which is held
+out as "actual".
+
+    cd backend
+    python -m benchmarks.bench_engines --items 400 --slow-share 0.6
+"""
+import argparse
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+
+import forecasting
+from backtest import select_forecasters, SELECT_FOLDS, TRAIN_DAYS
+from model_registry import ModelRegistry
+from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+
+
+def run(n_items, n_days, nights, slow_share, folds):
+    df = synthetic_daily_sales(n_items, n_days, slow_share=slow_share)
+    last_day = df["day"].max()
+    events_map = synthetic_events(n_days, end=last_day.date() + timedelta(days=1))
+    first_night = last_day - timedelta(days=nights)
+
+    t0 = time.perf_counter()
+    selection = select_forecasters(df[df["day"] < first_night], events_map, folds)
+    select_s = time.perf_counter() - t0
+    methods = [s["method"] for s in selection.values()]
+    print(f"{n_items} items ({slow_share:.0%} slow movers), selection over {folds} folds: {select_s:.1f}s")
+    print("  " + ", ".join(f"{m} {methods.count(m)}" for m in sorted(set(methods))))
+
+    engines = {
+        "lgbm": {"engine": "lgbm"},
+        "auto, no selection": {"engine": "auto", "selection": {}},
+        "auto": {"engine": "auto", "selection": {f: s["method"] for f, s in selection.items()}},
+    }
+    totals = {name: {"seconds": 0.0, "abs_err": 0.0, "actual": 0.0} for name in engines}
+
+    for night in range(nights):
+        cutoff = first_night + timedelta(days=night)
+        target = cutoff + timedelta(days=1)
+        train = df[(df["day"] <= cutoff) & (df["day"] > cutoff - timedelta(days=TRAIN_DAYS))]
+        actual = df[df["day"] == target].set_index("food_name")["qty"].astype(float).to_dict()
+
+        for name, kwargs in engines.items():
+            registry = ModelRegistry(tempfile.mkdtemp())
+            t0 = time.perf_counter()
+            fc = forecasting.forecast_days_from_sales(
+                train, events_map, [target.date()], "per_item", registry=registry, **kwargs
+            )[0]
+            totals[name]["seconds"] += time.perf_counter() - t0
+
+            pred = np.array([f["predicted_qty"] for f in fc])
+            act = np.array([actual.get(f["food_name"], 0.0) for f in fc])
+            totals[name]["abs_err"] += float(np.abs(pred - act).sum())
+            totals[name]["actual"] += float(act.sum())
+
+    print(f"\n{nights} nights, fresh models every night")
+    print(f"{'engine':>20} {'s/night':>8} {'WAPE%':>7}")
+    for name, t in totals.items():
+        wape = t["abs_err"] / max(t["actual"], 1e-9) * 100
+        print(f"{name:>20} {t['seconds'] / nights:>8.2f} {wape:>7.2f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="LightGBM-only vs auto forecaster selection")
+    ap.add_argument("--items", type=int, default=400)
+    ap.add_argument("--days", type=int, default=120)
+    ap.add_argument("--nights", type=int, default=5)
+    ap.add_argument("--slow-share", type=float, default=0.6)
+    ap.add_argument("--folds", type=int, default=SELECT_FOLDS)
+    args = ap.parse_args()
+    run(args.items, args.days, args.nights, args.slow_share, args.folds)
@@ -0,0 +1,89 @@
+"""
+Feature builder benchmark: old per-item pandas loop vs build_feature_panel.
+
+    cd backend
+    python -m benchmarks.bench_features --sizes 50 500 5000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import build_feature_panel
+from forecasting import FORECAST_FEATURES
+from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+
+
+def legacy_item_features(df, events_map):
+    """The per-item loop forecast() used before build_feature_panel."""
+    out = []
+    for food_name, g in df.groupby("food_name"):
+        g = g.sort_values("day").copy()
+
+        full_days = pd.date_range(g["day"].min(), g["day"].max(), freq="D")
+        g = g.set_index("day").reindex(full_days).rename_axis("day").reset_index()
+        g["food_name"] = food_name
+        g["qty"] = g["qty"].fillna(0)
+
+        g["t"] = np.arange(len(g))
+        g["weekday"] = g["day"].dt.weekday
+        g["lag1"] = g["qty"].shift(1)
+        g["lag2"] = g["qty"].shift(2)
+        g["lag3"] = g["qty"].shift(3)
+        g["roll7"] = g["qty"].rolling(7).mean()
+
+        def event_features(d):
+            d_str = pd.to_datetime(d).strftime("%Y-%m-%d")
+            e = events_map.get(d_str)
+            if not e:
+                return pd.Series([0.0, 0, 0, 0, 0])
+            return pd.Series([
+                float(e.get("impact", 0.0)),
+                int(e.get("is_holiday", 0)),
+                int(e.get("is_festival", 0)),
+                int(e.get("is_exam", 0)),
+                int(e.get("is_special_menu", 0)),
+            ])
+
+        g[["event_impact", "is_holiday", "is_festival", "is_exam", "is_special_menu"]] = g["day"].apply(event_features)
+
+        out.append(g.dropna().reset_index(drop=True))
+
+    return pd.concat(out, ignore_index=True)
+
+
+def feature_bytes(panel):
+    cols = ["qty"] + FORECAST_FEATURES
+    return np.ascontiguousarray(panel[cols].to_numpy(dtype=np.float64)).tobytes()
+
+
+def run(sizes, n_days):
+    events_map = synthetic_events(n_days)
+    print(f"{'items':>7} {'rows':>9} {'legacy_s':>9} {'panel_s':>9} {'speedup':>8}  identical")
+
+    for n in sizes:
+        df = synthetic_daily_sales(n, n_days)
+
+        t0 = time.perf_counter()
+        old = legacy_item_features(df, events_map)
+        t_old = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        new = build_feature_panel(df, events_map)
+        t_new = time.perf_counter() - t0
+
+        same = (
+            list(old["food_name"]) == list(new["food_name"])
+            and (old["day"].values == new["day"].values).all()
+            and feature_bytes(old) == feature_bytes(new)
+        )
+        print(f"{n:>7} {len(new):>9} {t_old:>9.3f} {t_new:>9.3f} {t_old / max(t_new, 1e-9):>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    ap.add_argument("--days", type=int, default=60)
+    args = ap.parse_args()
+    run(args.sizes, args.days)
@@ -0,0 +1,57 @@
+"""
+Per-item vs global forecasting: training time and next-day accuracy.
+
+Each synthetic menu has n_days + 1 days; the models train on the first
+n_days and predict the last one, which is held out as "actual".
+
+    cd backend
+    python -m benchmarks.bench_forecast_modes --sizes 50 200 400
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+import forecasting
+from model_registry import ModelRegistry
+from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+
+
+def holdout_errors(forecasts, actual):
+    pred = np.array([f["predicted_qty"] for f in forecasts])
+    act = np.array([actual.get(f["food_name"], 0.0) for f in forecasts])
+    mae = float(np.mean(np.abs(pred - act))) if len(act) else 0.0
+    wape = float(np.abs(pred - act).sum() / max(act.sum(), 1e-9) * 100)
+    return mae, wape
+
+
+def run(sizes, n_days):
+    print(f"{'items':>6} {'mode':>9} {'fit_s':>8} {'MAE':>8} {'WAPE%':>7} {'modelled':>9}")
+
+    for n in sizes:
+        df = synthetic_daily_sales(n, n_days + 1)
+        last_day = df["day"].max()
+        train = df[df["day"] < last_day]
+        actual = df[df["day"] == last_day].set_index("food_name")["qty"].astype(float).to_dict()
+        events_map = synthetic_events(n_days + 1, end=last_day.date())
+
+        for mode in forecasting.FORECAST_MODES:
+            # fresh registry so every run really trains
+            forecasting.model_registry = ModelRegistry(tempfile.mkdtemp())
+
+            t0 = time.perf_counter()
+            fc = forecasting.forecast_from_sales(train, events_map, last_day.date(), mode)
+            elapsed = time.perf_counter() - t0
+
+            mae, wape = holdout_errors(fc, actual)
+            modelled = sum(1 for f in fc if f["confidence"] != 55)
+            print(f"{n:>6} {mode:>9} {elapsed:>8.2f} {mae:>8.2f} {wape:>7.1f} {modelled:>5}/{len(fc)}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 400])
+    ap.add_argument("--days", type=int, default=60)
+    args = ap.parse_args()
+    run(args.sizes, args.days)
@@ -0,0 +1,86 @@
+"""
+Nightly refresh: full refit vs incremental training (per-item models).
+
+Replays a menu day by day. Each night the models see the last `window`
+days up to that night and predict the next day, which is held out as
+"actual". Both registries are warmed on the first night; after that the
+"full" one refits every changed item and the "incremental" one keeps
+boosting its existing models (FORECAST_UPDATE_TREES trees per update).
+
+    cd backend
+    python -m benchmarks.bench_incremental --items 200 --nights 7
+"""
+import argparse
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+
+import forecasting
+from model_registry import ModelRegistry
+from benchmarks.bench_forecast_modes import holdout_errors
+from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+
+
+def run(n_items, nights, window, missing_rate):
+    n_days = window + nights + 1
+    df = synthetic_daily_sales(n_items, n_days, missing_rate=missing_rate)
+    last_day = df["day"].max()
+    events_map = synthetic_events(n_days, end=last_day.date())
+    first_night = last_day - timedelta(days=nights)
+
+    registries = {t: ModelRegistry(tempfile.mkdtemp()) for t in forecasting.TRAINING_MODES}
+    totals = {t: {"seconds": 0.0, "abs_err": 0.0, "actual": 0.0} for t in registries}
+
+    print(f"{n_items} items, {window}-day window, {nights} nights, "
+          f"{forecasting.FORECAST_UPDATE_TREES} trees per update")
+    print(f"{'night':>6} {'training':>12} {'fit_s':>8} {'MAE':>8} {'WAPE%':>7} "
+          f"{'fits':>5} {'updates':>8} {'reuses':>7}")
+
+    for night in range(nights + 1):
+        cutoff = first_night + timedelta(days=night - 1)
+        target = cutoff + timedelta(days=1)
+        train = df[(df["day"] <= cutoff) & (df["day"] > cutoff - timedelta(days=window))]
+        actual = df[df["day"] == target].set_index("food_name")["qty"].astype(float).to_dict()
+
+        for training, registry in registries.items():
+            before = dict(registry.stats)
+            t0 = time.perf_counter()
+            fc = forecasting.forecast_days_from_sales(
+                train, events_map, [target.date()], "per_item",
+                registry=registry, training=training
+            )[0]
+            elapsed = time.perf_counter() - t0
+
+            mae, wape = holdout_errors(fc, actual)
+            delta = {k: registry.stats[k] - before[k] for k in ("fits", "updates", "reuses")}
+            label = "warm-up" if night == 0 else str(night)
+            print(f"{label:>6} {training:>12} {elapsed:>8.2f} {mae:>8.2f} {wape:>7.1f} "
+                  f"{delta['fits']:>5} {delta['updates']:>8} {delta['reuses']:>7}")
+
+            if night > 0:
+                pred = np.array([f["predicted_qty"] for f in fc])
+                act = np.array([actual.get(f["food_name"], 0.0) for f in fc])
+                totals[training]["seconds"] += elapsed
+                totals[training]["abs_err"] += float(np.abs(pred - act).sum())
+                totals[training]["actual"] += float(act.sum())
+
+    print(f"\nover {nights} nights:")
+    for training, t in totals.items():
+        wape = t["abs_err"] / max(t["actual"], 1e-9) * 100
+        print(f"  {training:>12}: {t['seconds'] / nights:6.2f} s/night, WAPE {wape:.1f}%")
+    full, incr = totals["full"]["seconds"], totals["incremental"]["seconds"]
+    if incr > 0:
+        print(f"  incremental refresh is {full / incr:.1f}x faster")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Full vs incremental nightly refresh")
+    ap.add_argument("--items", type=int, default=200)
+    ap.add_argument("--nights", type=int, default=7)
+    ap.add_argument("--window", type=int, default=60)
+    ap.add_argument("--missing-rate", type=float, default=0.0,
+                    help="share of item-days without sales (0 = every item sells daily)")
+    args = ap.parse_args()
+    run(args.items, args.nights, args.window, args.missing_rate)
@@ -0,0 +1,79 @@
+"""
+Keyset vs OFFSET pagination on a large billing table.
+
+Follows next_cursor through GET /billing?limit=N and times pages at
+increasing depth, next to the same page read with LIMIT/OFFSET, for the
+whole table and with a ?food= filter.
+
+    cd backend
+    python -m benchmarks.bench_pagination --rows 3000000 --limit 100
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import load_synthetic_db
+
+
+def median_ms(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def run(n_rows, limit, depths):
+    tmp = tempfile.mkdtemp()
+    os.environ["MODEL_STORE_DIR"] = os.path.join(tmp, "models")
+    print(f"building {n_rows:,} billing rows...")
+    load_synthetic_db(os.path.join(tmp, "pages.db"), n_rows=n_rows)
+
+    import database
+    import main
+
+    client = main.app.test_client()
+    with database.db() as conn:
+        food = conn.execute("SELECT food_name FROM billing LIMIT 1").fetchone()["food_name"]
+
+    for label, extra, where, params in (
+        ("all bills", "", "", ()),
+        (f"food={food}", f"&food={food}", "WHERE food_name = ?", (food,)),
+    ):
+        print(f"\n{label}: page size {limit}")
+        print(f"{'page':>8} {'keyset ms':>10} {'offset ms':>10}")
+
+        cursor, page = None, 0
+        for depth in depths:
+            # walk the cursors down to `depth` (not timed)
+            while page < depth - 1:
+                url = f"/billing?limit={limit}{extra}" + (f"&cursor={cursor}" if cursor else "")
+                cursor = client.get(url).get_json()["next_cursor"]
+                page += 1
+                if cursor is None:
+                    break
+            if cursor is None and depth > 1:
+                print(f"{depth:>8}  (past the last page)")
+                break
+
+            url = f"/billing?limit={limit}{extra}" + (f"&cursor={cursor}" if cursor else "")
+            keyset = median_ms(lambda: client.get(url).get_json())
+
+            offset = (depth - 1) * limit
+            with database.db() as conn:
+                sql = (f"SELECT id, food_name, quantity, total, created_at FROM billing {where} "
+                       f"ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?")
+                offset_ms = median_ms(lambda: conn.execute(sql, (*params, limit, offset)).fetchall())
+
+            print(f"{depth:>8} {keyset:>10.2f} {offset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Keyset vs OFFSET pagination")
+    ap.add_argument("--rows", type=int, default=3_000_000)
+    ap.add_argument("--limit", type=int, default=100)
+    ap.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 1000, 5000])
+    args = ap.parse_args()
+    run(args.rows, args.limit, args.depths)
@@ -0,0 +1,49 @@
+"""
+Per-item training wall time vs process-pool size.
+
+    cd backend
+    python -m benchmarks.bench_parallel --items 400 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import forecasting
+from model_registry import ModelRegistry
+from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+
+
+def run(n_items, n_days, worker_counts):
+    df = synthetic_daily_sales(n_items, n_days)
+    tomorrow = df["day"].max().date()
+    events_map = synthetic_events(n_days, end=tomorrow)
+
+    print(f"{n_items} items, {os.cpu_count()} cpus")
+    print(f"{'workers':>8} {'wall_s':>8} {'speedup':>8}  same_as_1")
+
+    base_time, base_fc = None, None
+    for workers in worker_counts:
+        # fresh registry so every run trains every item
+        forecasting.model_registry = ModelRegistry(tempfile.mkdtemp())
+
+        if workers > 1:
+            # start the pool outside the timing (spawn start-up is one-off)
+            forecasting._train_pool(workers).submit(int, 0).result()
+
+        t0 = time.perf_counter()
+        fc = forecasting.forecast_from_sales(df, events_map, tomorrow, "per_item", workers=workers)
+        elapsed = time.perf_counter() - t0
+
+        if base_time is None:
+            base_time, base_fc = elapsed, fc
+        print(f"{workers:>8} {elapsed:>8.2f} {base_time / elapsed:>7.2f}x  {fc == base_fc}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=400)
+    ap.add_argument("--days", type=int, default=60)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = ap.parse_args()
+    run(args.items, args.days, args.workers)
@@ -0,0 +1,75 @@
+"""
+Per-request overhead of opening a fresh connection (the old main.db():
+connect + PRAGMAs on every call) vs the pooled db(), under concurrency.
+
+    cd backend
+    python -m benchmarks.bench_pool --threads 1 4 16 --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import database
+from benchmarks.synthetic import load_synthetic_db
+
+ENDPOINTS = ["/foods", "/billing"]
+
+
+@contextmanager
+def fresh_connection():
+    # what every handler did before the pool
+    conn = database._new_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def hammer(client_factory, url, threads, n_requests):
+    per_thread = max(1, n_requests // threads)
+
+    def worker(_):
+        client = client_factory()
+        for _ in range(per_thread):
+            r = client.get(url)
+            assert r.status_code == 200, r.status_code
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(worker, range(threads)))
+    elapsed = time.perf_counter() - t0
+    return per_thread * threads / elapsed, elapsed / (per_thread * threads) * 1000
+
+
+def run(thread_counts, n_requests, n_rows):
+    tmp = tempfile.mkdtemp()
+    os.environ["MODEL_STORE_DIR"] = os.path.join(tmp, "models")
+    load_synthetic_db(os.path.join(tmp, "pool.db"), n_rows=n_rows, n_items=100, n_days=60)
+
+    import main
+
+    print(f"{'endpoint':<10} {'threads':>7} {'fresh_rps':>10} {'pooled_rps':>11} {'fresh_ms':>9} {'pooled_ms':>10}")
+    for url in ENDPOINTS:
+        for threads in thread_counts:
+            main.db = fresh_connection
+            fresh_rps, fresh_ms = hammer(main.app.test_client, url, threads, n_requests)
+
+            main.db = database.db
+            database.pool.clear()
+            pooled_rps, pooled_ms = hammer(main.app.test_client, url, threads, n_requests)
+
+            print(f"{url:<10} {threads:>7} {fresh_rps:>10.0f} {pooled_rps:>11.0f} {fresh_ms:>9.2f} {pooled_ms:>10.2f}")
+
+    print("pool:", database.pool.stats)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--rows", type=int, default=50_000)
+    args = ap.parse_args()
+    run(args.threads, args.requests, args.rows)
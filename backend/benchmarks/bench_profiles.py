@@ -0,0 +1,63 @@
+"""
+Training profiles: trees actually used, fit time and backtest error.
+
+For every profile in forecasting.TRAINING_PROFILES: one fit on the
+latest window (how many trees early stopping kept per model) and a
+rolling-origin backtest (fit seconds summed over folds, WAPE/MAE).
+mean7 is listed as the baseline.
+
+    cd backend
+    python -m benchmarks.bench_profiles --items 200 --days 120 --folds 5
+"""
+import argparse
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+
+import forecasting
+from backtest import run_backtest, TRAIN_DAYS
+from model_registry import ModelRegistry
+from benchmarks.synthetic import synthetic_daily_sales, synthetic_events
+
+
+def tree_stats(df, events_map, mode, profile):
+    """(mean, max) trees per fitted model on the last TRAIN_DAYS window."""
+    last_day = df["day"].max()
+    train = df[df["day"] >= last_day - timedelta(days=TRAIN_DAYS)]
+    registry = ModelRegistry(tempfile.mkdtemp())
+    forecasting.forecast_days_from_sales(
+        train, events_map, [(last_day + timedelta(days=1)).date()], mode,
+        registry=registry, profile=profile
+    )
+    trees = list(registry.tree_counts().values())
+    return (float(np.mean(trees)), max(trees)) if trees else (0.0, 0)
+
+
+def run(n_items, n_days, folds, modes):
+    df = synthetic_daily_sales(n_items, n_days)
+    events_map = synthetic_events(n_days, end=df["day"].max().date() + timedelta(days=1))
+
+    print(f"{n_items} items, {n_days} days, {folds} folds")
+    print(f"{'mode':>9} {'profile':>9} {'trees avg':>10} {'max':>5} {'fit_s':>8} {'MAE':>7} {'WAPE%':>7}")
+
+    baseline = None
+    for mode in modes:
+        for profile in forecasting.TRAINING_PROFILES:
+            avg_trees, max_trees = tree_stats(df, events_map, mode, profile)
+            result = run_backtest(df, events_map, folds, models=(mode, "mean7"), profile=profile)
+            m, baseline = result["models"]
+            print(f"{mode:>9} {profile:>9} {avg_trees:>10.1f} {max_trees:>5} {m['fit_s']:>8.2f} "
+                  f"{m['mae']:>7.3f} {m['wape']:>7.2f}")
+
+    print(f"{'mean7':>9} {'-':>9} {'-':>10} {'-':>5} {0:>8.2f} {baseline['mae']:>7.3f} {baseline['wape']:>7.2f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Training profiles: trees, fit time, backtest error")
+    ap.add_argument("--items", type=int, default=200)
+    ap.add_argument("--days", type=int, default=120)
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--modes", nargs="+", default=["per_item"], choices=forecasting.FORECAST_MODES)
+    args = ap.parse_args()
+    run(args.items, args.days, args.folds, args.modes)
@@ -0,0 +1,123 @@
+"""
+Local stand-in for the Gemini generateContent API.
+
+Answers every POST with a canned candidate after `--delay` seconds and
+counts the calls it gets, so the /ai/chat path (I/O pool, pending
+replies, reply cache) can be run without a real key:
+
+    cd backend
+    python -m benchmarks.gemini_stub --port 8765 --delay 2
+    GEMINI_API_KEY=stub \
+    GEMINI_API_URL=http://127.0.0.1:8765/v1beta/models/{model}:generateContent \
+    python main.py
+
+`python -m benchmarks.gemini_stub --check` runs the app in-process
+against the stub and prints what each step returned.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = body["contents"][0]["parts"][0]["text"]
+        with self.server.lock:
+            self.server.calls += 1
+        time.sleep(self.server.delay)
+
+        question = prompt.rsplit("User:", 1)[-1].strip()
+        out = {"candidates": [{"content": {"parts": [{"text": f"stub answer to: {question}"}]}}]}
+        data = json.dumps(out).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port=0, delay=0.5):
+    """Starts the stub on a background thread, returns (server, url template)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.delay = delay
+    server.calls = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1beta/models/{{model}}:generateContent"
+    return server, url
+
+
+def check(db_path, delay):
+    """Exercises /ai/chat against the stub through the Flask test client."""
+    import shutil
+
+    stub, url = start_stub(delay=delay)
+    os.environ.update({
+        "GEMINI_API_KEY": "stub",
+        "GEMINI_API_URL": url,
+        "AI_CHAT_WAIT": str(delay / 2),
+        "MODEL_STORE_DIR": os.path.join(tempfile.mkdtemp(), "models"),
+    })
+
+    import database
+    tmp = os.path.join(tempfile.mkdtemp(), "chat.db")
+    shutil.copy(db_path, tmp)
+    database.DB_PATH = tmp
+
+    import main
+    client = main.app.test_client()
+    question = {"message": "How should I plan the menu this week?", "language": "English"}
+
+    def ask(label, body=question):
+        t0 = time.perf_counter()
+        r = client.post("/ai/chat", json=body)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{label:<28} {r.status_code} {ms:8.1f} ms  calls={stub.calls}  {r.get_json()}")
+
+    ask("warm-up (trains forecast)", {"message": "top items"})
+    ask("first ask (slow model)")
+    time.sleep(delay)
+    ask("ask again (cached)")
+    ask("other language", {**question, "language": "Tamil"})
+    time.sleep(delay)
+
+    # identical questions at the same time share one upstream call
+    before = stub.calls
+    body = {"message": "Which items sell on Fridays?", "language": "English"}
+    threads = [threading.Thread(target=client.post, args=("/ai/chat",), kwargs={"json": body}) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    time.sleep(delay)
+    print(f"8 concurrent identical asks -> {stub.calls - before} upstream call(s)")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Local Gemini API stub")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--delay", type=float, default=1.0, help="seconds per reply")
+    ap.add_argument("--check", action="store_true", help="run /ai/chat against the stub and exit")
+    ap.add_argument("--db", default=os.path.join(os.path.dirname(__file__), "..", "database.db"),
+                    help="database copied for --check")
+    args = ap.parse_args()
+
+    if args.check:
+        check(args.db, args.delay)
+    else:
+        server, url = start_stub(args.port, args.delay)
+        print(f"Gemini stub on {url} (GEMINI_API_URL), delay {args.delay}s")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
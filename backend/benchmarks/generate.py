@@ -0,0 +1,218 @@
+"""
+Production-scale synthetic data generator.
+
+Builds years of billing history for thousands of items, with per-item
+base demand and trend, a weekday profile, yearly seasonality, term
+breaks and calendar events (holidays cut demand, festivals/special menus
+lift it), all vectorized with NumPy. Rows are bulk-loaded into a fresh
+SQLite database with the app schema, then indexes and the daily_sales
+rollup are built once at the end.
+
+    cd backend
+    python -m benchmarks.generate --db /tmp/big.db --items 2000 --years 2
+    python -m benchmarks.load_test --db /tmp/big.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import database
+
+
+EVENT_TYPES = {
+    # type: (demand multiplier, impact score stored in events)
+    "Holiday": (0.45, -2),
+    "Festival": (1.35, 2),
+    "Exam": (0.8, -1),
+    "Special Menu": (1.2, 1),
+}
+
+# share of a day's bills per hour (canteen: breakfast, lunch, snacks, dinner)
+HOUR_PROFILE = np.array([
+    0, 0, 0, 0, 0, 0, 0, 2, 6, 7, 4, 3,
+    12, 14, 8, 4, 6, 6, 4, 7, 8, 4, 1, 0,
+], dtype=np.float64)
+
+
+def demand_matrix(n_items, start, n_days, rng, events):
+    """
+    Expected bills per (item, day).
+    events: {day_index: type} from generate_events().
+    """
+    t = np.arange(n_days)
+    dates = np.array([start + timedelta(days=int(i)) for i in t])
+    weekday = np.array([d.weekday() for d in dates])
+    doy = np.array([d.timetuple().tm_yday for d in dates])
+
+    base = rng.lognormal(mean=1.2, sigma=0.9, size=n_items)              # bills/day
+    trend = rng.normal(0, 0.25, n_items) / 365.0                          # per day
+    weekday_profile = rng.uniform(0.7, 1.3, (n_items, 7))
+    weekday_profile[:, 5:] *= rng.uniform(0.3, 1.0, (n_items, 1))         # weekends quieter
+    season_amp = rng.uniform(0.0, 0.35, n_items)
+    season_phase = rng.uniform(0, 2 * np.pi, n_items)
+
+    lam = base[:, None] * np.clip(1 + trend[:, None] * t[None, :], 0.2, None)
+    lam *= weekday_profile[:, weekday]
+    lam *= 1 + season_amp[:, None] * np.sin(2 * np.pi * doy[None, :] / 365.25 + season_phase[:, None])
+
+    # term breaks: late May - June and last two weeks of December
+    month, day = np.array([d.month for d in dates]), np.array([d.day for d in dates])
+    term_break = ((month == 5) & (day >= 20)) | (month == 6) | ((month == 12) & (day >= 18))
+    lam[:, term_break] *= 0.55
+
+    day_mult = np.ones(n_days)
+    for i, kind in events.items():
+        day_mult[i] = EVENT_TYPES[kind][0]
+    lam *= day_mult[None, :]
+
+    # items launched / retired during the period
+    launch = np.where(rng.random(n_items) < 0.15, rng.integers(0, n_days, n_items), 0)
+    retire = np.where(rng.random(n_items) < 0.05, rng.integers(0, n_days, n_items), n_days)
+    alive = (t[None, :] >= launch[:, None]) & (t[None, :] < np.maximum(retire, launch + 30)[:, None])
+    return np.where(alive, lam, 0.0)
+
+
+def generate_events(n_days, rng, per_year=24):
+    """{day_index: event type}, roughly per_year events a year."""
+    n = max(1, int(n_days / 365 * per_year))
+    days = rng.choice(n_days, size=min(n, n_days), replace=False)
+    kinds = rng.choice(list(EVENT_TYPES), size=len(days), p=[0.35, 0.2, 0.25, 0.2])
+    return {int(d): str(k) for d, k in zip(days, kinds)}
+
+
+def billing_chunks(lam, start, prices, rng, until=None, days_per_chunk=30):
+    """
+    Yields lists of (food_name_index, quantity, total, created_at) for
+    consecutive day ranges, so memory stays bounded for multi-year runs.
+    Bills after `until` (the current time, for the last day) are dropped.
+    """
+    n_items, n_days = lam.shape
+    hour_p = HOUR_PROFILE / HOUR_PROFILE.sum()
+    start64 = np.datetime64(start, "s")
+    limit_s = (until - start).total_seconds() if until else np.inf
+
+    for d0 in range(0, n_days, days_per_chunk):
+        d1 = min(n_days, d0 + days_per_chunk)
+        counts = rng.poisson(lam[:, d0:d1])
+        item_idx, day_off = np.nonzero(counts)
+        reps = counts[item_idx, day_off]
+        item = np.repeat(item_idx, reps)
+        day = np.repeat(day_off + d0, reps)
+
+        n = len(item)
+        qty = rng.choice([1, 2, 3, 4, 5], size=n, p=[0.62, 0.23, 0.09, 0.04, 0.02])
+        seconds = (
+            day.astype(np.int64) * 86400
+            + rng.choice(24, size=n, p=hour_p) * 3600
+            + rng.integers(0, 3600, n)
+        )
+        keep = seconds <= limit_s
+        item, qty, seconds = item[keep], qty[keep], seconds[keep]
+        if not len(item):
+            continue
+
+        order = np.argsort(seconds, kind="stable")
+        created = (start64 + seconds[order].astype("timedelta64[s]")).astype(str)
+        created = np.char.replace(created, "T", " ")
+
+        yield list(zip(
+            item[order].tolist(),
+            qty[order].tolist(),
+            (qty[order] * prices[item[order]]).round(2).tolist(),
+            created.tolist(),
+        ))
+
+
+def generate(path, n_items=2000, years=2.0, seed=7, end=None, verbose=True):
+    """
+    Writes a new database at path. Returns a dict with row counts and
+    timings. end defaults to now (UTC, like billing.created_at).
+    """
+    rng = np.random.default_rng(seed)
+    n_days = max(1, int(round(years * 365)))
+    end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+    start = (end - timedelta(days=n_days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if os.path.exists(path):
+        os.remove(path)
+    old_path = database.DB_PATH
+    database.DB_PATH = path
+    database.init_db()
+    database.DB_PATH = old_path
+
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+
+    # indexes are rebuilt once after the load (much faster than per row)
+    for name in ("idx_billing_created_at", "idx_billing_food_created"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    names = [f"Item {i:05d}" for i in range(n_items)]
+    prices = rng.uniform(10, 180, n_items).round(2)
+    conn.executemany(
+        "INSERT INTO foods (name, price, cost_price) VALUES (?, ?, ?)",
+        [(n, float(p), float(round(p * rng.uniform(0.3, 0.6), 2))) for n, p in zip(names, prices)]
+    )
+
+    events = generate_events(n_days, rng)
+    conn.executemany(
+        "INSERT OR IGNORE INTO events (event_date, event_type, title, impact) VALUES (?, ?, ?, ?)",
+        [
+            ((start + timedelta(days=i)).strftime("%Y-%m-%d"), kind, f"{kind} #{i}", EVENT_TYPES[kind][1])
+            for i, kind in sorted(events.items())
+        ]
+    )
+
+    lam = demand_matrix(n_items, start, n_days, rng, events)
+    rows = 0
+    for chunk in billing_chunks(lam, start, prices, rng, until=end):
+        conn.executemany(
+            "INSERT INTO billing (food_name, quantity, total, created_at) VALUES (?, ?, ?, ?)",
+            [(names[i], q, t, c) for i, q, t, c in chunk]
+        )
+        rows += len(chunk)
+        if verbose:
+            print(f"\r  {rows:,} billing rows", end="", flush=True)
+    load_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    conn.execute("PRAGMA user_version = 0")
+    database.migrate_schema(conn)
+    database.rebuild_daily_sales(conn)
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+    index_s = time.perf_counter() - t0
+
+    if verbose:
+        print()
+    return {
+        "path": path,
+        "items": n_items,
+        "days": n_days,
+        "billing_rows": rows,
+        "events": len(events),
+        "load_s": round(load_s, 2),
+        "index_rollup_s": round(index_s, 2),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate a large synthetic canteen database")
+    ap.add_argument("--db", required=True, help="output SQLite file (overwritten)")
+    ap.add_argument("--items", type=int, default=2000)
+    ap.add_argument("--years", type=float, default=2.0)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    info = generate(args.db, args.items, args.years, args.seed)
+    print(f"{info['billing_rows']:,} bills, {info['items']} items, {info['days']} days, "
+          f"{info['events']} events -> {info['path']}")
+    print(f"load {info['load_s']}s, indexes + rollup {info['index_rollup_s']}s "
+          f"({info['billing_rows'] / max(info['load_s'], 1e-9):,.0f} rows/s)")
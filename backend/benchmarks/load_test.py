@@ -0,0 +1,227 @@
+"""
+Concurrent HTTP load test for the Flask API.
+
+Serves the app from a threaded WSGI server (or targets --url), drives a
+weighted mix of every endpoint from N client threads and reports
+p50/p95/p99 latency, throughput and errors per endpoint. Results go to
+a JSON file; --compare prints the change against an earlier run.
+With --conditional each client keeps the ETags it got and revalidates
+with If-None-Match, like browsers polling an open dashboard.
+
+    cd backend
+    python -m benchmarks.generate --db /tmp/big.db --items 2000 --years 2
+    python -m benchmarks.load_test --db /tmp/big.db --threads 16 --duration 60 --out run.json
+    python -m benchmarks.load_test --db /tmp/big.db --out run2.json --compare run.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import requests
+
+
+# (weight, method, path, body)  body: None, dict, or "bill" for a random bill
+MIX = [
+    (10, "get", "/foods", None),
+    (12, "get", "/billing", None),
+    (5, "post", "/billing", "bill"),
+    (6, "get", "/events", None),
+    (12, "get", "/dashboard", None),
+    (12, "get", "/forecast", None),
+    (3, "get", "/forecast?horizon=7", None),
+    (4, "get", "/forecast/history", None),
+    (6, "get", "/forecast/accuracy", None),
+    (6, "get", "/smart-insights", None),
+    (6, "get", "/waste-cost", None),
+    (8, "get", "/alerts", None),
+    (4, "post", "/ai/chat", {"message": "top selling items"}),
+    (2, "get", "/forecast/export", None),
+    (1, "get", "/reports/export?days=7", None),
+]
+
+
+def start_server(db_path):
+    """Serves main.app on a free local port from a background thread."""
+    import database
+    from werkzeug.serving import make_server
+
+    database.DB_PATH = db_path
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)   # no per-request access log
+    os.environ.setdefault("MODEL_STORE_DIR", os.path.join(tempfile.mkdtemp(), "models"))
+
+    import main
+
+    server = make_server("127.0.0.1", 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def percentiles(ms):
+    if not ms:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    a = np.asarray(ms)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "mean": round(float(a.mean()), 2),
+        "max": round(float(a.max()), 2),
+    }
+
+
+def run_load(base, threads, duration, mix=MIX, seed=1, conditional=False):
+    foods = [f["name"] for f in requests.get(base + "/foods", timeout=60).json()] or ["Tea"]
+    names = [f"{m.upper()} {p}" for _, m, p, _ in mix]
+    weights = [w for w, _, _, _ in mix]
+
+    samples = {n: [] for n in names}   # name -> [(latency_ms, ok)]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        rng = random.Random(seed + i)
+        session = requests.Session()
+        local = {n: [] for n in names}
+        etags = {}
+        while time.perf_counter() < deadline:
+            k = rng.choices(range(len(mix)), weights)[0]
+            _, method, path, body = mix[k]
+            if body == "bill":
+                qty = rng.randint(1, 3)
+                body = {"food_name": rng.choice(foods), "quantity": qty, "total": qty * 40}
+
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else None
+            t0 = time.perf_counter()
+            try:
+                r = session.request(method, base + path, json=body, headers=headers, timeout=300)
+                ok = r.status_code < 400
+                r.content
+                if conditional and "ETag" in r.headers:
+                    etags[path] = r.headers["ETag"]
+            except requests.RequestException:
+                ok = False
+            local[names[k]].append(((time.perf_counter() - t0) * 1000, ok))
+
+        with lock:
+            for n, v in local.items():
+                samples[n].extend(v)
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    endpoints = {}
+    all_ms, all_errors = [], 0
+    for n in names:
+        ms = [m for m, _ in samples[n]]
+        errors = sum(1 for _, ok in samples[n] if not ok)
+        all_ms += ms
+        all_errors += errors
+        endpoints[n] = {
+            "count": len(ms),
+            "errors": errors,
+            "rps": round(len(ms) / elapsed, 2),
+            **percentiles(ms),
+        }
+
+    overall = {
+        "count": len(all_ms),
+        "errors": all_errors,
+        "rps": round(len(all_ms) / elapsed, 2),
+        **percentiles(all_ms),
+    }
+    return endpoints, overall, elapsed
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def print_report(result, previous=None):
+    prev = (previous or {}).get("endpoints", {})
+    head = f"{'endpoint':<34} {'count':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(head + ("  p95 vs prev" if previous else ""))
+
+    rows = list(result["endpoints"].items()) + [("OVERALL", result["overall"])]
+    for name, e in rows:
+        line = (f"{name:<34} {e['count']:>6} {e['errors']:>4} {e['rps']:>8.1f} "
+                f"{e['p50']:>8.1f} {e['p95']:>8.1f} {e['p99']:>8.1f}")
+        before = previous.get("overall") if previous and name == "OVERALL" else prev.get(name)
+        if before and before.get("p95"):
+            line += f"  {(e['p95'] - before['p95']) / before['p95'] * 100:+.0f}%"
+        print(line)
+
+
+def run(db_path, url, threads, duration, out, compare=None, conditional=False):
+    if url:
+        base = url.rstrip("/")
+    else:
+        if not db_path:
+            from benchmarks.generate import generate
+            db_path = os.path.join(tempfile.mkdtemp(), "load.db")
+            generate(db_path, n_items=200, years=1.0, verbose=False)
+        _, base = start_server(db_path)
+
+    # first /forecast trains every model: report it separately
+    t0 = time.perf_counter()
+    requests.get(base + "/forecast", timeout=3600)
+    cold_ms = (time.perf_counter() - t0) * 1000
+    print(f"cold /forecast: {cold_ms:.0f} ms")
+
+    endpoints, overall, elapsed = run_load(base, threads, duration, conditional=conditional)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": url or db_path,
+            "threads": threads,
+            "duration_s": round(elapsed, 2),
+            "cold_forecast_ms": round(cold_ms, 1),
+            "conditional": conditional,
+        },
+        "endpoints": endpoints,
+        "overall": overall,
+    }
+
+    previous = None
+    if compare:
+        with open(compare) as f:
+            previous = json.load(f)
+
+    print_report(result, previous)
+
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Concurrent load test for the API")
+    ap.add_argument("--db", help="SQLite file to serve (see benchmarks.generate); default: generate a small one")
+    ap.add_argument("--url", help="test a running server instead, e.g. http://127.0.0.1:5000")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=30, help="seconds")
+    ap.add_argument("--out", default="load_test.json", help="JSON results file")
+    ap.add_argument("--compare", help="earlier results file to diff against")
+    ap.add_argument("--conditional", action="store_true", help="revalidate GETs with If-None-Match")
+    args = ap.parse_args()
+    run(args.db, args.url, args.threads, args.duration, args.out, args.compare, args.conditional)
@@ -0,0 +1,158 @@
+"""
+EXPLAIN QUERY PLAN regression check.
+
+Drives every endpoint against a small synthetic database, records each
+SQL statement the handlers run (sqlite trace callback) and fails if any
+of them cannot be EXPLAINed or scans a growing table without an index:
+
+  - billing, events, forecast_history, forecast_runs, alerts: never
+  - daily_sales: only whole-history aggregates (no WHERE clause)
+
+    cd backend
+    python -m benchmarks.query_plans        # exit code 1 on regressions
+"""
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+GROWING_TABLES = {"billing", "events", "forecast_history", "forecast_runs", "alerts", "daily_sales"}
+ROLLUP_TABLES = {"daily_sales"}
+
+BARE_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def endpoint_calls():
+    return [
+        ("post", "/auth/login", {"username": "admin", "password": "admin123"}),
+        ("get", "/foods", None),
+        ("post", "/foods", {"name": "Plan Check Dish", "price": 10, "cost_price": 4}),
+        ("get", "/billing", None),
+        ("get", "/billing?limit=20&cursor=WyIyMDMwLTAxLTAxIDAwOjAwOjAwIiw5OTk5OTk5XQ", None),
+        ("get", "/billing?food=Item%2000001&from=2020-01-01&to=2030-01-01&limit=20", None),
+        ("post", "/billing", {"food_name": "Item 00001", "quantity": 2, "total": 100}),
+        ("post", "/billing/bulk", [{"food_name": "Item 00002", "quantity": 1}, {"food_name": "Item 00003"}]),
+        ("get", "/events", None),
+        ("get", "/events?type=Holiday&from=2020-01-01&limit=10", None),
+        ("get", "/events?limit=10&cursor=WyIyMDMwLTAxLTAxIiw5OTk5XQ", None),
+        ("post", "/events", {"event_date": "2030-01-01", "event_type": "Holiday", "title": "Plan", "impact": -1}),
+        ("get", "/dashboard", None),
+        ("get", "/forecast", None),
+        ("post", "/forecast/save", None),
+        ("get", "/forecast/history", None),
+        ("get", "/forecast/history?limit=10&cursor=WyIyMDMwLTAxLTAxIl0&from=2020-01-01", None),
+        ("get", "/forecast/history/2030-01-01", None),
+        ("get", "/forecast/accuracy", None),
+        ("get", "/forecast/export", None),
+        ("get", "/forecast/history/export", None),
+        ("get", "/billing/export?days=7", None),
+        ("get", "/reports/export?gzip=1", None),
+        ("get", "/smart-insights", None),
+        ("get", "/waste-cost", None),
+        ("get", "/alerts", None),
+        ("get", "/alerts?unread=1", None),
+        ("get", "/alerts/unread", None),
+        ("post", "/alerts/1/ack", None),
+        ("post", "/alerts/read-all", None),
+        ("post", "/ai/chat", {"message": "top items"}),
+        ("post", "/ai/chat", {"message": "today revenue"}),
+        ("delete", "/billing/1", None),
+        ("delete", "/events/1", None),
+    ]
+
+
+def capture_statements(main):
+    """Runs every endpoint once and returns {endpoint: [sql, ...]}."""
+    import database
+
+    captured = {}
+    current = {"name": None}
+    original_new_connection = database._new_connection
+
+    def traced_connection():
+        conn = original_new_connection()
+        conn.set_trace_callback(
+            lambda sql: captured.setdefault(current["name"], []).append(sql)
+        )
+        return conn
+
+    # pooled connections are created lazily, so start from an empty pool
+    database.pool.clear()
+    database._new_connection = traced_connection
+    client = main.app.test_client()
+    try:
+        for method, url, body in endpoint_calls():
+            current["name"] = f"{method.upper()} {url}"
+            main.forecast_cache.clear()
+            kwargs = {"json": body} if body is not None else {}
+            # read the body so streamed responses run their queries too
+            getattr(client, method)(url, **kwargs).get_data()
+    finally:
+        database._new_connection = original_new_connection
+        database.pool.clear()
+
+    return captured
+
+
+def plan_problems(conn, sql):
+    """Full scans in the statement's plan; raises sqlite3.Error if it cannot be explained."""
+    stmt = sql.strip()
+    if not re.match(r"(?is)^(SELECT|UPDATE|DELETE|INSERT|WITH)\b", stmt):
+        return []
+
+    plan = conn.execute("EXPLAIN QUERY PLAN " + stmt).fetchall()
+
+    has_where = re.search(r"(?i)\bWHERE\b", stmt) is not None
+    problems = []
+    for row in plan:
+        detail = row[3]
+        m = BARE_SCAN.match(detail)
+        if not m or m.group(1) not in GROWING_TABLES:
+            continue
+        if m.group(1) in ROLLUP_TABLES and not has_where:
+            continue
+        problems.append(detail)
+    return problems
+
+
+def run():
+    tmp = tempfile.mkdtemp()
+    os.environ["MODEL_STORE_DIR"] = os.path.join(tmp, "models")
+
+    from benchmarks.synthetic import load_synthetic_db
+    load_synthetic_db(os.path.join(tmp, "plans.db"), n_rows=20_000, n_items=20, n_days=90)
+
+    import database
+    import main
+
+    captured = capture_statements(main)
+
+    conn = database.get_db()
+    scans, unexplained = 0, 0
+    for endpoint, statements in captured.items():
+        seen = set()
+        for sql in statements:
+            if sql in seen:
+                continue
+            seen.add(sql)
+            try:
+                problems = plan_problems(conn, sql)
+            except sqlite3.Error as e:
+                # a statement we cannot explain is not a checked one
+                unexplained += 1
+                problems = []
+                print(f"❌ {endpoint}: EXPLAIN failed ({e})\n    {' '.join(sql.split())[:200]}")
+            for detail in problems:
+                scans += 1
+                print(f"❌ {endpoint}: {detail}\n    {' '.join(sql.split())[:200]}")
+    conn.close()
+
+    checked = sum(len(set(v)) for v in captured.values())
+    print(f"checked {checked} statements across {len(captured)} endpoints, "
+          f"{scans} full scans, {unexplained} EXPLAIN failures")
+    return scans + unexplained
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run() else 0)
@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_daily_sales(n_items, n_days=60, seed=42, missing_rate=0.1, end=None, slow_share=0.0):
+    """
+    Fake (food_name, day, qty) rows shaped like the forecast SQL output.
+
+    Each item gets its own base level and weekend lift; some days are
+    dropped so the feature builder has gaps to fill. A few items start
+    late so low-data fallbacks are exercised as well. slow_share of the
+    items are slow movers (0.05-1 sold per day, many zero days).
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now().date()
+    days = pd.date_range(end - timedelta(days=n_days - 1), end, freq="D")
+
+    base = rng.uniform(2, 40, n_items)
+    if slow_share:
+        slow = rng.random(n_items) < slow_share
+        base[slow] = rng.uniform(0.05, 1.0, int(slow.sum()))
+    weekend = rng.uniform(1.0, 1.6, n_items)
+    start = np.where(rng.random(n_items) < 0.1, rng.integers(0, n_days, n_items), 0)
+
+    is_weekend = (days.weekday >= 5).astype(float)
+    lam = base[:, None] * (1 + (weekend[:, None] - 1) * is_weekend[None, :])
+    qty = rng.poisson(lam)
+
+    keep = (rng.random(qty.shape) >= missing_rate) & (np.arange(n_days)[None, :] >= start[:, None])
+    keep &= qty > 0
+    item_idx, day_idx = np.nonzero(keep)
+
+    return pd.DataFrame({
+        "food_name": np.array([f"Item {i:05d}" for i in range(n_items)])[item_idx],
+        "day": days[day_idx],
+        "qty": qty[item_idx, day_idx].astype(np.int64),
+    }).sort_values(["food_name", "day"]).reset_index(drop=True)
+
+
+def synthetic_events(n_days=60, seed=42, end=None):
+    """events_map in the same shape load_event_map() returns."""
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now().date()
+    events_map = {}
+    for i in rng.choice(n_days + 1, size=max(1, n_days // 10), replace=False):
+        d = (end - timedelta(days=int(n_days - i))).strftime("%Y-%m-%d")
+        kind = ["holiday", "festival", "exam", "special menu"][int(rng.integers(0, 4))]
+        events_map[d] = {
+            "impact": float(rng.integers(-2, 3)),
+            "is_holiday": int(kind == "holiday"),
+            "is_festival": int(kind == "festival"),
+            "is_exam": int(kind == "exam"),
+            "is_special_menu": int(kind == "special menu"),
+            "title": kind.title(),
+        }
+    return events_map
+
+
+def synthetic_billing_rows(n_rows, n_items=200, n_days=365, seed=42, end=None):
+    """
+    Raw billing tuples (food_name, quantity, total, created_at) spread over
+    the last n_days, for bulk-loading into the billing table.
+    """
+    rng = np.random.default_rng(seed)
+    # billing.created_at defaults to CURRENT_TIMESTAMP, i.e. UTC
+    end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+    start = np.datetime64(end.replace(microsecond=0)) - np.timedelta64(n_days, "D")
+
+    names = np.array([f"Item {i:05d}" for i in range(n_items)])
+    prices = rng.uniform(10, 150, n_items).round(2)
+
+    item = rng.integers(0, n_items, n_rows)
+    qty = rng.choice([1, 2, 3, 4], size=n_rows, p=[0.6, 0.25, 0.1, 0.05])
+    offsets = np.sort(rng.integers(0, n_days * 86400, n_rows))
+    created = (start + offsets.astype("timedelta64[s]")).astype(str)
+    created = np.char.replace(created, "T", " ")
+
+    return list(zip(
+        names[item].tolist(),
+        qty.tolist(),
+        (qty * prices[item]).round(2).tolist(),
+        created.tolist(),
+    ))
+
+
+def load_synthetic_db(path, n_rows, n_items=200, n_days=365, seed=42):
+    """
+    Creates a SQLite database at path with the app schema, n_items foods,
+    n_rows billing rows, a few events and the daily_sales rollup, and
+    points database.DB_PATH at it. Import main only after calling this.
+    """
+    import database
+
+    if os.path.exists(path):
+        os.remove(path)
+    database.DB_PATH = path
+    database.init_db()
+
+    rows = synthetic_billing_rows(n_rows, n_items, n_days, seed)
+    conn = database.get_db()
+    conn.executemany(
+        "INSERT INTO foods (name, price, cost_price) VALUES (?, ?, ?)",
+        [(f"Item {i:05d}", 50.0, 20.0) for i in range(n_items)]
+    )
+    for i in range(0, len(rows), 100_000):
+        conn.executemany(
+            "INSERT INTO billing (food_name, quantity, total, created_at) VALUES (?, ?, ?, ?)",
+            rows[i:i + 100_000]
+        )
+    for d, e in synthetic_events(n_days, seed).items():
+        conn.execute(
+            "INSERT OR IGNORE INTO events (event_date, event_type, title, impact) VALUES (?, ?, ?, ?)",
+            (d, e["title"], e["title"], e["impact"])
+        )
+    database.rebuild_daily_sales(conn)
+    conn.commit()
+    conn.close()
+    return path
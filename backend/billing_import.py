@@ -0,0 +1,202 @@
+"""
+Bulk billing ingestion (end-of-shift POS sync).
+
+Rows come in as a JSON array, NDJSON (one object per line) or CSV with a
+header line. Each row needs food_name and may carry quantity (default 1),
+total (default price * quantity) and created_at (default now, UTC like
+CURRENT_TIMESTAMP). Rows are validated against the foods table, inserted
+with executemany in chunked transactions, and the daily_sales rollup is
+updated once per chunk. Bad rows are reported, never abort the batch.
+"""
+import csv
+import io
+import json
+import math
+import sqlite3
+from datetime import datetime, timezone
+
+from database import apply_daily_sales, bump_version
+
+
+BULK_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("json", "ndjson", "csv")
+
+
+def detect_format(content_type, explicit=None):
+    """json / ndjson / csv from ?format= or the Content-Type header."""
+    if explicit:
+        return explicit.lower() if explicit.lower() in FORMATS else None
+
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "ndjson"
+    if ct in ("text/csv", "application/csv"):
+        return "csv"
+    return "json"
+
+
+def iter_rows(stream, fmt):
+    """
+    Yields (line_no, row) from a binary stream. row is a dict, or an
+    Exception when that line could not be parsed.
+    NDJSON and CSV are read line by line, so large uploads are never
+    held in memory as one string.
+    """
+    if fmt == "json":
+        try:
+            data = json.load(stream)
+        except ValueError as e:
+            yield 1, ValueError(f"invalid JSON: {e}")
+            return
+        if isinstance(data, dict):
+            data = data.get("rows") or data.get("bills") or []
+        if not isinstance(data, list):
+            yield 1, ValueError("expected a JSON array of bills")
+            return
+        for i, row in enumerate(data, start=1):
+            yield i, row
+        return
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "ndjson":
+        for i, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield i, json.loads(line)
+            except ValueError as e:
+                yield i, ValueError(f"invalid JSON: {e}")
+        return
+
+    reader = csv.DictReader(text)
+    for row in reader:
+        # header is line 1
+        yield reader.line_num, row
+
+
+def _food_lookup(conn):
+    """lower(name) -> (name, price)"""
+    return {
+        r["name"].lower(): (r["name"], float(r["price"] or 0))
+        for r in conn.execute("SELECT name, price FROM foods")
+    }
+
+
+def _parse_created_at(value, now):
+    if value is None or str(value).strip() == "":
+        return now
+    dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def validate_row(row, foods, now):
+    """
+    Returns (food_name, quantity, total, created_at) or raises ValueError
+    with a message suitable for the per-row error report.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+
+    raw_name = str(row.get("food_name") or row.get("name") or "").strip()
+    if not raw_name:
+        raise ValueError("food_name required")
+    food = foods.get(raw_name.lower())
+    if food is None:
+        raise ValueError(f"unknown food: {raw_name}")
+    name, price = food
+
+    quantity = row.get("quantity")
+    try:
+        quantity = 1.0 if quantity is None or quantity == "" else float(quantity)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid quantity: {row.get('quantity')}")
+    if not math.isfinite(quantity) or not quantity.is_integer():
+        raise ValueError(f"quantity must be a whole number: {row.get('quantity')}")
+    quantity = int(quantity)
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+
+    total = row.get("total")
+    try:
+        total = price * quantity if total is None or total == "" else float(total)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid total: {row.get('total')}")
+    if not math.isfinite(total):
+        raise ValueError(f"invalid total: {row.get('total')}")
+    if total < 0:
+        raise ValueError("total must not be negative")
+
+    try:
+        created_at = _parse_created_at(row.get("created_at"), now)
+    except ValueError:
+        raise ValueError(f"invalid created_at: {row.get('created_at')}")
+
+    return name, quantity, round(total, 2), created_at
+
+
+def _insert_chunk(conn, chunk):
+    """One transaction: the bills plus their daily_sales deltas."""
+    conn.executemany(
+        "INSERT INTO billing (food_name, quantity, total, created_at) VALUES (?, ?, ?, ?)",
+        [bill for _, bill in chunk]
+    )
+    apply_daily_sales(conn, [
+        {"food_name": name, "day": created_at[:10], "quantity": qty, "total": total}
+        for _, (name, qty, total, created_at) in chunk
+    ])
+    bump_version(conn, "billing")
+    conn.commit()
+
+
+def ingest_bills(conn, rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    rows: iterable of (line_no, row) as produced by iter_rows().
+    Returns {"received", "inserted", "failed", "errors": [{"row", "error"}]}.
+    """
+    foods = _food_lookup(conn)
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    result = {"received": 0, "inserted": 0, "failed": 0, "errors": []}
+
+    def fail(line_no, message):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"row": line_no, "error": message})
+
+    def flush(chunk):
+        try:
+            _insert_chunk(conn, chunk)
+            result["inserted"] += len(chunk)
+        except sqlite3.Error as e:
+            conn.rollback()
+            for line_no, _ in chunk:
+                fail(line_no, f"insert failed: {e}")
+
+    chunk = []
+    for line_no, row in rows:
+        result["received"] += 1
+        if isinstance(row, Exception):
+            fail(line_no, str(row))
+            continue
+        try:
+            chunk.append((line_no, validate_row(row, foods, now)))
+        except ValueError as e:
+            fail(line_no, str(e))
+            continue
+
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+
+    if chunk:
+        flush(chunk)
+
+    if result["failed"] > len(result["errors"]):
+        result["errors_truncated"] = result["failed"] - len(result["errors"])
+    return result
@@ -0,0 +1,101 @@
+"""
+In-process change bus behind the /stream server-sent-events endpoint.
+
+Producers publish a topic's new state once; every subscriber (one per
+open /stream connection) gets it through its own bounded queue. The bus
+keeps the last message per topic, so a new subscriber starts with the
+current state, and identical consecutive states are not re-sent.
+
+    bus.publish("alerts", alerts_list)
+    sub = bus.subscribe({"alerts", "billing"})
+    for chunk in sse_stream(bus, sub): ...
+"""
+import json
+import queue
+import threading
+
+from metrics import inc
+
+
+SUBSCRIBER_QUEUE = 100
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    def __init__(self, topics):
+        self.topics = topics   # set, or None for everything
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def offer(self, message):
+        # a stalled client loses its oldest messages, never blocks publishers
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class ChangeBus:
+    def __init__(self):
+        self._subs = set()
+        self._last = {}   # topic -> (id, event, data_json)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics=None):
+        sub = Subscription(set(topics) if topics else None)
+        with self._lock:
+            self._subs.add(sub)
+            for message in sorted(self._last.values()):
+                if sub.wants(message[1]):
+                    sub.offer(message)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, topic, data):
+        """Sends data to every subscriber of topic unless it is unchanged."""
+        data_json = json.dumps(data, sort_keys=True, default=str)
+        with self._lock:
+            last = self._last.get(topic)
+            if last is not None and last[2] == data_json:
+                return False
+            self._seq += 1
+            message = (self._seq, topic, data_json)
+            self._last[topic] = message
+            subs = [s for s in self._subs if s.wants(topic)]
+        for sub in subs:
+            sub.offer(message)
+        inc("stream_messages_total", topic=topic)
+        return True
+
+    def has(self, topic):
+        return topic in self._last
+
+    @property
+    def subscribers(self):
+        return len(self._subs)
+
+
+def sse_stream(bus, sub, heartbeat=HEARTBEAT_SECONDS):
+    """Yields text/event-stream chunks until the client disconnects."""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                seq, topic, data_json = sub.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield f"id: {seq}\nevent: {topic}\ndata: {data_json}\n\n"
+    finally:
+        bus.unsubscribe(sub)
@@ -1,5 +1,10 @@
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import metrics
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "database.db")
 
@@ -10,6 +15,133 @@ def get_db():
     return conn
 
 
+# ======================================
+# ✅ Connection pool
+# ======================================
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+
+class TimedConnection(sqlite3.Connection):
+    """Reports each execute()/executemany() to metrics (count + duration)."""
+
+    def execute(self, sql, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            metrics.sql_executed(_sql_op(sql), time.perf_counter() - t0)
+
+    def executemany(self, sql, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            metrics.sql_executed(_sql_op(sql), time.perf_counter() - t0)
+
+
+def _sql_op(sql):
+    words = sql.lstrip().split(None, 1)
+    return words[0].upper() if words else ""
+
+
+def _new_connection():
+    conn = sqlite3.connect(
+        DB_PATH, timeout=30, check_same_thread=False,
+        factory=TimedConnection if metrics.enabled else sqlite3.Connection
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared across requests.
+
+    Pragmas are applied once per connection. A connection is used by one
+    thread at a time; nested `with db()` blocks in the same thread reuse
+    the connection already held. On release any uncommitted work is
+    rolled back, so an error half way through a handler never leaks into
+    the next request. Idle connections above `size` are closed.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._path = None
+        self.stats = {"created": 0, "reused": 0}
+
+    def _acquire(self):
+        with self._lock:
+            if self._path != DB_PATH:
+                # DB_PATH switched (tests / benchmarks): drop old connections
+                self._close_idle()
+                self._path = DB_PATH
+            if self._idle:
+                self.stats["reused"] += 1
+                return self._idle.pop()
+            self.stats["created"] += 1
+        return _new_connection()
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+
+        with self._lock:
+            if self._path == DB_PATH and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _close_idle(self):
+        for conn in self._idle:
+            conn.close()
+        self._idle = []
+
+    def clear(self):
+        with self._lock:
+            self._close_idle()
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+
+pool = ConnectionPool()
+
+
+def db():
+    """
+    Pooled connection for request code:
+
+        with db() as conn:
+            ...
+            conn.commit()
+    """
+    return pool.connection()
+
+
 def init_db():
     conn = get_db()
 
@@ -44,6 +176,27 @@ def init_db():
         )
     """)
 
+    # ✅ daily billing rollup (kept in sync by add/delete bill)
+    has_rollup = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='daily_sales'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            food_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            qty INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            bill_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (food_name, day)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_daily_sales_day
+        ON daily_sales(day)
+    """)
+    if not has_rollup:
+        rebuild_daily_sales(conn)
+
     # alerts table
     conn.execute("""
         CREATE TABLE IF NOT EXISTS alerts (
@@ -78,6 +231,30 @@ def init_db():
         ON forecast_history(forecast_date, food_name)
     """)
 
+    # ✅ latest precomputed forecast per date (rows live in forecast_history)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS forecast_runs (
+            forecast_date TEXT PRIMARY KEY,
+            mode TEXT NOT NULL,
+            data_version TEXT NOT NULL,
+            items INTEGER NOT NULL,
+            generated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # ✅ per-item forecaster picked by backtests (FORECAST_ENGINE=auto)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS forecaster_selection (
+            food_name TEXT PRIMARY KEY,
+            method TEXT NOT NULL,
+            lgbm_mae REAL,
+            stat_method TEXT,
+            stat_mae REAL,
+            folds INTEGER NOT NULL,
+            evaluated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # ✅ NEW: EVENTS TABLE (Event-based features)
     conn.execute("""
         CREATE TABLE IF NOT EXISTS events (
@@ -96,6 +273,14 @@ def init_db():
         ON events(event_date, event_type)
     """)
 
+    # ✅ change counters (bumped on every write that affects forecasts)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
     # seed default users
     existing = conn.execute("SELECT COUNT(*) as c FROM users").fetchone()["c"]
     if existing == 0:
@@ -112,5 +297,189 @@ def init_db():
             ("manager", "manager123", "manager")
         )
 
+    migrate_schema(conn)
+
     conn.commit()
     conn.close()
+
+
+# ======================================
+# ✅ schema migrations (PRAGMA user_version)
+# ======================================
+def add_columns(table, columns):
+    """Migration step: ALTER TABLE ADD COLUMN for each missing (name, type)."""
+    def step(conn):
+        existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+    return step
+
+
+MIGRATIONS = [
+    # 1: indexes for the hot listing / filter queries
+    [
+        "CREATE INDEX IF NOT EXISTS idx_billing_created_at ON billing(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_billing_food_created ON billing(food_name, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_forecast_history_date_generated ON forecast_history(forecast_date, generated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_foods_name_nocase ON foods(name COLLATE NOCASE)",
+    ],
+    # 2: keyset pagination / filters on the events listing
+    [
+        "CREATE INDEX IF NOT EXISTS idx_events_date ON events(event_date)",
+        "CREATE INDEX IF NOT EXISTS idx_events_type_date ON events(event_type, event_date)",
+    ],
+    # 3: persisted alerts (dedup key, read / ack / resolved state)
+    [
+        add_columns("alerts", [
+            ("dedup_key", "TEXT"),
+            ("forecast_date", "TEXT"),
+            ("food_name", "TEXT"),
+            ("updated_at", "DATETIME"),
+            ("read_at", "DATETIME"),
+            ("acked_at", "DATETIME"),
+            ("resolved_at", "DATETIME"),
+        ]),
+        "CREATE UNIQUE INDEX IF NOT EXISTS uniq_alerts_dedup_key ON alerts(dedup_key)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_open ON alerts(resolved_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_unread ON alerts(resolved_at, read_at)",
+    ],
+    # 4: scheduler snapshots keyed on training profile / engine; archive
+    # rows record who wrote them ("saved" by users, or "scheduler")
+    [
+        add_columns("forecast_runs", [
+            ("profile", "TEXT"),
+            ("engine", "TEXT"),
+            ("forecasts", "TEXT"),
+        ]),
+        add_columns("forecast_history", [
+            ("source", "TEXT NOT NULL DEFAULT 'saved'"),
+        ]),
+    ],
+]
+
+
+def migrate_schema(conn):
+    """Applies every migration newer than the database's user_version."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, statements in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        for sql in statements:
+            sql(conn) if callable(sql) else conn.execute(sql)
+        conn.execute(f"PRAGMA user_version = {version}")
+
+
+# ======================================
+# ✅ daily_sales rollup
+# ======================================
+def rebuild_daily_sales(conn):
+    """Recomputes daily_sales from the raw billing table."""
+    conn.execute("DELETE FROM daily_sales")
+    conn.execute("""
+        INSERT INTO daily_sales (food_name, day, qty, revenue, bill_count)
+        SELECT food_name, DATE(created_at), SUM(quantity), SUM(total), COUNT(*)
+        FROM billing
+        GROUP BY food_name, DATE(created_at)
+    """)
+
+
+def bills_for_rollup(conn, bill_ids):
+    """Billing rows in the shape apply_daily_sales() expects."""
+    rows = []
+    ids = list(bill_ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows += conn.execute(f"""
+            SELECT food_name, DATE(created_at) as day, quantity, total
+            FROM billing
+            WHERE id IN ({",".join("?" * len(chunk))})
+        """, chunk).fetchall()
+    return rows
+
+
+def apply_daily_sales(conn, bills, sign=1):
+    """
+    Adds (sign=1) or removes (sign=-1) billing rows from daily_sales.
+    bills: rows with food_name, day, quantity, total.
+    Rows are grouped per (food, day) first, so a batch costs one upsert
+    per touched day instead of one per bill.
+    """
+    agg = {}
+    for b in bills:
+        key = (b["food_name"], b["day"])
+        qty, revenue, count = agg.get(key, (0, 0.0, 0))
+        agg[key] = (qty + int(b["quantity"]), revenue + float(b["total"]), count + 1)
+
+    conn.executemany("""
+        INSERT INTO daily_sales (food_name, day, qty, revenue, bill_count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(food_name, day) DO UPDATE SET
+            qty = qty + excluded.qty,
+            revenue = revenue + excluded.revenue,
+            bill_count = bill_count + excluded.bill_count
+    """, [
+        (food, day, sign * qty, sign * revenue, sign * count)
+        for (food, day), (qty, revenue, count) in agg.items()
+    ])
+
+    if sign < 0:
+        conn.executemany("""
+            DELETE FROM daily_sales
+            WHERE food_name = ? AND day = ? AND bill_count <= 0
+        """, list(agg.keys()))
+
+
+def bump_version(conn, name):
+    """
+    Increments the change counter for a table.
+    Call inside the same transaction as the write (before commit).
+    """
+    conn.execute("""
+        INSERT INTO data_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, (name,))
+
+
+def change_counter(conn, name):
+    """Current bump_version() counter for one table (0 if never bumped)."""
+    row = conn.execute("SELECT version FROM data_versions WHERE name=?", (name,)).fetchone()
+    return row["version"] if row else 0
+
+
+def table_version(conn, table):
+    """(max id, change counter) for one table: changes on any insert, and
+    on deletes/updates made through bump_version()."""
+    row = conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()
+    return (row[0], change_counter(conn, table))
+
+
+def data_version(conn):
+    """
+    Current version of the data forecasts depend on:
+    (max billing id, max events id, billing counter, events counter,
+    forecaster selection counter).
+    Max ids catch inserts from any process, counters catch deletes.
+    """
+    row = conn.execute("""
+        SELECT
+            (SELECT IFNULL(MAX(id), 0) FROM billing) as billing_max_id,
+            (SELECT IFNULL(MAX(id), 0) FROM events) as events_max_id,
+            (SELECT IFNULL(MAX(version), 0) FROM data_versions WHERE name='billing') as billing_v,
+            (SELECT IFNULL(MAX(version), 0) FROM data_versions WHERE name='events') as events_v,
+            (SELECT IFNULL(MAX(version), 0) FROM data_versions WHERE name='forecaster_selection') as selection_v
+    """).fetchone()
+    return (row["billing_max_id"], row["events_max_id"], row["billing_v"], row["events_v"], row["selection_v"])
+
+
+if __name__ == "__main__":
+    import sys
+
+    init_db()
+    if "--rebuild-daily-sales" in sys.argv:
+        conn = get_db()
+        rebuild_daily_sales(conn)
+        conn.commit()
+        n = conn.execute("SELECT COUNT(*) as c FROM daily_sales").fetchone()["c"]
+        conn.close()
+        print(f"✅ daily_sales rebuilt ({n} rows)")
@@ -0,0 +1,123 @@
+"""
+Streaming CSV exports.
+
+Rows are read from a cursor with fetchmany() and written out chunk by
+chunk, so memory stays flat no matter how many rows the export covers.
+With gzip=True the chunks go through one streaming zlib compressor.
+"""
+import csv
+import io
+import zlib
+from datetime import datetime, timedelta
+
+from flask import Response, stream_with_context
+
+from database import db
+
+
+EXPORT_FETCH_ROWS = 2000
+
+BILLING_EXPORT_SQL = """
+    SELECT id, food_name, quantity, total, created_at
+    FROM billing
+    WHERE created_at >= ? AND created_at < ?
+    ORDER BY created_at, id
+"""
+
+FORECAST_HISTORY_EXPORT_SQL = """
+    SELECT forecast_date, food_name, avg_last7_qty, predicted_qty,
+           confidence, suggestion, tag, history_points, generated_at
+    FROM forecast_history
+    WHERE forecast_date >= ? AND forecast_date <= ?
+    ORDER BY forecast_date, food_name
+"""
+
+
+def parse_range(args, default_days=30, default_to=None):
+    """
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (both inclusive) or ?days=N ending at
+    `to` (default_to, else today).
+    Returns (from_date, to_date) as date objects; raises ValueError.
+    """
+    if args.get("to"):
+        to_date = datetime.strptime(args["to"], "%Y-%m-%d").date()
+    else:
+        to_date = default_to or datetime.now().date()
+
+    if args.get("from"):
+        from_date = datetime.strptime(args["from"], "%Y-%m-%d").date()
+    else:
+        days = int(args.get("days", default_days))
+        if days <= 0:
+            raise ValueError("days must be positive")
+        from_date = to_date - timedelta(days=days - 1)
+
+    if from_date > to_date:
+        raise ValueError("from must not be after to")
+    return from_date, to_date
+
+
+def _csv_chunks(header, row_batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for rows in row_batches:
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _gzip_chunks(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 -> gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def query_batches(sql, params=(), size=EXPORT_FETCH_ROWS):
+    """Yields lists of rows straight from the cursor, size rows at a time."""
+    with db() as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+
+
+def csv_response(header, row_batches, filename, gzip=False):
+    """Chunked CSV download built from an iterator of row lists."""
+    chunks = _csv_chunks(header, row_batches)
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+        filename += ".gz"
+
+    resp = Response(
+        stream_with_context(chunks),
+        mimetype="application/gzip" if gzip else "text/csv",
+    )
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
+
+
+def billing_export(from_date, to_date, filename, gzip=False):
+    params = (from_date.isoformat(), (to_date + timedelta(days=1)).isoformat())
+    return csv_response(
+        ["id", "food_name", "quantity", "total", "created_at"],
+        query_batches(BILLING_EXPORT_SQL, params),
+        filename, gzip
+    )
+
+
+def forecast_history_export(from_date, to_date, filename, gzip=False):
+    return csv_response(
+        ["date", "food_name", "avg_last7_qty", "predicted_qty", "confidence",
+         "suggestion", "tag", "history_points", "generated_at"],
+        query_batches(FORECAST_HISTORY_EXPORT_SQL, (from_date.isoformat(), to_date.isoformat())),
+        filename, gzip
+    )
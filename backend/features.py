@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+EVENT_COLUMNS = ["event_impact", "is_holiday", "is_festival", "is_exam", "is_special_menu"]
+
+_EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+
+
+def event_matrix(events_map, start_day, n_days):
+    """
+    Date-indexed event features.
+    Row i holds [impact, is_holiday, is_festival, is_exam, is_special_menu]
+    for start_day + i days (start_day as days since epoch).
+    """
+    out = np.zeros((n_days, len(EVENT_COLUMNS)), dtype=np.float64)
+
+    for d_str, e in events_map.items():
+        try:
+            d = datetime.strptime(d_str, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        pos = (d - datetime(1970, 1, 1).date()).days - start_day
+        if 0 <= pos < n_days:
+            out[pos] = [
+                float(e.get("impact", 0.0)),
+                int(e.get("is_holiday", 0)),
+                int(e.get("is_festival", 0)),
+                int(e.get("is_exam", 0)),
+                int(e.get("is_special_menu", 0)),
+            ]
+
+    return out
+
+
+def build_feature_panel(df, events_map):
+    """
+    ✅ Builds forecast features for every item in one pass.
+
+    df: one row per (food_name, day) with columns food_name, day
+        (datetime64), qty.
+
+    Each item gets a continuous daily timeline from its first to its last
+    sale day (missing days -> qty 0), then:
+      t, weekday, lag1..lag3, roll7 and the event columns.
+    Rows without a full lag/rolling window are dropped, same as
+    dropna() in the old per-item loop, so values match it exactly.
+
+    Returns a DataFrame sorted by (food_name, day).
+    """
+    codes, foods = pd.factorize(df["food_name"], sort=True)
+    day_num = df["day"].values.astype("datetime64[D]").astype(np.int64)
+    n_items = len(foods)
+
+    first = np.full(n_items, np.iinfo(np.int64).max, dtype=np.int64)
+    last = np.full(n_items, np.iinfo(np.int64).min, dtype=np.int64)
+    np.minimum.at(first, codes, day_num)
+    np.maximum.at(last, codes, day_num)
+
+    # dense (item x day) panel, items laid out back to back
+    lengths = last - first + 1
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    total = int(lengths.sum())
+
+    item = np.repeat(np.arange(n_items), lengths)
+    t = np.arange(total, dtype=np.int64) - np.repeat(offsets, lengths)
+    day = np.repeat(first, lengths) + t
+
+    qty = np.zeros(total, dtype=np.float64)
+    qty[offsets[codes] + (day_num - first[codes])] = df["qty"].to_numpy(dtype=np.float64)
+
+    # lags / rolling mean inside each item (masked at item boundaries)
+    lags = []
+    for k in (1, 2, 3):
+        lag = np.full(total, np.nan)
+        lag[k:] = qty[:-k]
+        lag[t < k] = np.nan
+        lags.append(lag)
+
+    roll7 = pd.Series(qty).rolling(7).mean().to_numpy(copy=True)
+    roll7[t < 6] = np.nan
+
+    # events via precomputed date-indexed array
+    global_first = int(first.min())
+    ev = event_matrix(events_map, global_first, int(last.max()) - global_first + 1)
+    ev_rows = ev[day - global_first]
+
+    keep = t >= 6
+
+    panel = pd.DataFrame({
+        "food_name": foods[item[keep]],
+        "day": day[keep].astype("datetime64[D]").astype("datetime64[ns]"),
+        "qty": qty[keep],
+        "t": t[keep],
+        "weekday": (day[keep] + _EPOCH_WEEKDAY) % 7,
+        "lag1": lags[0][keep],
+        "lag2": lags[1][keep],
+        "lag3": lags[2][keep],
+        "roll7": roll7[keep],
+    })
+    for i, col in enumerate(EVENT_COLUMNS):
+        panel[col] = ev_rows[keep, i]
+
+    return panel
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+# ======================================
+# ✅ TTL + LRU result cache with single-flight
+# ======================================
+class ResultCache:
+    """
+    Small in-process cache for expensive results (forecasts).
+
+    - entries expire after `ttl` seconds
+    - least recently used entries are evicted above `maxsize`
+    - concurrent callers asking for the same missing key wait on one
+      computation instead of each running it (single-flight)
+
+    Cached values are shared between requests, treat them as read-only.
+    """
+
+    def __init__(self, maxsize=16, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._inflight = {}          # key -> Future
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "waits": 0}
+
+    def get(self, key):
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._put_locked(key, value)
+
+    def _put_locked(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_compute(self, key, fn):
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not None:
+                self.stats["hits"] += 1
+                return value
+
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+                self.stats["misses"] += 1
+            else:
+                self.stats["waits"] += 1
+
+        if not leader:
+            return fut.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        with self._lock:
+            self._put_locked(key, value)
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+forecast_cache = ResultCache(
+    maxsize=int(os.getenv("FORECAST_CACHE_SIZE", "16")),
+    ttl=int(os.getenv("FORECAST_CACHE_TTL", "600")),
+)
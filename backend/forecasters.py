@@ -0,0 +1,219 @@
+"""
+Statistical forecasters for the per-item engine.
+
+Each forecaster takes the whole menu as one SalesMatrix (items x days)
+and returns an items x len(dates) array of predictions. Loops run over
+days and never over items, so the whole menu costs one NumPy pass.
+
+    m = SalesMatrix(df)
+    preds = STAT_FORECASTERS["croston"](m, dates)
+
+With FORECAST_ENGINE=auto they cover the items LightGBM is not worth
+fitting for: cold-start items (too little history for a model) and every
+item whose stored selection (see backtest.select_forecasters) says a
+statistical method did at least as well in backtests. To add a method,
+add a function with the same signature to STAT_FORECASTERS.
+"""
+import numpy as np
+import pandas as pd
+
+from database import bump_version
+
+
+ONE_DAY = np.timedelta64(1, "D")
+
+SEASONAL_WEEKS = 4          # seasonal_weekday: same weekday, last N weeks
+EWMA_ALPHA = 0.3
+HW_ALPHA, HW_BETA, HW_GAMMA, HW_PHI = 0.3, 0.05, 0.2, 0.9
+CROSTON_ALPHA = 0.1
+INTERMITTENT_ADI = 1.32     # average days between sales above this -> intermittent
+
+
+class SalesMatrix:
+    """
+    Daily sales (food_name, day, qty) as an items x days array.
+
+    Days run from the first to the last day in df (or `end`), missing
+    days are 0. first[i] is the column of item i's first sale; earlier
+    columns are not part of its history (active is False there).
+    """
+
+    def __init__(self, df, end=None):
+        codes, foods = pd.factorize(df["food_name"], sort=True)
+        day = df["day"].to_numpy(dtype="datetime64[D]")
+        self.foods = list(foods)
+        self.start = day.min()
+        self.end = np.datetime64(end, "D") if end is not None else day.max()
+
+        n_days = int((self.end - self.start) // ONE_DAY) + 1
+        col = ((day - self.start) // ONE_DAY).astype(np.int64)
+        keep = col < n_days
+
+        self.values = np.zeros((len(foods), n_days), dtype=np.float64)
+        np.add.at(self.values, (codes[keep], col[keep]), df["qty"].to_numpy(dtype=np.float64)[keep])
+
+        self.first = np.full(len(foods), n_days, dtype=np.int64)
+        np.minimum.at(self.first, codes[keep], col[keep])
+        self.active = np.arange(n_days)[None, :] >= self.first[:, None]
+
+        # weekday (Mon=0) of every column
+        self.weekdays = (np.arange(n_days) + (self.start - np.datetime64("1970-01-05")) // ONE_DAY) % 7
+
+    def steps(self, dates):
+        """Days from the last column to each date (1 = the next day)."""
+        return [int((np.datetime64(d, "D") - self.end) // ONE_DAY) for d in dates]
+
+    def history_days(self):
+        return self.active.sum(axis=1)
+
+
+def _weekday(d):
+    return int((np.datetime64(d, "D") - np.datetime64("1970-01-05")) // ONE_DAY) % 7
+
+
+# ======================================
+# ✅ Forecasters
+# ======================================
+def seasonal_weekday(m, dates):
+    """Mean of the same weekday over the last SEASONAL_WEEKS weeks of history."""
+    out = np.zeros((len(m.foods), len(dates)))
+    n_days = m.values.shape[1]
+    for k, d in enumerate(dates):
+        last = n_days - 1 - (int(m.weekdays[-1]) - _weekday(d)) % 7
+        cols = np.arange(last, max(-1, last - 7 * SEASONAL_WEEKS), -7)
+        seen = m.active[:, cols]
+        total = (m.values[:, cols] * seen).sum(axis=1)
+        count = seen.sum(axis=1)
+        out[:, k] = np.divide(total, count, out=np.zeros(len(m.foods)), where=count > 0)
+    return out
+
+
+def ewma(m, dates):
+    """Simple exponential smoothing: the smoothed level, flat over dates."""
+    level = np.full(len(m.foods), np.nan)
+    for t in range(m.values.shape[1]):
+        y, on = m.values[:, t], m.active[:, t]
+        smoothed = np.where(np.isnan(level), y, EWMA_ALPHA * y + (1 - EWMA_ALPHA) * level)
+        level = np.where(on, smoothed, level)
+    level = np.nan_to_num(level)
+    return np.repeat(level[:, None], len(dates), axis=1)
+
+
+def holt_winters(m, dates):
+    """Additive Holt-Winters: level, damped trend and a weekday season."""
+    n = len(m.foods)
+    level = np.zeros(n)
+    trend = np.zeros(n)
+    season = np.zeros((n, 7))
+    started = np.zeros(n, dtype=bool)
+    rows = np.arange(n)
+
+    for t in range(m.values.shape[1]):
+        y, on, w = m.values[:, t], m.active[:, t], int(m.weekdays[t])
+        upd = on & started
+        s = season[:, w]
+
+        new_level = HW_ALPHA * (y - s) + (1 - HW_ALPHA) * (level + HW_PHI * trend)
+        new_trend = HW_BETA * (new_level - level) + (1 - HW_BETA) * HW_PHI * trend
+        season[rows, w] = np.where(upd, HW_GAMMA * (y - new_level) + (1 - HW_GAMMA) * s, s)
+
+        level = np.where(upd, new_level, np.where(on & ~started, y, level))
+        trend = np.where(upd, new_trend, trend)
+        started |= on
+
+    out = np.zeros((n, len(dates)))
+    for k, (d, h) in enumerate(zip(dates, m.steps(dates))):
+        damped = sum(HW_PHI ** i for i in range(1, h + 1))
+        out[:, k] = level + damped * trend + season[:, _weekday(d)]
+    return np.maximum(out, 0.0)
+
+
+def croston(m, dates):
+    """
+    Croston's method (SBA bias correction) for intermittent demand:
+    smooths the size of non-zero sales and the days between them.
+    """
+    n = len(m.foods)
+    size = np.full(n, np.nan)
+    interval = np.full(n, np.nan)
+    since = np.ones(n)
+
+    for t in range(m.values.shape[1]):
+        y, on = m.values[:, t], m.active[:, t]
+        sold = on & (y > 0)
+        fresh = sold & np.isnan(size)
+        upd = sold & ~fresh
+
+        size = np.where(fresh, y, np.where(upd, size + CROSTON_ALPHA * (y - size), size))
+        interval = np.where(fresh, since, np.where(upd, interval + CROSTON_ALPHA * (since - interval), interval))
+        since = np.where(sold, 1.0, np.where(on, since + 1, since))
+
+    rate = (1 - CROSTON_ALPHA / 2) * np.nan_to_num(size) / np.nan_to_num(interval, nan=1.0)
+    return np.repeat(rate[:, None], len(dates), axis=1)
+
+
+STAT_FORECASTERS = {
+    "seasonal_weekday": seasonal_weekday,
+    "ewma": ewma,
+    "holt_winters": holt_winters,
+    "croston": croston,
+}
+
+
+def default_methods(m):
+    """
+    Per-item method when there is no backtest to go by (cold start):
+    croston for intermittent items, holt_winters with two full weeks of
+    history, ewma otherwise.
+    """
+    days = m.history_days()
+    sales = ((m.values > 0) & m.active).sum(axis=1)
+    adi = np.divide(days, sales, out=np.full(len(days), np.inf), where=sales > 0)
+    return np.where(adi > INTERMITTENT_ADI, "croston", np.where(days >= 14, "holt_winters", "ewma"))
+
+
+def stat_forecasts(m, dates, methods):
+    """
+    {food: [prediction per date]} with methods[i] (a STAT_FORECASTERS
+    name) for item i. Each method runs once, over the whole matrix.
+    """
+    methods = np.asarray(methods)
+    preds = np.zeros((len(m.foods), len(dates)))
+    for name in set(methods.tolist()):
+        rows = methods == name
+        preds[rows] = STAT_FORECASTERS[name](m, dates)[rows]
+    return {f: [float(p) for p in preds[i]] for i, f in enumerate(m.foods)}
+
+
+# ======================================
+# ✅ Stored selection (FORECAST_ENGINE=auto)
+# ======================================
+def save_selection(conn, selection, folds):
+    """
+    Replaces the stored per-item choice in one transaction.
+    selection: {food: {"method", "lgbm_mae", "stat_method", "stat_mae"}}.
+    """
+    conn.execute("DELETE FROM forecaster_selection")
+    conn.executemany("""
+        INSERT INTO forecaster_selection (food_name, method, lgbm_mae, stat_method, stat_mae, folds)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        (food, s["method"], s["lgbm_mae"], s["stat_method"], s["stat_mae"], folds)
+        for food, s in selection.items()
+    ])
+    bump_version(conn, "forecaster_selection")
+    conn.commit()
+
+
+def load_selection(conn):
+    """{food: method} ("lgbm" or a STAT_FORECASTERS name)."""
+    rows = conn.execute("SELECT food_name, method FROM forecaster_selection").fetchall()
+    return {r["food_name"]: r["method"] for r in rows}
+
+
+def selection_age_days(conn):
+    """Days since the stored selection was evaluated, None if there is none."""
+    row = conn.execute("""
+        SELECT julianday('now') - julianday(MIN(evaluated_at)) as age FROM forecaster_selection
+    """).fetchone()
+    return row["age"]
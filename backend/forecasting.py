@@ -0,0 +1,773 @@
+import multiprocessing
+import os
+import threading
+import warnings
+warnings.filterwarnings("ignore")
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+from features import build_feature_panel
+from forecasters import SalesMatrix, STAT_FORECASTERS, default_methods, stat_forecasts, load_selection
+from metrics import timed
+from model_registry import registry as model_registry
+
+
+FORECAST_FEATURES = [
+    "t", "weekday", "lag1", "lag2", "lag3", "roll7",
+    "event_impact", "is_holiday", "is_festival", "is_exam", "is_special_menu"
+]
+
+# shared LightGBM settings; trees / learning rate / leaves come from the
+# training profile (see profile_params)
+LGBM_PARAMS = {
+    "n_estimators": 600,
+    "learning_rate": 0.05,
+    "num_leaves": 31,
+    "subsample": 0.9,
+    "colsample_bytree": 0.9,
+    "reg_lambda": 1.0,
+    "random_state": 42,
+    "verbose": -1,
+}
+
+# /forecast and everything derived from it only show the top N items
+FORECAST_TOP_N = 15
+
+# "per_item" = one model per food, "global" = one pooled model
+FORECAST_MODES = ("per_item", "global")
+FORECAST_MODE = os.getenv("FORECAST_MODE", "per_item")
+GLOBAL_MODEL_NAME = "__global__"
+
+# per-item training processes (1 = in-process, 0 = one per CPU core)
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "1"))
+
+# multi-day forecasts: "recursive" feeds predictions back in as lags,
+# "direct" trains one model per step ahead
+FORECAST_MAX_HORIZON = 14
+HORIZON_STRATEGIES = ("recursive", "direct")
+
+# features known at the forecast origin (shifted for direct models)
+ORIGIN_FEATURES = ["lag1", "lag2", "lag3", "roll7"]
+
+# per-item training when an item's rows changed:
+#   "full"        refit from scratch (LGBM_PARAMS trees)
+#   "incremental" if only new days were appended since the model's
+#                 watermark, add FORECAST_UPDATE_TREES trees to it
+#                 (LightGBM init_model); if only the window slid, keep it.
+#                 Changed history or FORECAST_MAX_UPDATES updates in a
+#                 row -> full refit.
+TRAINING_MODES = ("full", "incremental")
+FORECAST_TRAINING = os.getenv("FORECAST_TRAINING", "full")
+FORECAST_UPDATE_TREES = int(os.getenv("FORECAST_UPDATE_TREES", "50"))
+FORECAST_MAX_UPDATES = int(os.getenv("FORECAST_MAX_UPDATES", "7"))
+
+# per-item engine: "lgbm" (default) fits a model for every item with
+# enough rows; "auto" uses the statistical forecasters (forecasters.py)
+# for cold-start items and for items whose stored backtest selection
+# picked one: much faster on menus with many slow movers, but not the
+# same predictions, so it is opt-in
+FORECAST_ENGINES = ("lgbm", "auto")
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "lgbm")
+
+# training profiles: tree budget, learning rate, leaf cap, the
+# early-stopping patience (rounds without improvement on the last
+# VALIDATION_DAYS days of the training window) and whether trees and
+# leaves are scaled down for short histories. "legacy" is the fixed
+# 600-tree model every item got before profiles existed, and stays the
+# default so existing installs forecast as before; opt in to the others
+# with FORECAST_PROFILE.
+TRAINING_PROFILES = {
+    "legacy":   {"n_estimators": 600, "learning_rate": 0.05, "num_leaves": 31, "patience": 0,  "scaled": False},
+    "fast":     {"n_estimators": 150, "learning_rate": 0.1,  "num_leaves": 7,  "patience": 10, "scaled": True},
+    "balanced": {"n_estimators": 400, "learning_rate": 0.05, "num_leaves": 15, "patience": 25, "scaled": True},
+    "accurate": {"n_estimators": 600, "learning_rate": 0.05, "num_leaves": 31, "patience": 50, "scaled": True},
+}
+FORECAST_PROFILE = os.getenv("FORECAST_PROFILE", "legacy")
+VALIDATION_DAYS = 7
+# below this many rows there is no validation tail, only the size caps
+MIN_EARLY_STOPPING_ROWS = 28
+
+
+# ======================================
+# ✅ Helper: load events map
+# ======================================
+def load_event_map(conn, since_days=None):
+    """
+    since_days: only events on/after DATE('now', -since_days) (uses the
+    event_date index); None loads every event.
+
+    Returns:
+      events_map[date_str] = {
+        impact: float,
+        is_holiday: 0/1,
+        is_festival: 0/1,
+        is_exam: 0/1,
+        is_special_menu: 0/1,
+        title: str
+      }
+    """
+    if since_days is None:
+        events = conn.execute("""
+            SELECT event_date, event_type, title, impact
+            FROM events
+        """).fetchall()
+    else:
+        events = conn.execute("""
+            SELECT event_date, event_type, title, impact
+            FROM events
+            WHERE event_date >= DATE('now', ?)
+        """, (f"-{int(since_days)} day",)).fetchall()
+
+    events_map = {}
+
+    for e in events:
+        d = str(e["event_date"])
+        t = (e["event_type"] or "").strip().lower()
+
+        if d not in events_map:
+            events_map[d] = {
+                "impact": 0.0,
+                "is_holiday": 0,
+                "is_festival": 0,
+                "is_exam": 0,
+                "is_special_menu": 0,
+                "title": "",
+            }
+
+        # total impact score (sum if multiple events on same day)
+        events_map[d]["impact"] += float(e["impact"] or 0)
+
+        # type flags
+        if "holiday" in t:
+            events_map[d]["is_holiday"] = 1
+        if "festival" in t:
+            events_map[d]["is_festival"] = 1
+        if "exam" in t:
+            events_map[d]["is_exam"] = 1
+        if "menu" in t or "special" in t:
+            events_map[d]["is_special_menu"] = 1
+
+        # title store
+        if not events_map[d]["title"]:
+            events_map[d]["title"] = str(e["title"] or "")
+
+    return events_map
+
+
+def profile_params(profile, n_rows):
+    """
+    (params, early_stopping_rounds) for one model trained on n_rows rows.
+
+    Short histories get fewer trees and leaves (profiles with "scaled"):
+    at most 5 trees per row (min. 50) and one leaf per 8 rows. LightGBM's 20-row minimum per
+    leaf is kept; letting 15-40 row items split made them overfit in
+    backtests. early_stopping_rounds is 0 when there are too few rows to
+    hold out VALIDATION_DAYS.
+    """
+    if profile not in TRAINING_PROFILES:
+        raise ValueError(f"profile must be one of {tuple(TRAINING_PROFILES)}")
+    p = TRAINING_PROFILES[profile]
+
+    params = dict(LGBM_PARAMS, learning_rate=p["learning_rate"],
+                  n_estimators=p["n_estimators"], num_leaves=p["num_leaves"])
+    if p["scaled"]:
+        params["n_estimators"] = min(p["n_estimators"], max(50, 5 * n_rows))
+        params["num_leaves"] = max(2, min(p["num_leaves"], n_rows // 8))
+
+    patience = p["patience"] if n_rows >= MIN_EARLY_STOPPING_ROWS else 0
+    return params, patience
+
+
+def forecast_date():
+    return (datetime.now() + timedelta(days=1)).date()
+
+
+# ======================================
+# ✅ Forecast (LightGBM + Events)
+# ======================================
+def compute_forecast(conn, tomorrow=None, mode=None, horizon=1, strategy="recursive", training=None,
+                     profile=None, engine=None):
+    """
+    ✅ Forecast with event-based features:
+    - Uses last 60 days of billing data.
+    - Features: time index, weekday, lags, rolling mean
+    - PLUS: event flags and impact score.
+
+    mode: "per_item" (one model per food) or "global" (one pooled
+    model for the whole menu). Defaults to FORECAST_MODE.
+
+    Returns {"date": "YYYY-MM-DD", "mode": mode, "forecasts": [...]} with
+    every item, sorted by predicted_qty (callers slice the top N).
+
+    horizon > 1 adds "horizon", "strategy" and "days": [{"date",
+    "forecasts"}, ...] for tomorrow .. tomorrow + horizon - 1;
+    "forecasts" stays tomorrow's list.
+
+    training: "full" or "incremental" (per-item models), defaults to
+    FORECAST_TRAINING. profile: one of TRAINING_PROFILES, defaults to
+    FORECAST_PROFILE. engine: "lgbm" or "auto" (per-item mode), defaults
+    to FORECAST_ENGINE.
+    """
+    mode = mode or FORECAST_MODE
+    engine = engine or FORECAST_ENGINE
+    with timed("forecast_stage_seconds", stage="load", mode=mode):
+        rows = conn.execute("""
+            SELECT food_name, day, qty
+            FROM daily_sales
+            WHERE day >= DATE('now', '-60 day')
+            ORDER BY day
+        """).fetchall()
+
+        # ✅ load events map (training window + future dates only)
+        events_map = load_event_map(conn, since_days=60)
+
+        selection = load_selection(conn) if engine == "auto" and mode == "per_item" else None
+
+    tomorrow = tomorrow or forecast_date()
+    tomorrow_str = tomorrow.strftime("%Y-%m-%d")
+
+    dates = [tomorrow + timedelta(days=i) for i in range(horizon)]
+
+    if not rows:
+        days = [[] for _ in dates]
+    else:
+        df = pd.DataFrame([dict(r) for r in rows])
+        df["day"] = pd.to_datetime(df["day"])
+        days = forecast_days_from_sales(df, events_map, dates, mode, strategy=strategy, training=training,
+                                        profile=profile, engine=engine, selection=selection)
+
+    fc = {"date": tomorrow_str, "mode": mode, "forecasts": days[0]}
+    if horizon > 1:
+        fc["horizon"] = horizon
+        fc["strategy"] = strategy
+        fc["days"] = [
+            {"date": d.strftime("%Y-%m-%d"), "forecasts": f}
+            for d, f in zip(dates, days)
+        ]
+    return fc
+
+
+def _confidence(points):
+    if points >= 45:
+        return 92
+    if points >= 30:
+        return 85
+    if points >= 20:
+        return 75
+    return 60
+
+
+def _avg7(qty_series):
+    return float(np.mean(qty_series[-7:])) if len(qty_series) >= 7 else float(np.mean(qty_series))
+
+
+def _feature_row(qty_series, next_t, day, events_map):
+    """
+    Feature row (FORECAST_FEATURES order) for `day`, with lags taken from
+    the end of qty_series.
+    """
+    lag1 = float(qty_series[-1])
+    lag2 = float(qty_series[-2]) if len(qty_series) >= 2 else 0.0
+    lag3 = float(qty_series[-3]) if len(qty_series) >= 3 else 0.0
+    roll7 = _avg7(qty_series)
+
+    # target day event
+    e = events_map.get(day.strftime("%Y-%m-%d"), {})
+    ev_impact = float(e.get("impact", 0.0))
+    is_holiday = int(e.get("is_holiday", 0))
+    is_festival = int(e.get("is_festival", 0))
+    is_exam = int(e.get("is_exam", 0))
+    is_special_menu = int(e.get("is_special_menu", 0))
+
+    return [
+        next_t,
+        day.weekday(),
+        lag1, lag2, lag3,
+        roll7,
+        ev_impact, is_holiday, is_festival, is_exam, is_special_menu
+    ]
+
+
+def _rollout(foods, groups, dates, events_map, strategy, predict):
+    """
+    Predictions for every date in `dates` (consecutive days from
+    tomorrow) for each food, from one trained model set.
+
+    recursive: step k uses the predictions for steps < k as its lags,
+               always with the one-step model (predict(1, ...)).
+    direct:    every step keeps the actual lags at the forecast origin
+               and uses the model trained k steps ahead (predict(k, ...)).
+
+    predict(h, foods, rows) -> array of predictions for those rows.
+    Returns {food: (avg7, [prediction per date])}.
+    """
+    history, next_t, preds = {}, {}, {}
+    for food_name in foods:
+        g = groups[food_name]
+        history[food_name] = [float(q) for q in g["qty"].values]
+        next_t[food_name] = int(g["t"].iloc[-1] + 1)
+        preds[food_name] = []
+
+    for k, day in enumerate(dates):
+        rows = []
+        for food_name in foods:
+            qty_series = history[food_name]
+            if strategy == "recursive":
+                qty_series = qty_series + preds[food_name]
+            rows.append(_feature_row(qty_series, next_t[food_name] + k, day, events_map))
+
+        h = k + 1 if strategy == "direct" else 1
+        for food_name, p in zip(foods, predict(h, foods, rows)):
+            preds[food_name].append(max(0.0, float(p)))
+
+    return {f: (_avg7(history[f]), preds[f]) for f in foods}
+
+
+def _direct_training_set(X, h, by=None):
+    """
+    Training frame for the model h days ahead: origin features (lags,
+    roll7) come from h - 1 rows earlier, the rest from the target row.
+    X is one item's rows, or the whole panel grouped by `by`.
+    """
+    if h == 1:
+        return X
+    X = X.copy()
+    shifted = X[ORIGIN_FEATURES].groupby(by) if by is not None else X[ORIGIN_FEATURES]
+    X[ORIGIN_FEATURES] = shifted.shift(h - 1)
+    return X[X["lag1"].notna()]
+
+
+def _model_name(name, h, profile=None):
+    name = name if h == 1 else f"{name}#h{h}"
+    # other profiles get their own registry entries, so a one-off
+    # ?train_profile= request does not evict the default models
+    return name if profile in (None, FORECAST_PROFILE) else f"{name}@{profile}"
+
+
+# ======================================
+# ✅ Parallel training (process pool)
+# ======================================
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def _train_pool(workers):
+    # spawn, not fork: forking after LightGBM/OpenMP started threads can hang
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pools[workers] = pool
+        return pool
+
+
+def _fit_booster(X, y, params, init_model=None, valid=None, early_stopping_rounds=0,
+                 categorical_feature="auto"):
+    """
+    Same model as LGBMRegressor(**params).fit(X, y), without its model
+    text round trip at the end. init_model: booster to keep boosting
+    from (its trees are kept, n_estimators more are added).
+
+    valid: boolean mask of the validation rows (the latest days). With
+    early_stopping_rounds, a first fit on the other rows picks the number
+    of trees on them (up to n_estimators), then the model is refitted on
+    every row with that many trees, so the newest days are not lost.
+    """
+    params = dict(params, objective="regression")
+    rounds = params.pop("n_estimators")
+
+    if early_stopping_rounds and valid is not None and valid.any() and not valid.all():
+        train_set = lgb.Dataset(X[~valid], y[~valid], categorical_feature=categorical_feature)
+        probe = lgb.train(
+            params, train_set, num_boost_round=rounds,
+            valid_sets=[lgb.Dataset(X[valid], y[valid], reference=train_set)],
+            callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)]
+        )
+        rounds = max(1, probe.best_iteration)
+
+    booster = lgb.train(
+        params, lgb.Dataset(X, y, categorical_feature=categorical_feature), num_boost_round=rounds,
+        init_model=init_model, keep_training_booster=True
+    )
+    booster.free_dataset()
+    return booster
+
+
+def _tail_mask(n_rows, early_stopping_rounds):
+    """Last VALIDATION_DAYS rows of one item's (daily, time-ordered) rows."""
+    if not early_stopping_rounds:
+        return None
+    return np.arange(n_rows) >= n_rows - VALIDATION_DAYS
+
+
+def _fit_model_string(job):
+    """Worker side: fit on plain arrays, ship the model back as text."""
+    X, y, params, init_model, early_stopping_rounds = job
+    if init_model is not None:
+        init_model = lgb.Booster(model_str=init_model)
+    booster = _fit_booster(
+        X, y, params, init_model,
+        _tail_mask(len(y), early_stopping_rounds), early_stopping_rounds
+    )
+    return booster.model_to_string()
+
+
+def _resolve_workers(workers):
+    workers = FORECAST_WORKERS if workers is None else int(workers)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+# ======================================
+# ✅ Training watermarks (incremental mode)
+# ======================================
+# one checksum per training row over every feature except t (t is
+# counted from the window start, so it shifts when the window slides)
+# plus the target
+_CHECK_COLUMNS = [i for i, c in enumerate(FORECAST_FEATURES) if c != "t"]
+_CHECK_WEIGHTS = np.random.default_rng(0).uniform(1.0, 2.0, len(_CHECK_COLUMNS) + 1)
+
+
+def _row_checks(X, y):
+    return np.column_stack([X[:, _CHECK_COLUMNS], y]) @ _CHECK_WEIGHTS
+
+
+def _watermark(days, checks, profile, updates=0):
+    """What a model was trained on: first day + one checksum per (daily) row."""
+    return {"start": str(days[0]), "checks": checks.tolist(), "profile": profile, "updates": updates}
+
+
+def _plan_update(mark, days, checks, profile):
+    """
+    Compares a model's watermark with the current training rows.
+
+    "reuse":  rows up to the watermark unchanged, no new days
+    "update": rows up to the watermark unchanged, new days appended
+    None:     history changed (edited/deleted bills, event edits), the
+              profile changed or the model has had FORECAST_MAX_UPDATES
+              updates -> full refit
+    """
+    if mark is None or mark.get("profile") != profile:
+        return None
+    old = np.asarray(mark["checks"], dtype=np.float64)
+    old_start = np.datetime64(mark["start"], "D")
+    old_end = old_start + (len(old) - 1)
+
+    start = max(days[0], old_start)
+    if old_end < start or days[-1] < old_end:
+        return None
+    one_day = np.timedelta64(1, "D")
+    n = (old_end - start) // one_day + 1
+    i, j = (start - days[0]) // one_day, (start - old_start) // one_day
+    if not np.allclose(checks[i:i + n], old[j:j + n], rtol=1e-9, atol=0.0):
+        return None
+
+    if days[-1] == old_end:
+        return "reuse"
+    return "update" if mark.get("updates", 0) < FORECAST_MAX_UPDATES else None
+
+
+def _fit_models(jobs, workers, registry, training=None, profile=None):
+    """
+    jobs: [(registry_name, X, y, window, days)] -> {registry_name: booster}.
+    days are the (consecutive) dates of the rows, for the watermarks.
+    Models not in the registry are fitted with the profile's settings
+    for their size (or, in incremental mode, continued) across a process
+    pool when workers > 1 (LightGBM threads are split between workers).
+    """
+    training = training or FORECAST_TRAINING
+    if training not in TRAINING_MODES:
+        raise ValueError(f"training must be one of {TRAINING_MODES}")
+    profile = profile or FORECAST_PROFILE
+
+    models = {}
+    todo = []   # (name, fp, X, y, params, patience, booster to continue or None, watermark)
+    reused = 0
+
+    for name, X, y, window, days in jobs:
+        params, patience = profile_params(profile, len(y))
+
+        # ✅ reuse stored model unless this training data changed
+        fp, model = registry.lookup(name, X, y, params, window=window,
+                                    fit_params={"early_stopping_rounds": patience})
+        if model is not None:
+            models[name] = model
+            continue
+
+        checks = _row_checks(X, y)
+        if training == "incremental":
+            mark, model = registry.watermark(name)
+            plan = _plan_update(mark, days, checks, profile)
+            if plan == "reuse":
+                models[name] = model
+                reused += 1
+                continue
+            if plan == "update":
+                # no early stopping here: a fixed number of extra trees
+                todo.append((name, fp, X, y, dict(params, n_estimators=FORECAST_UPDATE_TREES), 0, model,
+                             _watermark(days, checks, profile, mark["updates"] + 1)))
+                continue
+        todo.append((name, fp, X, y, params, patience, None, _watermark(days, checks, profile)))
+
+    if todo:
+        if workers > 1 and len(todo) > 1:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            pool = _train_pool(workers)
+            fitted = pool.map(
+                _fit_model_string,
+                [
+                    (X, y, dict(params, n_jobs=threads),
+                     None if init is None else init.model_to_string(), patience)
+                    for _, _, X, y, params, patience, init, _ in todo
+                ],
+                chunksize=max(1, len(todo) // (workers * 4))
+            )
+            boosters = [lgb.Booster(model_str=m) for m in fitted]
+        else:
+            boosters = [
+                _fit_booster(X, y, params, init, _tail_mask(len(y), patience), patience)
+                for _, _, X, y, params, patience, init, _ in todo
+            ]
+
+        for (name, fp, _, _, _, _, init, mark), booster in zip(todo, boosters):
+            registry.store(name, fp, booster, watermark=mark, updated=init is not None)
+            models[name] = booster
+
+    if reused:
+        registry.reused(reused)
+    registry.flush()
+    return models
+
+
+def _predict_per_item(foods, groups, dates, events_map, workers=None, strategy="recursive", registry=None,
+                      training=None, profile=None, matrix=None, selection=None):
+    """
+    One LightGBM model per item (per step ahead for strategy="direct");
+    items under 15 rows get the 7-day mean for every date.
+
+    With a SalesMatrix (engine "auto"), items under 15 rows and items
+    whose selection names a STAT_FORECASTERS method get that method (or
+    forecasters.default_methods) instead, all in one pass.
+    """
+    workers = _resolve_workers(workers)
+    profile = profile or FORECAST_PROFILE
+    selection = selection or {}
+    steps = len(dates) if strategy == "direct" else 1
+    out = {}
+    jobs = []
+    stat_items = {}   # food -> selected method, None = default for its history
+
+    for food_name in foods:
+        g = groups[food_name]
+        method = selection.get(food_name)
+
+        if matrix is not None and (len(g) < 15 or method in STAT_FORECASTERS):
+            stat_items[food_name] = method if method in STAT_FORECASTERS else None
+            continue
+
+        # fallback for low data
+        if len(g) < 15:
+            qty_series = g["qty"].values if len(g) else np.array([0.0])
+            avg7 = float(np.mean(qty_series[-7:])) if len(qty_series) else 0.0
+            out[food_name] = (avg7, [avg7] * len(dates), 55, int(len(g)))
+            continue
+
+        window = (g["day"].iloc[0].date(), g["day"].iloc[-1].date())
+        for h in range(1, steps + 1):
+            Xh = _direct_training_set(g, h)
+            jobs.append((
+                _model_name(food_name, h, profile),
+                Xh[FORECAST_FEATURES].to_numpy(dtype=np.float64),
+                Xh["qty"].to_numpy(dtype=np.float64),
+                window,
+                Xh["day"].to_numpy(dtype="datetime64[D]")
+            ))
+
+    with timed("forecast_stage_seconds", stage="fit", mode="per_item"):
+        models = _fit_models(jobs, workers, registry or model_registry, training, profile)
+
+    if stat_items:
+        with timed("forecast_stage_seconds", stage="stat", mode="per_item"):
+            methods = [stat_items.get(f) or d for f, d in zip(matrix.foods, default_methods(matrix))]
+            stat_preds = stat_forecasts(matrix, dates, methods)
+        for food_name in stat_items:
+            g = groups[food_name]
+            points = int(len(g))
+            avg7 = _avg7(g["qty"].values) if points else 0.0
+            out[food_name] = (avg7, stat_preds[food_name], _confidence(points) if points >= 15 else 55, points)
+
+    modelled = [f for f in foods if f not in out]
+
+    def predict(h, names, rows):
+        return [
+            models[_model_name(f, h, profile)].predict(np.array([row]))[0]
+            for f, row in zip(names, rows)
+        ]
+
+    with timed("forecast_stage_seconds", stage="predict", mode="per_item"):
+        rolled = _rollout(modelled, groups, dates, events_map, strategy, predict)
+
+    for food_name, (avg7, preds) in rolled.items():
+        points = int(len(groups[food_name]))
+        out[food_name] = (avg7, preds, _confidence(points), points)
+
+    return out
+
+
+def _predict_global(foods, groups, panel, dates, events_map, strategy="recursive", registry=None, profile=None):
+    """
+    ✅ One pooled LightGBM model over all items (per step ahead for
+    strategy="direct").
+    item_id is a categorical feature, so sparse items still get a real
+    model; only items with no usable rows fall back to zero.
+    """
+    out = {}
+    if panel.empty:
+        return {f: (0.0, [0.0] * len(dates), 55, 0) for f in foods}
+
+    item_ids = {f: i for i, f in enumerate(foods)}
+    window = (panel["day"].min().date(), panel["day"].max().date())
+    steps = len(dates) if strategy == "direct" else 1
+    registry = registry or model_registry
+    profile = profile or FORECAST_PROFILE
+    valid_from = panel["day"].max() - pd.Timedelta(days=VALIDATION_DAYS - 1)
+
+    models = {}
+    with timed("forecast_stage_seconds", stage="fit", mode="global"):
+        for h in range(1, steps + 1):
+            Xh = _direct_training_set(panel, h, by=panel["food_name"])
+            X = Xh[FORECAST_FEATURES].copy()
+            X["item_id"] = Xh["food_name"].map(item_ids).astype(np.int64)
+            y = Xh["qty"]
+
+            name = _model_name(GLOBAL_MODEL_NAME, h, profile)
+            params, patience = profile_params(profile, len(y))
+            fp, models[h] = registry.lookup(
+                name, X, y, params, window=window,
+                fit_params={"categorical_feature": ["item_id"], "early_stopping_rounds": patience}
+            )
+            if models[h] is None:
+                # validation tail: the last VALIDATION_DAYS days, all items
+                models[h] = _fit_booster(
+                    X, y, params, valid=(Xh["day"] >= valid_from).to_numpy(),
+                    early_stopping_rounds=patience, categorical_feature=["item_id"]
+                )
+                registry.store(name, fp, models[h])
+
+    modelled = []
+    for food_name in foods:
+        if len(groups[food_name]) == 0:
+            out[food_name] = (0.0, [0.0] * len(dates), 55, 0)
+        else:
+            modelled.append(food_name)
+
+    def predict(h, names, rows):
+        rows = [row + [item_ids[f]] for f, row in zip(names, rows)]
+        return models[h].predict(np.array(rows, dtype=np.float64))
+
+    if modelled:
+        with timed("forecast_stage_seconds", stage="predict", mode="global"):
+            rolled = _rollout(modelled, groups, dates, events_map, strategy, predict)
+        for food_name, (avg7, preds) in rolled.items():
+            points = int(len(groups[food_name]))
+            out[food_name] = (avg7, preds, _confidence(points), points)
+
+    return out
+
+
+def forecast_from_sales(df, events_map, tomorrow, mode=None, workers=None, training=None, profile=None):
+    """
+    Forecast rows for tomorrow from daily sales (food_name, day, qty).
+    Sorted by predicted_qty, highest first.
+    """
+    return forecast_days_from_sales(df, events_map, [tomorrow], mode, workers,
+                                    training=training, profile=profile)[0]
+
+
+def forecast_days_from_sales(df, events_map, dates, mode=None, workers=None, strategy="recursive",
+                             registry=None, training=None, profile=None, engine=None, selection=None):
+    """
+    Forecast rows for each of `dates` (consecutive days starting
+    tomorrow) from one set of trained models. Returns one list per
+    date, each sorted by predicted_qty, highest first.
+
+    registry: ModelRegistry to reuse/store models in (default: the
+    shared one; backtests pass their own so they never evict it).
+    training: "full" / "incremental" for per-item models (see
+    FORECAST_TRAINING); the global model is always refitted in full.
+    profile: one of TRAINING_PROFILES (default FORECAST_PROFILE).
+    engine: "lgbm" / "auto" for per-item mode (default FORECAST_ENGINE);
+    selection: {food: method} from forecasters.load_selection (auto only).
+    """
+    mode = mode or FORECAST_MODE
+    if mode not in FORECAST_MODES:
+        raise ValueError(f"mode must be one of {FORECAST_MODES}")
+    if strategy not in HORIZON_STRATEGIES:
+        raise ValueError(f"strategy must be one of {HORIZON_STRATEGIES}")
+    profile = profile or FORECAST_PROFILE
+    if profile not in TRAINING_PROFILES:
+        raise ValueError(f"profile must be one of {tuple(TRAINING_PROFILES)}")
+    engine = engine or FORECAST_ENGINE
+    if engine not in FORECAST_ENGINES:
+        raise ValueError(f"engine must be one of {FORECAST_ENGINES}")
+
+    with timed("forecast_stage_seconds", stage="features", mode=mode):
+        df = df.sort_values(["food_name", "day"]).reset_index(drop=True)
+
+        # ✅ features for all items at once
+        panel = build_feature_panel(df, events_map)
+        by_name = {name: g for name, g in panel.groupby("food_name", sort=False)}
+
+        foods = sorted(df["food_name"].unique())
+        groups = {f: by_name.get(f, panel.iloc[0:0]).reset_index(drop=True) for f in foods}
+
+        matrix = SalesMatrix(df) if engine == "auto" and mode == "per_item" else None
+
+    if mode == "global":
+        results = _predict_global(foods, groups, panel, dates, events_map, strategy, registry, profile)
+    else:
+        results = _predict_per_item(foods, groups, dates, events_map, workers, strategy, registry, training,
+                                    profile, matrix, selection)
+
+    days = []
+    for i in range(len(dates)):
+        forecasts = []
+
+        for food_name in foods:
+            avg7, preds, confidence, points = results[food_name]
+            predicted = preds[i]
+
+            # suggestion logic
+            if predicted > avg7 * 1.15:
+                suggestion = "Increase"
+                tag = "HIGH_DEMAND"
+            elif predicted < avg7 * 0.85:
+                suggestion = "Reduce"
+                tag = "OVERPRODUCTION_RISK"
+            else:
+                suggestion = "Maintain"
+                tag = "STABLE"
+
+            forecasts.append({
+                "food_name": food_name,
+                "avg_last7_qty": round(float(avg7), 2),
+                "predicted_qty": round(float(predicted), 2),
+                "confidence": confidence,
+                "suggestion": suggestion,
+                "tag": tag,
+                "history_points": points
+            })
+
+        forecasts.sort(key=lambda x: x["predicted_qty"], reverse=True)
+        days.append(forecasts)
+
+    return days
@@ -1,98 +1,117 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, g, Response, send_file
 from flask_cors import CORS
-from database import get_db, init_db
+from database import (
+    db, init_db, bump_version, data_version, change_counter, table_version,
+    apply_daily_sales, bills_for_rollup, rebuild_daily_sales,
+    pool as db_pool
+)
+from metrics import metrics
+import profiling
+from model_registry import registry as model_registry
+from forecast_cache import forecast_cache
+from assistant import (
+    GeminiClient, ChatReplies, AssistantFacts, sales_facts, local_reply,
+    build_prompt, HELP_REPLY, PENDING_REPLY
+)
+from exports import (
+    csv_response, parse_range, billing_export, forecast_history_export
+)
+from http_cache import conditional
+from change_bus import ChangeBus, sse_stream
+from alerts import alert_rules, sync_alerts, open_alerts, unread_counts, mark_alerts
+from pagination import wants_page, page_args, date_args, keyset_page, envelope
+from billing_import import detect_format, iter_rows, ingest_bills, FORMATS as BULK_FORMATS
+from scheduler import ForecastScheduler, load_snapshot
+from backtest import run_backtest, load_sales, BACKTEST_MODELS
+from forecasting import (
+    compute_forecast, forecast_date, load_event_map,
+    FORECAST_TOP_N, FORECAST_MODE, FORECAST_MODES,
+    FORECAST_MAX_HORIZON, HORIZON_STRATEGIES, FORECAST_PROFILE, FORECAST_ENGINE, TRAINING_PROFILES
+)
 import warnings
 warnings.filterwarnings("ignore")
-import lightgbm as lgb
-lgb.basic._log_warning = lambda msg: None
 
-
-import io
-import csv
+import multiprocessing
 import random
+import time
 from datetime import datetime, timedelta
 from datetime import datetime, timedelta
 import numpy as np
 import os
-import requests
-import pandas as pd
 from dotenv import load_dotenv
 
 app = Flask(__name__)
 CORS(app)
 
 init_db()
+model_registry.load_index()
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
+AI_CHAT_WAIT = float(os.getenv("AI_CHAT_WAIT", "8"))
 
+# ✅ Gemini calls run on their own I/O pool, replies cached per data version
+gemini = GeminiClient(GEMINI_API_KEY)
+chat_replies = ChatReplies(gemini)
 
-# ======================================
-# ✅ Safe DB connection
-# ======================================
-def db():
-    conn = get_db()
-    try:
-        conn.execute("PRAGMA foreign_keys = ON;")
-        conn.execute("PRAGMA journal_mode = WAL;")
-    except:
-        pass
-    return conn
+# ✅ background forecast precompute
+# (skipped in the debug reloader parent and in training pool workers)
+if (
+    os.getenv("FORECAST_SCHEDULER", "0") == "1"
+    and multiprocessing.current_process().name == "MainProcess"
+    and (__name__ != "__main__" or os.getenv("WERKZEUG_RUN_MAIN") == "true")
+):
+    ForecastScheduler().start()
 
 
-# ======================================
-# ✅ Helper: load events map
-# ======================================
-def load_event_map(conn):
-    """
-    Returns:
-      events_map[date_str] = {
-        impact: float,
-        is_holiday: 0/1,
-        is_festival: 0/1,
-        is_exam: 0/1,
-        is_special_menu: 0/1,
-        title: str
-      }
-    """
-    events = conn.execute("""
-        SELECT event_date, event_type, title, impact
-        FROM events
-    """).fetchall()
-
-    events_map = {}
-
-    for e in events:
-        d = str(e["event_date"])
-        t = (e["event_type"] or "").strip().lower()
-
-        if d not in events_map:
-            events_map[d] = {
-                "impact": 0.0,
-                "is_holiday": 0,
-                "is_festival": 0,
-                "is_exam": 0,
-                "is_special_menu": 0,
-                "title": "",
-            }
-
-        # total impact score (sum if multiple events on same day)
-        events_map[d]["impact"] += float(e["impact"] or 0)
-
-        # type flags
-        if "holiday" in t:
-            events_map[d]["is_holiday"] = 1
-        if "festival" in t:
-            events_map[d]["is_festival"] = 1
-        if "exam" in t:
-            events_map[d]["is_exam"] = 1
-        if "menu" in t or "special" in t:
-            events_map[d]["is_special_menu"] = 1
-
-        # title store
-        if not events_map[d]["title"]:
-            events_map[d]["title"] = str(e["title"] or "")
-
-    return events_map
+# ============================
+# ✅ METRICS
+# ============================
+
+@app.before_request
+def _metrics_start():
+    if metrics.enabled:
+        g.metrics_t0 = time.perf_counter()
+        metrics.start_request()
+
+
+@app.after_request
+def _metrics_finish(response):
+    t0 = g.get("metrics_t0")
+    if t0 is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - t0,
+                        endpoint=endpoint, method=request.method)
+        metrics.observe("http_request_sql_queries", metrics.request_sql_count(), endpoint=endpoint)
+        metrics.inc("http_requests_total", endpoint=endpoint, method=request.method,
+                    status=str(response.status_code))
+    return response
+
+
+def _cache_metrics():
+    hits, misses = forecast_cache.stats["hits"], forecast_cache.stats["misses"]
+    return [
+        ("forecast_cache_requests_total", "counter", "Forecast cache lookups by result",
+         {(("result", k),): v for k, v in forecast_cache.stats.items()}),
+        ("forecast_cache_hit_ratio", "gauge", "Forecast cache hits / lookups",
+         {(): round(hits / (hits + misses), 4) if hits + misses else 0}),
+        ("model_registry_events_total", "counter", "Model registry hits, loads from disk, fits, incremental updates and reuses",
+         {(("event", k),): v for k, v in model_registry.stats.items()}),
+        ("db_pool_connections_total", "counter", "Pooled connections created vs reused",
+         {(("event", k),): v for k, v in db_pool.stats.items()}),
+        ("stream_subscribers", "gauge", "Open /stream connections",
+         {(): bus.subscribers}),
+        ("assistant_facts_total", "counter", "Assistant facts snapshot reads and rebuilds",
+         {(("event", k),): v for k, v in assistant_facts.stats.items()}),
+    ]
+
+
+metrics.register_collector(_cache_metrics)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus text format (METRICS_ENABLED=0 turns recording off)."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 # ============================
@@ -105,12 +124,11 @@ def login():
     username = data.get("username", "")
     password = data.get("password", "")
 
-    conn = db()
-    user = conn.execute(
-        "SELECT id, username, role FROM users WHERE username=? AND password=?",
-        (username, password)
-    ).fetchone()
-    conn.close()
+    with db() as conn:
+        user = conn.execute(
+            "SELECT id, username, role FROM users WHERE username=? AND password=?",
+            (username, password)
+        ).fetchone()
 
     if not user:
         return jsonify({"message": "Invalid username/password"}), 401
@@ -131,21 +149,107 @@ def me():
     return jsonify({"username": username, "role": role})
 
 
+def _is_admin():
+    """Bearer token from /auth/login belongs to an existing admin user."""
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
+    if "::" not in token:
+        return False
+    username, role = token.split("::", 1)
+    if role != "admin":
+        return False
+    with db() as conn:
+        user = conn.execute(
+            "SELECT id FROM users WHERE username=? AND role='admin'", (username,)
+        ).fetchone()
+    return user is not None
+
+
+# ============================
+# ✅ PROFILING (admin only)
+# ============================
+
+@app.before_request
+def _profile_start():
+    kind = profiling.requested_kind(request.args, request.headers)
+    if kind and _is_admin():
+        g.profile = profiling.RequestProfile(kind)
+
+
+@app.after_request
+def _profile_finish(response):
+    prof = g.pop("profile", None)
+    if prof is not None:
+        try:
+            response.headers["X-Profile-Id"] = prof.finish(request.method, request.path)
+        except Exception as e:
+            print("⚠️ profile save failed:", e)
+    return response
+
+
+@app.route("/admin/profiles", methods=["GET"])
+def admin_profiles():
+    if not _is_admin():
+        return jsonify({"message": "Admin only"}), 403
+    return jsonify(profiling.list_profiles())
+
+
+@app.route("/admin/profiles/<profile_id>", methods=["GET"])
+def admin_profile_get(profile_id):
+    """
+    Raw file (.pstats for snakeviz / pstats, .collapsed for flamegraph.pl /
+    speedscope); ?format=text renders a .pstats as a cumulative-time table.
+    """
+    if not _is_admin():
+        return jsonify({"message": "Admin only"}), 403
+
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        return jsonify({"message": "Profile not found"}), 404
+
+    if request.args.get("format") == "text" and path.endswith(".pstats"):
+        return Response(profiling.pstats_text(path), mimetype="text/plain")
+    return send_file(path, as_attachment=True, download_name=profile_id)
+
+
 # ============================
 # EVENTS API  ✅ NEW
 # ============================
 
 @app.route("/events", methods=["GET"])
 def events_list():
-    conn = db()
-    rows = conn.execute("""
-        SELECT id, event_date, event_type, title, impact, created_at
-        FROM events
-        ORDER BY event_date DESC
-        LIMIT 120
-    """).fetchall()
-    conn.close()
-    return jsonify([dict(r) for r in rows])
+    """
+    Latest 120 events as a list. ?limit=, ?cursor=, ?from=, ?to= (event
+    date) or ?type= return a page instead: {items, next_cursor, limit}.
+    """
+    try:
+        limit, after = page_args(request.args, default_limit=120)
+        date_from, date_to = date_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    where, params = [], []
+    if request.args.get("type"):
+        where.append("event_type = ?")
+        params.append(request.args["type"].strip())
+    if date_from:
+        where.append("event_date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("event_date <= ?")
+        params.append(date_to)
+
+    with db() as conn:
+        rows, next_cursor = keyset_page(
+            conn,
+            "SELECT id, event_date, event_type, title, impact, created_at FROM events",
+            where, params, "event_date DESC, id DESC", after, limit,
+            key=lambda r: (r["event_date"], r["id"]),
+        )
+
+    items = [dict(r) for r in rows]
+    if not wants_page(request.args):
+        return jsonify(items)
+    return jsonify(envelope(items, next_cursor, limit))
 
 
 @app.route("/events", methods=["POST"])
@@ -174,27 +278,28 @@ def events_add():
     except:
         return jsonify({"message": "event_date must be YYYY-MM-DD"}), 400
 
-    conn = db()
-    try:
-        conn.execute("""
-            INSERT INTO events (event_date, event_type, title, impact)
-            VALUES (?, ?, ?, ?)
-        """, (event_date, event_type, title, impact))
-        conn.commit()
-    except Exception:
-        conn.close()
-        return jsonify({"message": "Event already exists for this date + type"}), 400
+    with db() as conn:
+        try:
+            conn.execute("""
+                INSERT INTO events (event_date, event_type, title, impact)
+                VALUES (?, ?, ?, ?)
+            """, (event_date, event_type, title, impact))
+            bump_version(conn, "events")
+            conn.commit()
+        except Exception:
+            return jsonify({"message": "Event already exists for this date + type"}), 400
+    _data_changed("events")
 
-    conn.close()
     return jsonify({"message": "Event added"})
 
 
 @app.route("/events/<int:event_id>", methods=["DELETE"])
 def events_delete(event_id):
-    conn = db()
-    conn.execute("DELETE FROM events WHERE id=?", (event_id,))
-    conn.commit()
-    conn.close()
+    with db() as conn:
+        conn.execute("DELETE FROM events WHERE id=?", (event_id,))
+        bump_version(conn, "events")
+        conn.commit()
+    _data_changed("events")
     return jsonify({"message": "Event deleted"})
 
 
@@ -256,11 +361,16 @@ def _normalize_food_payload(data: dict):
     return name, price, cost_price
 
 
+def _foods_version():
+    with db() as conn:
+        return table_version(conn, "foods")
+
+
 @app.route("/foods", methods=["GET"])
+@conditional(_foods_version)
 def get_foods():
-    conn = db()
-    foods = conn.execute("SELECT * FROM foods ORDER BY name").fetchall()
-    conn.close()
+    with db() as conn:
+        foods = conn.execute("SELECT * FROM foods ORDER BY name").fetchall()
     return jsonify([dict(f) for f in foods])
 
 
@@ -277,32 +387,30 @@ def add_food():
             "received": data
         }), 400
 
-    conn = db()
+    with db() as conn:
+        # ✅ check if already exists (case-insensitive)
+        existing = conn.execute(
+            "SELECT id FROM foods WHERE name = ? COLLATE NOCASE",
+            (name,)
+        ).fetchone()
 
-    # ✅ check if already exists (case-insensitive)
-    existing = conn.execute(
-        "SELECT id FROM foods WHERE LOWER(name)=LOWER(?)",
-        (name,)
-    ).fetchone()
+        if existing:
+            return jsonify({"message": "Food already exists"}), 400
 
-    if existing:
-        conn.close()
-        return jsonify({"message": "Food already exists"}), 400
-
-    try:
-        conn.execute(
-            "INSERT INTO foods (name, price, cost_price) VALUES (?, ?, ?)",
-            (name, price, cost_price)
-        )
-        conn.commit()
-    except Exception as e:
-        conn.close()
-        return jsonify({
-            "message": "Food add failed",
-            "error": str(e)
-        }), 400
+        try:
+            conn.execute(
+                "INSERT INTO foods (name, price, cost_price) VALUES (?, ?, ?)",
+                (name, price, cost_price)
+            )
+            bump_version(conn, "foods")
+            conn.commit()
+        except Exception as e:
+            return jsonify({
+                "message": "Food add failed",
+                "error": str(e)
+            }), 400
+    _data_changed("foods")
 
-    conn.close()
     return jsonify({"message": "Food added"}), 201
 
 
@@ -313,32 +421,31 @@ def update_food(food_id):
 
     name, price, cost_price = _normalize_food_payload(data)
 
-    conn = db()
-    existing = conn.execute("SELECT * FROM foods WHERE id=?", (food_id,)).fetchone()
-    if not existing:
-        conn.close()
-        return jsonify({"message": "Food not found"}), 404
+    with db() as conn:
+        existing = conn.execute("SELECT * FROM foods WHERE id=?", (food_id,)).fetchone()
+        if not existing:
+            return jsonify({"message": "Food not found"}), 404
 
-    # ✅ allow updating name also
-    # if frontend didn't send name, keep old name
-    if not name:
-        name = existing["name"]
+        # ✅ allow updating name also
+        # if frontend didn't send name, keep old name
+        if not name:
+            name = existing["name"]
 
-    try:
-        conn.execute("""
-            UPDATE foods
-            SET name=?, price=?, cost_price=?
-            WHERE id=?
-        """, (name, price, cost_price, food_id))
-        conn.commit()
-    except Exception as e:
-        conn.close()
-        return jsonify({
-            "message": "Update failed",
-            "error": str(e)
-        }), 400
+        try:
+            conn.execute("""
+                UPDATE foods
+                SET name=?, price=?, cost_price=?
+                WHERE id=?
+            """, (name, price, cost_price, food_id))
+            bump_version(conn, "foods")
+            conn.commit()
+        except Exception as e:
+            return jsonify({
+                "message": "Update failed",
+                "error": str(e)
+            }), 400
+    _data_changed("foods")
 
-    conn.close()
     return jsonify({"message": "Food updated"})
 
 
@@ -346,23 +453,22 @@ def update_food(food_id):
 def delete_food(food_id):
     print("✅ DELETE FOOD:", food_id)
 
-    conn = db()
-    existing = conn.execute("SELECT id FROM foods WHERE id=?", (food_id,)).fetchone()
-    if not existing:
-        conn.close()
-        return jsonify({"message": "Food not found"}), 404
+    with db() as conn:
+        existing = conn.execute("SELECT id FROM foods WHERE id=?", (food_id,)).fetchone()
+        if not existing:
+            return jsonify({"message": "Food not found"}), 404
 
-    try:
-        conn.execute("DELETE FROM foods WHERE id=?", (food_id,))
-        conn.commit()
-    except Exception as e:
-        conn.close()
-        return jsonify({
-            "message": "Delete failed",
-            "error": str(e)
-        }), 400
+        try:
+            conn.execute("DELETE FROM foods WHERE id=?", (food_id,))
+            bump_version(conn, "foods")
+            conn.commit()
+        except Exception as e:
+            return jsonify({
+                "message": "Delete failed",
+                "error": str(e)
+            }), 400
+    _data_changed("foods")
 
-    conn.close()
     return jsonify({"message": "Food deleted"})
 
 
@@ -380,36 +486,84 @@ def add_bill():
     if not food_name:
         return jsonify({"message": "food_name required"}), 400
 
-    conn = db()
-    conn.execute("""
-        INSERT INTO billing (food_name, quantity, total)
-        VALUES (?, ?, ?)
-    """, (food_name, quantity, total))
-    conn.commit()
-    conn.close()
+    with db() as conn:
+        cur = conn.execute("""
+            INSERT INTO billing (food_name, quantity, total)
+            VALUES (?, ?, ?)
+        """, (food_name, quantity, total))
+        apply_daily_sales(conn, bills_for_rollup(conn, [cur.lastrowid]))
+        bump_version(conn, "billing")
+        conn.commit()
+    _data_changed("billing")
 
     return jsonify({"message": "Bill added"})
 
 
+@app.route("/billing/bulk", methods=["POST"])
+def add_bills_bulk():
+    """
+    POS sync: JSON array, NDJSON or CSV body (Content-Type or ?format=).
+    Valid rows are stored, invalid ones come back in "errors".
+    """
+    fmt = detect_format(request.content_type, request.args.get("format"))
+    if fmt is None:
+        return jsonify({"message": "format must be one of: " + ", ".join(BULK_FORMATS)}), 400
+
+    with db() as conn:
+        result = ingest_bills(conn, iter_rows(request.stream, fmt))
+    if result["inserted"]:
+        _data_changed("billing")
+
+    status = 200 if result["inserted"] else 400
+    return jsonify({"message": f"{result['inserted']} bills added", **result}), status
+
+
 @app.route("/billing", methods=["GET"])
 def list_bills():
-    conn = db()
-    bills = conn.execute("""
-        SELECT id, food_name, quantity, total, created_at
-        FROM billing
-        ORDER BY created_at DESC
-        LIMIT 50
-    """).fetchall()
-    conn.close()
-    return jsonify([dict(b) for b in bills])
+    """
+    Latest 50 bills as a list. ?limit=, ?cursor=, ?from=, ?to= (bill
+    date) or ?food= return a page instead: {items, next_cursor, limit},
+    keyset-paginated on (created_at, id).
+    """
+    try:
+        limit, after = page_args(request.args, default_limit=50)
+        date_from, date_to = date_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    where, params = [], []
+    if request.args.get("food"):
+        where.append("food_name = ?")
+        params.append(request.args["food"].strip())
+    if date_from:
+        where.append("created_at >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("created_at < DATE(?, '+1 day')")
+        params.append(date_to)
+
+    with db() as conn:
+        bills, next_cursor = keyset_page(
+            conn,
+            "SELECT id, food_name, quantity, total, created_at FROM billing",
+            where, params, "created_at DESC, id DESC", after, limit,
+            key=lambda r: (r["created_at"], r["id"]),
+        )
+
+    items = [dict(b) for b in bills]
+    if not wants_page(request.args):
+        return jsonify(items)
+    return jsonify(envelope(items, next_cursor, limit))
 
 
 @app.route("/billing/<int:bill_id>", methods=["DELETE"])
 def delete_bill(bill_id):
-    conn = db()
-    conn.execute("DELETE FROM billing WHERE id=?", (bill_id,))
-    conn.commit()
-    conn.close()
+    with db() as conn:
+        apply_daily_sales(conn, bills_for_rollup(conn, [bill_id]), sign=-1)
+        conn.execute("DELETE FROM billing WHERE id=?", (bill_id,))
+        bump_version(conn, "billing")
+        conn.commit()
+    _data_changed("billing")
     return jsonify({"message": "Bill deleted"})
 
 
@@ -417,34 +571,39 @@ def delete_bill(bill_id):
 # DASHBOARD
 # ============================
 
+def _dashboard_version():
+    # DATE('now') in the queries below is the UTC date
+    with db() as conn:
+        return (datetime.utcnow().date().isoformat(),) + data_version(conn)
+
+
 @app.route("/dashboard", methods=["GET"])
+@conditional(_dashboard_version)
 def dashboard():
-    conn = db()
-
-    top = conn.execute("""
-        SELECT food_name, SUM(quantity) as qty
-        FROM billing
-        GROUP BY food_name
-        ORDER BY qty DESC
-        LIMIT 1
-    """).fetchone()
-
-    weekly = conn.execute("""
-        SELECT DATE(created_at) as day, SUM(total) as revenue
-        FROM billing
-        WHERE created_at >= DATE('now', '-7 day')
-        GROUP BY day
-        ORDER BY day
-    """).fetchall()
-
-    monthly = conn.execute("""
-        SELECT strftime('%Y-%m', created_at) as month, SUM(total) as revenue
-        FROM billing
-        GROUP BY month
-        ORDER BY month
-    """).fetchall()
-
-    conn.close()
+    # ✅ all read from the daily_sales rollup, not raw billing
+    with db() as conn:
+        top = conn.execute("""
+            SELECT food_name, SUM(qty) as qty
+            FROM daily_sales
+            GROUP BY food_name
+            ORDER BY qty DESC
+            LIMIT 1
+        """).fetchone()
+
+        weekly = conn.execute("""
+            SELECT day, SUM(revenue) as revenue
+            FROM daily_sales
+            WHERE day >= DATE('now', '-7 day')
+            GROUP BY day
+            ORDER BY day
+        """).fetchall()
+
+        monthly = conn.execute("""
+            SELECT strftime('%Y-%m', day) as month, SUM(revenue) as revenue
+            FROM daily_sales
+            GROUP BY month
+            ORDER BY month
+        """).fetchall()
 
     return jsonify({
         "top_item": dict(top) if top else None,
@@ -457,172 +616,171 @@ def dashboard():
 # ✅ FORECAST (LightGBM + Events)
 # ============================
 
+def get_forecast(mode=None, horizon=1, strategy="recursive", profile=None):
+    """
+    Full forecast for tomorrow (plus the following days when horizon > 1),
+    shared by every forecast-derived endpoint.
+    Computed once per data version and reused until billing/events change.
+    """
+    mode = mode or FORECAST_MODE
+    profile = profile or FORECAST_PROFILE
+    tomorrow = forecast_date()
+    with db() as conn:
+        version = data_version(conn)
+
+    def compute():
+        with db() as conn:
+            # ✅ precomputed by the scheduler? serve it, else train now
+            # (a snapshot only matches the profile / engine it was built with)
+            if horizon == 1:
+                snapshot = load_snapshot(conn, tomorrow.isoformat(), mode, version, profile, FORECAST_ENGINE)
+                if snapshot is not None:
+                    return snapshot
+            return compute_forecast(conn, tomorrow, mode, horizon, strategy, profile=profile)
+
+    key = (tomorrow.isoformat(), mode) + version
+    if horizon > 1:
+        key += (horizon, strategy)
+    if profile != FORECAST_PROFILE:
+        key += (profile,)
+    return forecast_cache.get_or_compute(key, compute)
+
+
+def forecast_payload(mode=None, horizon=1, strategy="recursive", profile=None):
+    fc = get_forecast(mode, horizon, strategy, profile)
+    payload = {
+        "date": fc["date"],
+        "mode": fc["mode"],
+        "forecasts": fc["forecasts"][:FORECAST_TOP_N]
+    }
+    if horizon > 1:
+        payload["horizon"] = horizon
+        payload["strategy"] = strategy
+        payload["days"] = [
+            {"date": d["date"], "forecasts": d["forecasts"][:FORECAST_TOP_N]}
+            for d in fc["days"]
+        ]
+    return payload
+
+
+def _facts_version():
+    with db() as conn:
+        return (forecast_date().isoformat(),) + data_version(conn) + (change_counter(conn, "foods"),)
+
+
+def _build_facts(version):
+    """Assistant facts: sales aggregates + tomorrow's forecast digests."""
+    fc = forecast_payload()
+    forecasts = fc["forecasts"]
+    with db() as conn:
+        facts = sales_facts(conn)
+        foods = conn.execute("SELECT name, cost_price FROM foods").fetchall()
+    cost_map = {f["name"]: float(f["cost_price"]) for f in foods}
+
+    facts.update({
+        "forecast_date": fc["date"],
+        "forecasts": forecasts,
+        "increase": [f["food_name"] for f in forecasts[:8] if f.get("tag") == "HIGH_DEMAND"],
+        "waste_risk": [f["food_name"] for f in forecasts[:8] if f.get("tag") == "OVERPRODUCTION_RISK"],
+        "insights": _insights(forecasts),
+        "waste": _waste(forecasts, cost_map),
+    })
+    return facts
+
+
+# ✅ precomputed answers for /ai/chat, /smart-insights, /waste-cost, /alerts
+assistant_facts = AssistantFacts(_build_facts, _facts_version)
+
+# ✅ pushes to /stream subscribers
+bus = ChangeBus()
+
+
+def _publish_facts(facts):
+    """One rebuild -> one message per topic for every open /stream."""
+    bus.publish("billing", {"today": facts["today"], "top_7d": facts["top_7d"]})
+    bus.publish("forecast", {"date": facts["forecast_date"], "forecasts": facts["forecasts"]})
+    bus.publish("insights", facts["insights"])
+    bus.publish("waste", facts["waste"])
+
+
+def _store_alerts(facts):
+    """Alert rules run here, once per rebuild; /alerts only reads the table."""
+    with db() as conn:
+        sync_alerts(conn, alert_rules(facts))
+    _publish_alerts()
+
+
+def _publish_alerts():
+    with db() as conn:
+        bus.publish("alerts", {"items": open_alerts(conn), **unread_counts(conn)})
+
+
+assistant_facts.listeners += [_store_alerts, _publish_facts]
+
+
+def _data_changed(table):
+    """Called by the write endpoints after commit."""
+    bus.publish("change", {"table": table, "at": time.time()})
+    assistant_facts.mark_stale()
+
+
+def _forecast_args():
+    """
+    Parses ?mode=, ?horizon=, ?strategy= and ?train_profile=.
+    Returns ((mode, horizon, strategy, profile), None) or (None, error response).
+    """
+    mode = (request.args.get("mode") or FORECAST_MODE).strip().lower()
+    if mode not in FORECAST_MODES:
+        return None, (jsonify({"message": f"mode must be one of {', '.join(FORECAST_MODES)}"}), 400)
+
+    try:
+        horizon = int(request.args.get("horizon", 1))
+    except ValueError:
+        horizon = 0
+    if not 1 <= horizon <= FORECAST_MAX_HORIZON:
+        return None, (jsonify({"message": f"horizon must be 1..{FORECAST_MAX_HORIZON}"}), 400)
+
+    strategy = (request.args.get("strategy") or "recursive").strip().lower()
+    if strategy not in HORIZON_STRATEGIES:
+        return None, (jsonify({"message": f"strategy must be one of {', '.join(HORIZON_STRATEGIES)}"}), 400)
+
+    profile = (request.args.get("train_profile") or FORECAST_PROFILE).strip().lower()
+    if profile not in TRAINING_PROFILES:
+        return None, (jsonify({"message": f"train_profile must be one of {', '.join(TRAINING_PROFILES)}"}), 400)
+
+    return (mode, horizon, strategy, profile), None
+
+
+def _forecast_version():
+    with db() as conn:
+        return (forecast_date().isoformat(), FORECAST_MODE, FORECAST_PROFILE) + data_version(conn)
+
+
 @app.route("/forecast", methods=["GET"])
+@conditional(_forecast_version)
 def forecast():
     """
     ✅ Forecast with event-based features:
     - Uses last 60 days of billing data.
     - Features: time index, weekday, lags, rolling mean
     - PLUS: event flags and impact score.
-    """
-    conn = db()
-
-    rows = conn.execute("""
-        SELECT food_name, DATE(created_at) as day, SUM(quantity) as qty
-        FROM billing
-        WHERE created_at >= DATE('now', '-60 day')
-        GROUP BY food_name, day
-        ORDER BY day
-    """).fetchall()
-
-    # ✅ load events map
-    events_map = load_event_map(conn)
-
-    conn.close()
-
-    tomorrow = (datetime.now() + timedelta(days=1)).date()
-    tomorrow_str = tomorrow.strftime("%Y-%m-%d")
-
-    if not rows:
-        return jsonify({"date": tomorrow_str, "forecasts": []})
-
-    df = pd.DataFrame([dict(r) for r in rows])
-    df["day"] = pd.to_datetime(df["day"])
-    df = df.sort_values(["food_name", "day"]).reset_index(drop=True)
-
-    forecasts = []
-
-    for food_name, g in df.groupby("food_name"):
-        g = g.sort_values("day").copy()
-
-        # continuous timeline
-        full_days = pd.date_range(g["day"].min(), g["day"].max(), freq="D")
-        g = g.set_index("day").reindex(full_days).rename_axis("day").reset_index()
-        g["food_name"] = food_name
-        g["qty"] = g["qty"].fillna(0)
-
-        # basic features
-        g["t"] = np.arange(len(g))
-        g["weekday"] = g["day"].dt.weekday
-        g["lag1"] = g["qty"].shift(1)
-        g["lag2"] = g["qty"].shift(2)
-        g["lag3"] = g["qty"].shift(3)
-        g["roll7"] = g["qty"].rolling(7).mean()
-
-        # ✅ event-based features
-        def event_features(d):
-            d_str = pd.to_datetime(d).strftime("%Y-%m-%d")
-            e = events_map.get(d_str)
-            if not e:
-                return pd.Series([0.0, 0, 0, 0, 0])
-            return pd.Series([
-                float(e.get("impact", 0.0)),
-                int(e.get("is_holiday", 0)),
-                int(e.get("is_festival", 0)),
-                int(e.get("is_exam", 0)),
-                int(e.get("is_special_menu", 0)),
-            ])
-
-        g[["event_impact", "is_holiday", "is_festival", "is_exam", "is_special_menu"]] = g["day"].apply(event_features)
-
-        g = g.dropna().reset_index(drop=True)
-
-        # fallback for low data
-        if len(g) < 15:
-            qty_series = g["qty"].values if len(g) else np.array([0.0])
-            avg7 = float(np.mean(qty_series[-7:])) if len(qty_series) else 0.0
-            predicted = avg7
-            confidence = 55
-            points = int(len(g))
-        else:
-            X = g[
-                [
-                    "t", "weekday", "lag1", "lag2", "lag3", "roll7",
-                    "event_impact", "is_holiday", "is_festival", "is_exam", "is_special_menu"
-                ]
-            ]
-            y = g["qty"]
-
-            model = lgb.LGBMRegressor(
-                n_estimators=600,
-                learning_rate=0.05,
-                num_leaves=31,
-                subsample=0.9,
-                colsample_bytree=0.9,
-                reg_lambda=1.0,
-                random_state=42,
-                verbose=-1
-            )
 
-            model.fit(X, y)
-
-            qty_series = g["qty"].values
-            avg7 = float(np.mean(qty_series[-7:])) if len(qty_series) >= 7 else float(np.mean(qty_series))
-
-            last_row = g.iloc[-1]
-            next_t = int(last_row["t"] + 1)
-
-            lag1 = float(qty_series[-1])
-            lag2 = float(qty_series[-2]) if len(qty_series) >= 2 else 0.0
-            lag3 = float(qty_series[-3]) if len(qty_series) >= 3 else 0.0
-            roll7 = avg7
-
-            # tomorrow event
-            e = events_map.get(tomorrow_str, {})
-            ev_impact = float(e.get("impact", 0.0))
-            is_holiday = int(e.get("is_holiday", 0))
-            is_festival = int(e.get("is_festival", 0))
-            is_exam = int(e.get("is_exam", 0))
-            is_special_menu = int(e.get("is_special_menu", 0))
-
-            X_next = np.array([[
-                next_t,
-                tomorrow.weekday(),
-                lag1, lag2, lag3,
-                roll7,
-                ev_impact, is_holiday, is_festival, is_exam, is_special_menu
-            ]])
-
-            predicted = float(model.predict(X_next)[0])
-            predicted = max(0.0, predicted)
-
-            points = int(len(g))
-            if points >= 45:
-                confidence = 92
-            elif points >= 30:
-                confidence = 85
-            elif points >= 20:
-                confidence = 75
-            else:
-                confidence = 60
-
-        # suggestion logic
-        if predicted > avg7 * 1.15:
-            suggestion = "Increase"
-            tag = "HIGH_DEMAND"
-        elif predicted < avg7 * 0.85:
-            suggestion = "Reduce"
-            tag = "OVERPRODUCTION_RISK"
-        else:
-            suggestion = "Maintain"
-            tag = "STABLE"
-
-        forecasts.append({
-            "food_name": food_name,
-            "avg_last7_qty": round(float(avg7), 2),
-            "predicted_qty": round(float(predicted), 2),
-            "confidence": confidence,
-            "suggestion": suggestion,
-            "tag": tag,
-            "history_points": points
-        })
+    ?mode=per_item|global picks one model per food or one pooled model
+    (default: FORECAST_MODE env, per_item).
 
-    forecasts.sort(key=lambda x: x["predicted_qty"], reverse=True)
+    ?horizon=N (1..14) adds "days" with forecasts for the next N days;
+    ?strategy=recursive (default, predictions fed back as lags) or
+    direct (one model per step ahead).
 
-    return jsonify({
-        "date": tomorrow_str,
-        "forecasts": forecasts[:15]
-    })
+    ?train_profile=legacy|fast|balanced|accurate picks the training
+    profile (default: FORECAST_PROFILE env, legacy). ?profile= is the admin
+    request-profiling flag, see profiling.py.
+    """
+    args, err = _forecast_args()
+    if err:
+        return err
+
+    return jsonify(forecast_payload(*args))
 
 
 # ============================
@@ -631,44 +789,67 @@ def forecast():
 
 @app.route("/forecast/save", methods=["POST"])
 def forecast_save():
-    fc = forecast().json
+    """?mode=, ?horizon=, ?strategy= and ?train_profile= as for /forecast; all
+    days are stored in one transaction. Items the scheduler archived for a
+    day become saved rows (with these values); saved rows are skipped."""
+    args, err = _forecast_args()
+    if err:
+        return err
+
+    fc = forecast_payload(*args)
     forecast_date = fc.get("date")
-    forecasts = fc.get("forecasts", [])
+    days = fc.get("days") or [{"date": forecast_date, "forecasts": fc.get("forecasts", [])}]
 
     if not forecast_date:
         return jsonify({"message": "forecast_date missing"}), 400
-    if not forecasts:
+    if not any(d["forecasts"] for d in days):
         return jsonify({"message": "No forecasts available to save"}), 400
 
-    conn = db()
-    saved, skipped = 0, 0
-
-    for f in forecasts:
-        try:
-            conn.execute("""
-                INSERT INTO forecast_history
-                (forecast_date, food_name, avg_last7_qty, predicted_qty, confidence, suggestion, tag, history_points)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                forecast_date,
-                f.get("food_name"),
-                float(f.get("avg_last7_qty", 0)),
-                float(f.get("predicted_qty", 0)),
-                int(f.get("confidence", 0)),
-                f.get("suggestion", ""),
-                f.get("tag", ""),
-                int(f.get("history_points", 0))
-            ))
-            saved += 1
-        except:
-            skipped += 1
-
-    conn.commit()
-    conn.close()
+    with db() as conn:
+        saved, skipped = 0, 0
+
+        for day in days:
+            for f in day["forecasts"]:
+                try:
+                    cur = conn.execute("""
+                        INSERT INTO forecast_history
+                        (forecast_date, food_name, avg_last7_qty, predicted_qty, confidence, suggestion, tag, history_points)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(forecast_date, food_name) DO UPDATE SET
+                            avg_last7_qty = excluded.avg_last7_qty,
+                            predicted_qty = excluded.predicted_qty,
+                            confidence = excluded.confidence,
+                            suggestion = excluded.suggestion,
+                            tag = excluded.tag,
+                            history_points = excluded.history_points,
+                            generated_at = CURRENT_TIMESTAMP,
+                            source = 'saved'
+                        WHERE forecast_history.source = 'scheduler'
+                    """, (
+                        day["date"],
+                        f.get("food_name"),
+                        float(f.get("avg_last7_qty", 0)),
+                        float(f.get("predicted_qty", 0)),
+                        int(f.get("confidence", 0)),
+                        f.get("suggestion", ""),
+                        f.get("tag", ""),
+                        int(f.get("history_points", 0))
+                    ))
+                    if cur.rowcount:
+                        saved += 1
+                    else:
+                        skipped += 1
+                except:
+                    skipped += 1
+
+        bump_version(conn, "forecast_history")
+        conn.commit()
+    _data_changed("forecast_history")
 
     return jsonify({
         "message": "Forecast save completed",
         "forecast_date": forecast_date,
+        "dates": [d["date"] for d in days],
         "saved": saved,
         "skipped": skipped
     })
@@ -679,45 +860,44 @@ def seed_forecast_history():
     Creates demo forecast_history for multiple past days.
     Useful for prototype submission.
     """
-    conn = db()
-
     # take current forecast as template
-    fc = forecast().json
+    fc = forecast_payload()
     forecasts = fc.get("forecasts", [])
 
     if not forecasts:
-        conn.close()
         return jsonify({"message": "No forecast data available to seed"}), 400
 
-    created = 0
-    skipped = 0
-
-    # generate last 30 days demo
-    for i in range(30, 0, -1):
-        day = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-
-        for f in forecasts:
-            try:
-                conn.execute("""
-                    INSERT INTO forecast_history
-                    (forecast_date, food_name, avg_last7_qty, predicted_qty, confidence, suggestion, tag, history_points)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    day,
-                    f.get("food_name"),
-                    float(f.get("avg_last7_qty", 0)),
-                    float(f.get("predicted_qty", 0)),
-                    int(f.get("confidence", 0)),
-                    f.get("suggestion", ""),
-                    f.get("tag", ""),
-                    int(f.get("history_points", 0))
-                ))
-                created += 1
-            except:
-                skipped += 1
-
-    conn.commit()
-    conn.close()
+    with db() as conn:
+        created = 0
+        skipped = 0
+
+        # generate last 30 days demo
+        for i in range(30, 0, -1):
+            day = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
+
+            for f in forecasts:
+                try:
+                    conn.execute("""
+                        INSERT INTO forecast_history
+                        (forecast_date, food_name, avg_last7_qty, predicted_qty, confidence, suggestion, tag, history_points)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        day,
+                        f.get("food_name"),
+                        float(f.get("avg_last7_qty", 0)),
+                        float(f.get("predicted_qty", 0)),
+                        int(f.get("confidence", 0)),
+                        f.get("suggestion", ""),
+                        f.get("tag", ""),
+                        int(f.get("history_points", 0))
+                    ))
+                    created += 1
+                except:
+                    skipped += 1
+
+        bump_version(conn, "forecast_history")
+        conn.commit()
+    _data_changed("forecast_history")
 
     return jsonify({
         "message": "Demo forecast archive seeded ✅",
@@ -729,108 +909,134 @@ def seed_forecast_history():
 # ✅ FORECAST HISTORY
 # ============================
 
+def _forecast_history_version():
+    with db() as conn:
+        return table_version(conn, "forecast_history")
+
+
 @app.route("/forecast/history", methods=["GET"])
+@conditional(_forecast_history_version)
 def forecast_history():
-    conn = db()
-    dates = conn.execute("""
-        SELECT forecast_date,
-               COUNT(*) as items,
-               MAX(generated_at) as generated_at
-        FROM forecast_history
-        GROUP BY forecast_date
-        ORDER BY forecast_date DESC
-        LIMIT 60
-    """).fetchall()
-    conn.close()
-    return jsonify([dict(d) for d in dates])
+    """
+    Latest 60 saved forecast dates as a list. ?limit=, ?cursor=, ?from=
+    or ?to= return a page instead: {items, next_cursor, limit}.
+    """
+    try:
+        limit, after = page_args(request.args, default_limit=60, cursor_size=1)
+        date_from, date_to = date_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    where, params = [], []
+    if date_from:
+        where.append("forecast_date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("forecast_date <= ?")
+        params.append(date_to)
+
+    with db() as conn:
+        dates, next_cursor = keyset_page(
+            conn,
+            """SELECT forecast_date,
+                      COUNT(*) as items,
+                      MAX(generated_at) as generated_at
+               FROM forecast_history""",
+            where, params, "forecast_date DESC", after, limit,
+            key=lambda r: (r["forecast_date"],), group_by="forecast_date",
+        )
+
+    items = [dict(d) for d in dates]
+    if not wants_page(request.args):
+        return jsonify(items)
+    return jsonify(envelope(items, next_cursor, limit))
 
 
 @app.route("/forecast/history/<date>", methods=["GET"])
 def forecast_history_date(date):
-    conn = db()
-    rows = conn.execute("""
-        SELECT id, forecast_date, generated_at,
-               food_name, avg_last7_qty, predicted_qty,
-               confidence, suggestion, tag, history_points
-        FROM forecast_history
-        WHERE forecast_date = ?
-        ORDER BY predicted_qty DESC
-    """, (date,)).fetchall()
-    conn.close()
+    with db() as conn:
+        rows = conn.execute("""
+            SELECT id, forecast_date, generated_at,
+                   food_name, avg_last7_qty, predicted_qty,
+                   confidence, suggestion, tag, history_points
+            FROM forecast_history
+            WHERE forecast_date = ?
+            ORDER BY predicted_qty DESC
+        """, (date,)).fetchall()
     return jsonify([dict(r) for r in rows])
 
 
 
 @app.route("/demo/seed-archive-30days", methods=["POST"])
 def seed_archive_30days():
-    conn = db()
-    try:
-        # ✅ get foods
-        foods = conn.execute("SELECT name FROM foods").fetchall()
-        if not foods:
-            return jsonify({"ok": False, "message": "No foods found in foods table"}), 400
-
-        food_names = [f["name"] for f in foods]
-
-        # ✅ create 30 days
-        base_date = datetime.now().date()
-
-        inserted_days = 0
-        inserted_rows = 0
-
-        for i in range(30):
-            forecast_date = (base_date - timedelta(days=i)).strftime("%Y-%m-%d")
-            generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            for food in food_names:
-                # realistic demo numbers
-                avg7 = random.randint(5, 25)
-                predicted = max(0, int(avg7 + random.randint(-4, 6)))
-
-                # tag + suggestion logic
-                if predicted >= avg7 + 3:
-                    tag = "HIGH_DEMAND"
-                    suggestion = "Increase production"
-                elif predicted <= max(0, avg7 - 3):
-                    tag = "OVERPRODUCTION_RISK"
-                    suggestion = "Reduce production"
-                else:
-                    tag = "NORMAL"
-                    suggestion = "Maintain stock"
-
-                confidence = random.randint(70, 96)
-                history_points = random.randint(20, 60)
-
-                # ✅ insert with replace to avoid duplicates
-                conn.execute("""
-                    INSERT OR REPLACE INTO forecast_history (
+    with db() as conn:
+        try:
+            # ✅ get foods
+            foods = conn.execute("SELECT name FROM foods").fetchall()
+            if not foods:
+                return jsonify({"ok": False, "message": "No foods found in foods table"}), 400
+
+            food_names = [f["name"] for f in foods]
+
+            # ✅ create 30 days
+            base_date = datetime.now().date()
+
+            inserted_days = 0
+            inserted_rows = 0
+
+            for i in range(30):
+                forecast_date = (base_date - timedelta(days=i)).strftime("%Y-%m-%d")
+                generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+                for food in food_names:
+                    # realistic demo numbers
+                    avg7 = random.randint(5, 25)
+                    predicted = max(0, int(avg7 + random.randint(-4, 6)))
+
+                    # tag + suggestion logic
+                    if predicted >= avg7 + 3:
+                        tag = "HIGH_DEMAND"
+                        suggestion = "Increase production"
+                    elif predicted <= max(0, avg7 - 3):
+                        tag = "OVERPRODUCTION_RISK"
+                        suggestion = "Reduce production"
+                    else:
+                        tag = "NORMAL"
+                        suggestion = "Maintain stock"
+
+                    confidence = random.randint(70, 96)
+                    history_points = random.randint(20, 60)
+
+                    # ✅ insert with replace to avoid duplicates
+                    conn.execute("""
+                        INSERT OR REPLACE INTO forecast_history (
+                            forecast_date, generated_at,
+                            food_name, avg_last7_qty, predicted_qty,
+                            confidence, suggestion, tag, history_points
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
                         forecast_date, generated_at,
-                        food_name, avg_last7_qty, predicted_qty,
-                        confidence, suggestion, tag, history_points
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    forecast_date, generated_at,
-                    food, float(avg7), float(predicted),
-                    int(confidence), suggestion, tag, int(history_points)
-                ))
+                        food, float(avg7), float(predicted),
+                        int(confidence), suggestion, tag, int(history_points)
+                    ))
 
-                inserted_rows += 1
+                    inserted_rows += 1
 
-            inserted_days += 1
+                inserted_days += 1
 
-        conn.commit()
+            bump_version(conn, "forecast_history")
+            conn.commit()
+            _data_changed("forecast_history")
 
-        return jsonify({
-            "ok": True,
-            "message": f"Seeded forecast archive for {inserted_days} days",
-            "days": inserted_days,
-            "rows": inserted_rows
-        })
+            return jsonify({
+                "ok": True,
+                "message": f"Seeded forecast archive for {inserted_days} days",
+                "days": inserted_days,
+                "rows": inserted_rows
+            })
 
-    except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
-    finally:
-        conn.close()
+        except Exception as e:
+            return jsonify({"ok": False, "error": str(e)}), 500
 
 # ============================
 # ✅ FORECAST EXPORT CSV
@@ -838,19 +1044,11 @@ def seed_archive_30days():
 
 @app.route("/forecast/export", methods=["GET"])
 def forecast_export():
-    fc = forecast().json
-    forecasts = fc.get("forecasts", [])
+    fc = forecast_payload()
     date = fc.get("date", "")
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "date", "food_name", "avg_last7_qty", "predicted_qty",
-        "confidence", "suggestion", "tag", "history_points"
-    ])
-
-    for f in forecasts:
-        writer.writerow([
+    rows = [
+        (
             date,
             f.get("food_name"),
             f.get("avg_last7_qty"),
@@ -859,18 +1057,56 @@ def forecast_export():
             f.get("suggestion"),
             f.get("tag"),
             f.get("history_points")
-        ])
+        )
+        for f in fc.get("forecasts", [])
+    ]
+
+    return csv_response(
+        ["date", "food_name", "avg_last7_qty", "predicted_qty",
+         "confidence", "suggestion", "tag", "history_points"],
+        [rows],
+        "forecast_report.csv",
+        gzip=_wants_gzip()
+    )
 
-    mem = io.BytesIO()
-    mem.write(output.getvalue().encode("utf-8"))
-    mem.seek(0)
 
-    return send_file(
-        mem,
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name="forecast_report.csv"
-    )
+def _wants_gzip():
+    return request.args.get("gzip", "0").lower() in ("1", "true", "yes")
+
+
+def _export_range(default_days=30, default_to=None):
+    try:
+        return parse_range(request.args, default_days, default_to), None
+    except (ValueError, TypeError) as e:
+        return None, (jsonify({"message": f"invalid date range: {e}"}), 400)
+
+
+@app.route("/forecast/history/export", methods=["GET"])
+def forecast_history_export_csv():
+    """?from=&to= (YYYY-MM-DD, inclusive) or ?days=N, optional ?gzip=1"""
+    # saved forecasts are dated tomorrow, so the default window ends there
+    rng, err = _export_range(default_days=30, default_to=forecast_date())
+    if err:
+        return err
+    return forecast_history_export(*rng, "forecast_history.csv", gzip=_wants_gzip())
+
+
+@app.route("/billing/export", methods=["GET"])
+def billing_export_csv():
+    """?from=&to= (YYYY-MM-DD, inclusive) or ?days=N, optional ?gzip=1"""
+    rng, err = _export_range(default_days=30)
+    if err:
+        return err
+    return billing_export(*rng, "billing.csv", gzip=_wants_gzip())
+
+
+@app.route("/reports/export", methods=["GET"])
+def reports_export():
+    # Reports page: billing history, last 30 days unless a range is given
+    rng, err = _export_range(default_days=30)
+    if err:
+        return err
+    return billing_export(*rng, "canteen_report.csv", gzip=_wants_gzip())
 
 
 # ============================
@@ -879,22 +1115,36 @@ def forecast_export():
 
 @app.route("/forecast/accuracy", methods=["GET"])
 def forecast_accuracy():
-    conn = db()
+    """
+    Today's actual sales vs the forecast that was archived for today
+    (saved yesterday). Falls back to the live forecast when nothing was
+    archived; "source" says which one was scored.
+    """
     today = datetime.now().strftime("%Y-%m-%d")
 
-    actual_rows = conn.execute("""
-        SELECT food_name, SUM(quantity) as qty
-        FROM billing
-        WHERE DATE(created_at) = DATE('now')
-        GROUP BY food_name
-    """).fetchall()
+    with db() as conn:
+        actual_rows = conn.execute("""
+            SELECT food_name, qty
+            FROM daily_sales
+            WHERE day = DATE('now')
+        """).fetchall()
 
-    conn.close()
+        archived = conn.execute("""
+            SELECT food_name, predicted_qty, confidence, suggestion, tag
+            FROM forecast_history
+            WHERE forecast_date = ?
+            ORDER BY predicted_qty DESC
+            LIMIT ?
+        """, (today, FORECAST_TOP_N)).fetchall()
 
     actual_map = {r["food_name"]: float(r["qty"]) for r in actual_rows}
 
-    fc = forecast().json
-    forecasts = fc.get("forecasts", [])
+    if archived:
+        source = "archive"
+        forecasts = [dict(r) for r in archived]
+    else:
+        source = "live"
+        forecasts = forecast_payload().get("forecasts", [])
 
     comparisons, errors = [], []
 
@@ -929,6 +1179,7 @@ def forecast_accuracy():
 
     return jsonify({
         "date": today,
+        "source": source,
         "accuracy_score": accuracy_score,
         "avg_error_percent": round(avg_error, 2),
         "items": comparisons[:12]
@@ -936,14 +1187,51 @@ def forecast_accuracy():
 
 
 # ============================
-# ✅ SMART INSIGHTS
+# ✅ BACKTEST
 # ============================
 
-@app.route("/smart-insights", methods=["GET"])
-def smart_insights():
-    fc = forecast().json
-    forecasts = fc.get("forecasts", [])
+@app.route("/forecast/backtest", methods=["GET"])
+def forecast_backtest():
+    """
+    Rolling-origin backtest on the stored sales history.
+    ?folds=7&horizon=1&models=per_item,global,naive_last,mean7,seasonal_naive
+    &items=10 (worst items listed per model)&train_profile=legacy. Trains
+    from scratch per fold, so this is slow; run `python -m backtest` for
+    big menus.
+    """
+    try:
+        folds = int(request.args.get("folds", 7))
+        horizon = int(request.args.get("horizon", 1))
+        top_items = int(request.args.get("items", 10))
+    except ValueError:
+        return jsonify({"message": "folds, horizon and items must be integers"}), 400
 
+    models = [m.strip() for m in request.args.get("models", ",".join(BACKTEST_MODELS)).split(",") if m.strip()]
+    if not 1 <= folds <= 60 or not 1 <= horizon <= FORECAST_MAX_HORIZON:
+        return jsonify({"message": f"folds must be 1..60 and horizon 1..{FORECAST_MAX_HORIZON}"}), 400
+    if not models or any(m not in BACKTEST_MODELS for m in models):
+        return jsonify({"message": f"models must be from {', '.join(BACKTEST_MODELS)}"}), 400
+    profile = (request.args.get("train_profile") or FORECAST_PROFILE).strip().lower()
+    if profile not in TRAINING_PROFILES:
+        return jsonify({"message": f"train_profile must be one of {', '.join(TRAINING_PROFILES)}"}), 400
+
+    with db() as conn:
+        df = load_sales(conn)
+        events_map = load_event_map(conn)
+
+    if df.empty:
+        return jsonify({"message": "No sales history to backtest"}), 400
+
+    result = run_backtest(df, events_map, folds, horizon, models, profile=profile)
+    result["items"] = {m: rows[:top_items] for m, rows in result["items"].items()}
+    return jsonify(result)
+
+
+# ============================
+# ✅ SMART INSIGHTS
+# ============================
+
+def _insights(forecasts):
     insights = {"high_demand": [], "waste_risk": [], "stable": []}
 
     for f in forecasts:
@@ -966,23 +1254,20 @@ def smart_insights():
                 "food_name": f["food_name"]
             })
 
-    return jsonify(insights)
+    return insights
+
+
+@app.route("/smart-insights", methods=["GET"])
+@conditional(lambda: assistant_facts.get()["version"])
+def smart_insights():
+    return jsonify(assistant_facts.get()["insights"])
 
 
 # ============================
 # ✅ WASTE COST
 # ============================
 
-@app.route("/waste-cost", methods=["GET"])
-def waste_cost():
-    conn = db()
-
-    fc = forecast().json
-    forecasts = fc.get("forecasts", [])
-
-    foods = conn.execute("SELECT name, cost_price FROM foods").fetchall()
-    cost_map = {f["name"]: float(f["cost_price"]) for f in foods}
-
+def _waste(forecasts, cost_map):
     total_risk_cost = 0.0
     risk_items = []
 
@@ -1000,14 +1285,17 @@ def waste_cost():
                 "estimated_loss": round(loss, 2)
             })
 
-    conn.close()
-
     risk_items.sort(key=lambda x: x["estimated_loss"], reverse=True)
 
-    return jsonify({
+    return {
         "estimated_waste_cost": round(total_risk_cost, 2),
         "risk_items": risk_items[:10]
-    })
+    }
+
+
+@app.route("/waste-cost", methods=["GET"])
+def waste_cost():
+    return jsonify(assistant_facts.get()["waste"])
 
 import random
 
@@ -1018,55 +1306,55 @@ def seed_demo_billing_30days():
     Uses foods table prices so totals are correct.
     """
 
-    conn = db()
-
-    foods = conn.execute("SELECT name, price FROM foods ORDER BY name").fetchall()
-    if not foods:
-        conn.close()
-        return jsonify({"message": "No foods found. Add foods first."}), 400
+    with db() as conn:
+        foods = conn.execute("SELECT name, price FROM foods ORDER BY name").fetchall()
+        if not foods:
+            return jsonify({"message": "No foods found. Add foods first."}), 400
 
-    # ✅ Optional: clear previous billing history (recommended for demo)
-    conn.execute("DELETE FROM billing")
+        # ✅ Optional: clear previous billing history (recommended for demo)
+        conn.execute("DELETE FROM billing")
 
-    today = datetime.now().date()
-    inserted = 0
+        today = datetime.now().date()
+        inserted = 0
 
-    # 🔥 more customers on weekends
-    for i in range(30):
-        day = today - timedelta(days=i)
-        weekday = day.weekday()  # 0=Mon ... 6=Sun
+        # 🔥 more customers on weekends
+        for i in range(30):
+            day = today - timedelta(days=i)
+            weekday = day.weekday()  # 0=Mon ... 6=Sun
 
-        # base customer flow
-        if weekday in (5, 6):  # Sat/Sun
-            bills_count = random.randint(60, 120)
-        else:
-            bills_count = random.randint(35, 80)
+            # base customer flow
+            if weekday in (5, 6):  # Sat/Sun
+                bills_count = random.randint(60, 120)
+            else:
+                bills_count = random.randint(35, 80)
 
-        for _ in range(bills_count):
-            food = random.choice(foods)
-            food_name = food["name"]
-            unit_price = float(food["price"] or 10)
+            for _ in range(bills_count):
+                food = random.choice(foods)
+                food_name = food["name"]
+                unit_price = float(food["price"] or 10)
 
-            # quantity bias (mostly 1 or 2)
-            qty = random.choices([1, 2, 3, 4], weights=[60, 25, 10, 5])[0]
-            total = round(qty * unit_price, 2)
+                # quantity bias (mostly 1 or 2)
+                qty = random.choices([1, 2, 3, 4], weights=[60, 25, 10, 5])[0]
+                total = round(qty * unit_price, 2)
 
-            # random time during the day
-            hour = random.randint(8, 20)
-            minute = random.randint(0, 59)
-            second = random.randint(0, 59)
+                # random time during the day
+                hour = random.randint(8, 20)
+                minute = random.randint(0, 59)
+                second = random.randint(0, 59)
 
-            created_at = f"{day} {hour:02d}:{minute:02d}:{second:02d}"
+                created_at = f"{day} {hour:02d}:{minute:02d}:{second:02d}"
 
-            conn.execute("""
-                INSERT INTO billing (food_name, quantity, total, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (food_name, qty, total, created_at))
+                conn.execute("""
+                    INSERT INTO billing (food_name, quantity, total, created_at)
+                    VALUES (?, ?, ?, ?)
+                """, (food_name, qty, total, created_at))
 
-            inserted += 1
+                inserted += 1
 
-    conn.commit()
-    conn.close()
+        rebuild_daily_sales(conn)
+        bump_version(conn, "billing")
+        conn.commit()
+    _data_changed("billing")
 
     return jsonify({
         "message": "✅ Demo billing data created for last 30 days",
@@ -1079,37 +1367,80 @@ def seed_demo_billing_30days():
 # ✅ ALERTS
 # ============================
 
+def _alerts_version():
+    # writes in this process re-run the alert rules via _data_changed; a new
+    # forecast date or writes from another process (scheduler worker) are
+    # only noticed by get(), so it runs before the ETag check too
+    assistant_facts.get()
+    with db() as conn:
+        return table_version(conn, "alerts"), forecast_date().isoformat()
+
+
 @app.route("/alerts", methods=["GET"])
+@conditional(_alerts_version)
 def alerts():
-    insights = smart_insights().json
-    waste = waste_cost().json
+    """
+    Open alerts from the alerts table, most severe first.
+    ?unread=1 for unread only, ?limit= (default 50).
+    Rules are evaluated when the data changes, not here.
+    """
+    limit = min(max(_to_int(request.args.get("limit"), 50), 1), 500)
+    with db() as conn:
+        rows = open_alerts(conn, limit, unread_only=request.args.get("unread") == "1")
+    return jsonify(rows)
 
-    alerts_list = []
 
-    for item in insights.get("waste_risk", [])[:5]:
-        alerts_list.append({
-            "type": "waste",
-            "severity": "warning",
-            "title": item["title"],
-            "message": item["message"]
-        })
+@app.route("/alerts/unread", methods=["GET"])
+def alerts_unread():
+    with db() as conn:
+        return jsonify(unread_counts(conn))
 
-    for item in insights.get("high_demand", [])[:5]:
-        alerts_list.append({
-            "type": "demand",
-            "severity": "info",
-            "title": item["title"],
-            "message": item["message"]
-        })
 
-    alerts_list.insert(0, {
-        "type": "cost",
-        "severity": "danger" if waste.get("estimated_waste_cost", 0) > 200 else "info",
-        "title": "Estimated Waste Cost Risk",
-        "message": f"Potential loss: ₹{waste.get('estimated_waste_cost', 0)}"
-    })
+@app.route("/alerts/<int:alert_id>/read", methods=["POST"])
+def alert_read(alert_id):
+    with db() as conn:
+        changed = mark_alerts(conn, "read", [alert_id])
+    _publish_alerts()
+    return jsonify({"message": "Alert marked read", "changed": changed})
+
+
+@app.route("/alerts/<int:alert_id>/ack", methods=["POST"])
+def alert_ack(alert_id):
+    with db() as conn:
+        changed = mark_alerts(conn, "ack", [alert_id])
+    _publish_alerts()
+    return jsonify({"message": "Alert acknowledged", "changed": changed})
+
+
+@app.route("/alerts/read-all", methods=["POST"])
+def alerts_read_all():
+    with db() as conn:
+        changed = mark_alerts(conn, "read")
+    _publish_alerts()
+    return jsonify({"message": "All alerts marked read", "changed": changed})
+
+
+# ============================
+# ✅ LIVE UPDATES (SSE)
+# ============================
+
+@app.route("/stream", methods=["GET"])
+def stream():
+    """
+    Server-sent events instead of polling. Topics: billing (today's
+    totals, top items), forecast, insights, waste, alerts (each sent on
+    connect and whenever it changes) and change (a table was written).
+    ?topics=alerts,billing limits what is sent.
+    """
+    topics = [t.strip() for t in (request.args.get("topics") or "").split(",") if t.strip()]
+    assistant_facts.get()   # first client after start-up: build + publish the snapshot
+    sub = bus.subscribe(topics)
+    return Response(
+        sse_stream(bus, sub),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return jsonify(alerts_list[:12])
 
 # ============================
 # ✅ AI CHATBOT (GEMINI)
@@ -1117,6 +1448,14 @@ def alerts():
 
 @app.route("/ai/chat", methods=["POST"])
 def ai_chat():
+    """
+    Keyword intents are answered from the assistant facts snapshot (no DB,
+    no model); anything else goes to Gemini (when GEMINI_API_KEY is set)
+    on the assistant's I/O pool. Gemini replies are cached per (question,
+    language, data version). If Gemini takes longer than AI_CHAT_WAIT
+    seconds the reply is {"pending": true} and asking again returns the
+    finished answer.
+    """
     data = request.json or {}
     message = (data.get("message") or "").strip()
     language = (data.get("language") or "English").strip()
@@ -1124,91 +1463,26 @@ def ai_chat():
     if not message:
         return jsonify({"reply": "Please type a message"}), 400
 
-    # ✅ fetch project data
-    conn = db()
-    try:
-        today_stats = conn.execute("""
-            SELECT 
-                IFNULL(SUM(total), 0) as revenue,
-                IFNULL(SUM(quantity), 0) as qty
-            FROM billing
-            WHERE DATE(created_at) = DATE('now')
-        """).fetchone()
-
-        top_foods = conn.execute("""
-            SELECT food_name, SUM(quantity) as qty
-            FROM billing
-            WHERE created_at >= DATE('now','-7 day')
-            GROUP BY food_name
-            ORDER BY qty DESC
-            LIMIT 5
-        """).fetchall()
-    finally:
-        conn.close()
-
-    fc = forecast().json
-    forecasts = fc.get("forecasts", [])[:8]
+    facts = assistant_facts.get()
 
     # ✅ BASIC LOCAL RESPONSE (always ready)
-    msg = message.lower()
-
-    if "increase" in msg or "tomorrow" in msg:
-        inc = [f["food_name"] for f in forecasts if f.get("tag") == "HIGH_DEMAND"]
-        return jsonify({"reply": f"✅ Items to increase tomorrow: {', '.join(inc) if inc else 'No high demand items detected'}"})
-
-    if "waste" in msg or "risk" in msg:
-        risk = [f["food_name"] for f in forecasts if f.get("tag") == "OVERPRODUCTION_RISK"]
-        return jsonify({"reply": f"⚠️ Waste risk items: {', '.join(risk) if risk else 'No waste risk items detected'}"})
-
-    if "revenue" in msg or "sales" in msg:
-        return jsonify({"reply": f"📌 Today's Revenue: ₹{float(today_stats['revenue']):.2f}, Total Qty Sold: {int(today_stats['qty'])}"})
-
-    if "top" in msg:
-        top = [f"{x['food_name']} ({x['qty']})" for x in top_foods]
-        return jsonify({"reply": "🔥 Top selling foods (last 7 days): " + (", ".join(top) if top else "No data")})
-
-    # ✅ Attempt Gemini only if API key exists (optional)
-    if GEMINI_API_KEY:
-        try:
-            context = f"""
-You are an AI assistant for a Food Waste Reduction system.
-
-Answer in {language}.
-
-TODAY STATS:
-Revenue: ₹{float(today_stats["revenue"] or 0):.2f}
-Total quantity sold: {int(today_stats["qty"] or 0)}
-
-TOP SELLING FOODS (Last 7 days):
-{[dict(x) for x in top_foods]}
-
-TOMORROW FORECAST:
-{forecasts}
-
-Now answer the user query in a short clear way.
-"""
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
-            payload = {"contents": [{"parts": [{"text": context + "\n\nUser: " + message}]}]}
-
-            r = requests.post(url, json=payload, timeout=20)
-            out = r.json()
-
-            reply = (
-                out.get("candidates", [{}])[0]
-                .get("content", {})
-                .get("parts", [{}])[0]
-                .get("text", "")
-            )
-            if reply:
-                return jsonify({"reply": reply})
-
-        except:
-            pass
+    reply = local_reply(message, facts)
+    if reply:
+        return jsonify({"reply": reply})
+
+    # ✅ Gemini only if API key exists (optional)
+    if gemini.enabled:
+        key = chat_replies.key(message, language, facts["version"])
+        reply, source = chat_replies.ask(
+            key, lambda: build_prompt(language, facts, message), AI_CHAT_WAIT
+        )
+        if source == "pending":
+            return jsonify({"reply": PENDING_REPLY, "pending": True}), 202
+        if reply:
+            return jsonify({"reply": reply, "cached": source == "cache"})
 
     # ✅ fallback default
-    return jsonify({
-        "reply": "✅ I can answer based on dashboard + billing + forecast data.\nTry: 'top items', 'waste risk', 'increase tomorrow', 'today revenue'."
-    })
+    return jsonify({"reply": HELP_REPLY})
 
 
 if __name__ == "__main__":
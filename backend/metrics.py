@@ -0,0 +1,168 @@
+"""
+Lightweight in-process metrics with a Prometheus text exporter.
+
+    with timed("forecast_stage_seconds", stage="fit"):
+        ...
+    observe("http_request_duration_seconds", 0.012, endpoint="/foods", method="GET", status="200")
+    inc("http_requests_total", endpoint="/foods", method="GET", status="200")
+
+Set METRICS_ENABLED=0 to turn everything into no-ops (timed() hands back
+a shared null context, observe()/inc() return straight away).
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint", SECONDS_BUCKETS),
+    "http_request_sql_queries": ("histogram", "SQL statements run per request", COUNT_BUCKETS),
+    "sql_query_duration_seconds": ("histogram", "SQLite execute() time by statement type", SECONDS_BUCKETS),
+    "forecast_stage_seconds": ("histogram", "Forecast time per stage (load, features, fit, predict)", SECONDS_BUCKETS),
+    "http_requests_total": ("counter", "Requests by endpoint and status", None),
+    "http_conditional_total": ("counter", "Conditional GETs answered 304 vs full body", None),
+    "stream_messages_total": ("counter", "Messages published to /stream subscribers by topic", None),
+    "ai_chat_replies_total": ("counter", "/ai/chat Gemini replies by source (cache, llm, llm_error, pending)", None),
+}
+
+_NULL = nullcontext()
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._counters = {}     # (name, labels) -> float
+        self._collectors = []   # fn() -> [(name, type, help, {labels: value})]
+        self._local = threading.local()
+
+    # ---------- recording ----------
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = Histogram(HELP.get(name, (None, None, SECONDS_BUCKETS))[2])
+            h.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def _timed(self, name, labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def timed(self, name, **labels):
+        if not self.enabled:
+            return _NULL
+        return self._timed(name, labels)
+
+    # per-request SQL counter (thread local, reset by the request hooks)
+    def sql_executed(self, op, seconds):
+        if not self.enabled:
+            return
+        self.observe("sql_query_duration_seconds", seconds, op=op)
+        self._local.sql_count = getattr(self._local, "sql_count", 0) + 1
+
+    def start_request(self):
+        self._local.sql_count = 0
+
+    def request_sql_count(self):
+        return getattr(self._local, "sql_count", 0)
+
+    def register_collector(self, fn):
+        """fn() -> [(name, type, help, {label_tuple: value})], read at export time"""
+        self._collectors.append(fn)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # ---------- export ----------
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            histograms = [(k, (list(h.counts), h.sum, h.count, h.buckets)) for k, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind, text):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (counts, total, count, buckets) in sorted(histograms):
+            header(name, "histogram", HELP.get(name, ("", name))[1])
+            cumulative = 0
+            for le, c in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        for (name, labels), value in sorted(counters):
+            header(name, "counter", HELP.get(name, ("", name))[1])
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for fn in self._collectors:
+            for name, kind, text, values in fn():
+                header(name, kind, text)
+                for labels, value in values.items():
+                    lines.append(f"{name}{_labels(labels)} {value}")
+
+        header("metrics_enabled", "gauge", "1 when metrics are being recorded")
+        lines.append(f"metrics_enabled {int(self.enabled)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+metrics = Metrics()
+timed = metrics.timed
+observe = metrics.observe
+inc = metrics.inc
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import lightgbm as lgb
+lgb.basic._log_warning = lambda msg: None
+
+MODEL_STORE_DIR = os.getenv(
+    "MODEL_STORE_DIR",
+    os.path.join(os.path.dirname(__file__), "model_store")
+)
+
+
+def _food_key(food_name):
+    return hashlib.sha1(str(food_name).encode("utf-8")).hexdigest()[:12]
+
+
+def fingerprint(food_name, X, y, params, window):
+    """
+    Data version of one training set.
+
+    Same food + same window + same rows + same params => same fingerprint,
+    so a model is only refitted when billing/events rows for that item
+    actually change what it would be trained on.
+    """
+    h = hashlib.sha1()
+    h.update(str(food_name).encode("utf-8"))
+    h.update(json.dumps([str(w) for w in window]).encode("utf-8"))
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    h.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return h.hexdigest()[:20]
+
+
+# ======================================
+# ✅ Model registry (disk backed)
+# ======================================
+class ModelRegistry:
+    """
+    Keeps one fitted LightGBM booster per food item on disk.
+
+    Files are named <food_key>_<fingerprint>.txt (LightGBM native text
+    format). On startup only the directory listing is read; boosters are
+    loaded the first time they are needed. When an item's data changes a
+    new model is fitted and the previous file for that item is removed.
+
+    Each stored model can carry a training watermark (what it was trained
+    on, see forecasting._watermark), kept in watermarks.json, so
+    incremental training can tell appended days from changed history.
+    """
+
+    def __init__(self, store_dir=MODEL_STORE_DIR):
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._index = None      # food_key -> fingerprint on disk
+        self._boosters = {}     # food_key -> (fingerprint, lgb.Booster)
+        self._watermarks = {}   # food_key -> watermark dict
+        self._dirty = False
+        self.stats = {"hits": 0, "loads": 0, "fits": 0, "updates": 0, "reuses": 0}
+
+    def _path(self, food_key, fp):
+        return os.path.join(self.store_dir, f"{food_key}_{fp}.txt")
+
+    def _watermarks_path(self):
+        return os.path.join(self.store_dir, "watermarks.json")
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        index = {}
+        if os.path.isdir(self.store_dir):
+            for name in os.listdir(self.store_dir):
+                if not name.endswith(".txt") or "_" not in name:
+                    continue
+                food_key, fp = name[:-4].split("_", 1)
+                index[food_key] = fp
+        self._index = index
+
+        self._watermarks = {}
+        try:
+            with open(self._watermarks_path()) as f:
+                self._watermarks = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def load_index(self):
+        with self._lock:
+            self._load_index()
+        return len(self._index)
+
+    def _drop_old(self, food_key, keep_fp):
+        if not os.path.isdir(self.store_dir):
+            return
+        for name in os.listdir(self.store_dir):
+            if name.startswith(food_key + "_") and name != f"{food_key}_{keep_fp}.txt":
+                try:
+                    os.remove(os.path.join(self.store_dir, name))
+                except OSError:
+                    pass
+
+    def lookup(self, food_name, X, y, params, window, fit_params=None):
+        """
+        Returns (fingerprint, booster) for this training set, booster is
+        None when no matching model exists in memory or on disk.
+        """
+        fit_params = fit_params or {}
+        food_key = _food_key(food_name)
+        fp = fingerprint(food_name, X, y, dict(params, **fit_params), window)
+
+        with self._lock:
+            self._load_index()
+            return fp, self._get(food_key, fp)
+
+    def _get(self, food_key, fp):
+        cached = self._boosters.get(food_key)
+        if cached and cached[0] == fp:
+            self.stats["hits"] += 1
+            return cached[1]
+
+        path = self._path(food_key, fp)
+        if os.path.exists(path):
+            booster = lgb.Booster(model_file=path)
+            self._index[food_key] = fp
+            self._boosters[food_key] = (fp, booster)
+            self.stats["loads"] += 1
+            return booster
+        return None
+
+    def watermark(self, food_name):
+        """
+        (watermark, booster) of the item's current model, or (None, None)
+        when there is no model or it was stored without a watermark.
+        """
+        food_key = _food_key(food_name)
+        with self._lock:
+            self._load_index()
+            mark = self._watermarks.get(food_key)
+            if mark is None or self._index.get(food_key) != mark["fp"]:
+                return None, None
+            booster = self._get(food_key, mark["fp"])
+            return (mark, booster) if booster is not None else (None, None)
+
+    def reused(self, n=1):
+        """Counts models kept as they are even though the fingerprint moved."""
+        with self._lock:
+            self.stats["reuses"] += n
+
+    def store(self, food_name, fp, booster, watermark=None, updated=False):
+        """
+        Saves a freshly fitted (or, with updated=True, continued) booster
+        and drops the item's old model. Watermarks are written by flush().
+        """
+        food_key = _food_key(food_name)
+        path = self._path(food_key, fp)
+
+        with self._lock:
+            self._load_index()
+            os.makedirs(self.store_dir, exist_ok=True)
+            tmp = path + ".tmp"
+            booster.save_model(tmp)
+            os.replace(tmp, path)
+            self._drop_old(food_key, fp)
+
+            self._index[food_key] = fp
+            self._boosters[food_key] = (fp, booster)
+            self.stats["updates" if updated else "fits"] += 1
+
+            if watermark is not None:
+                self._watermarks[food_key] = dict(watermark, fp=fp)
+                self._dirty = True
+            elif self._watermarks.pop(food_key, None) is not None:
+                self._dirty = True
+
+    def flush(self):
+        """Writes watermarks.json if any watermark changed since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.store_dir, exist_ok=True)
+            path = self._watermarks_path()
+            with open(path + ".tmp", "w") as f:
+                json.dump(self._watermarks, f, separators=(",", ":"))
+            os.replace(path + ".tmp", path)
+            self._dirty = False
+
+    def get_or_fit(self, food_name, X, y, params, window, fit_params=None):
+        """
+        Returns a booster trained on (X, y) with params.
+        Reuses the in-memory or on-disk model when the fingerprint matches.
+        """
+        fit_params = fit_params or {}
+        fp, booster = self.lookup(food_name, X, y, params, window, fit_params)
+        if booster is not None:
+            return booster
+
+        # fit outside the lock (slow part)
+        model = lgb.LGBMRegressor(**params)
+        model.fit(X, y, **fit_params)
+        booster = model.booster_
+
+        self.store(food_name, fp, booster)
+        return booster
+
+    def tree_counts(self):
+        """{food_key: number of trees} of the boosters loaded in memory."""
+        with self._lock:
+            return {k: b.num_trees() for k, (_, b) in self._boosters.items()}
+
+    def clear(self):
+        with self._lock:
+            self._boosters.clear()
+            self._index = None
+            self._watermarks = {}
+            self._dirty = False
+            if os.path.isdir(self.store_dir):
+                for name in os.listdir(self.store_dir):
+                    if name.endswith(".txt") or name == "watermarks.json":
+                        try:
+                            os.remove(os.path.join(self.store_dir, name))
+                        except OSError:
+                            pass
+
+
+registry = ModelRegistry()
@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination for the listing endpoints.
+
+A page is read with `WHERE (sort_key, id) < (last row's values)` on an
+index in the same order, so page 1000 costs the same as page 1 (no
+OFFSET). The cursor handed out as `next_cursor` is those values,
+base64-encoded JSON; clients only pass it back.
+
+Listings stay plain JSON arrays unless the request uses one of
+PAGE_PARAMS, then they answer {"items", "next_cursor", "limit"}.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+PAGE_PARAMS = ("cursor", "limit", "from", "to", "food", "type")
+MAX_PAGE_SIZE = 500
+
+
+def wants_page(args):
+    return any(args.get(p) for p in PAGE_PARAMS)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """
+    Cursor string -> list of `size` scalar values (str / int / float, the
+    sort key columns); raises ValueError.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    if any(isinstance(v, bool) or not isinstance(v, (str, int, float)) for v in values):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def page_args(args, default_limit, cursor_size=2):
+    """(limit, cursor values or None) from ?limit= and ?cursor=; raises ValueError."""
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        raise ValueError("limit must be a number")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be 1..{MAX_PAGE_SIZE}")
+
+    cursor = args.get("cursor")
+    return limit, decode_cursor(cursor, cursor_size) if cursor else None
+
+
+def date_args(args):
+    """Optional ?from= / ?to= (YYYY-MM-DD, inclusive) as strings; raises ValueError."""
+    out = []
+    for name in ("from", "to"):
+        value = (args.get(name) or "").strip()
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError(f"{name} must be YYYY-MM-DD")
+        out.append(value or None)
+    if out[0] and out[1] and out[0] > out[1]:
+        raise ValueError("from must not be after to")
+    return out[0], out[1]
+
+
+def keyset_page(conn, select, where, params, order, after, limit, key, group_by=None):
+    """
+    Runs one page of `select` ordered by `order` (DESC columns whose
+    values key(row) returns, matching the cursor). `after` is the decoded
+    cursor. Returns (rows, next_cursor or None).
+    """
+    where = list(where)
+    params = list(params)
+    if after is not None:
+        cols = ", ".join(c.split()[0] for c in order.split(","))
+        where.append(f"({cols}) < ({', '.join('?' * len(after))})")
+        params += after
+
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if group_by:
+        sql += f" GROUP BY {group_by}"
+    sql += f" ORDER BY {order} LIMIT ?"
+
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
+
+
+def envelope(items, next_cursor, limit):
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
@@ -0,0 +1,153 @@
+"""
+Opt-in per-request profiling.
+
+An admin request with `?profile=1` (or header `X-Profile: 1`) runs under
+cProfile and is stored as a .pstats file; `?profile=sample` uses a
+stack sampler instead and stores collapsed stacks (.collapsed, one
+"frame;frame;frame count" line per stack), ready for flamegraph.pl or
+speedscope. Files live in PROFILE_DIR; only the newest PROFILE_KEEP are
+kept.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(__file__), "profiles")
+)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+KINDS = {"1": "cprofile", "true": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+EXTENSIONS = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+_ID_RE = re.compile(r"^[\w.-]+$")
+
+
+def requested_kind(args, headers):
+    """cprofile / sample if the request asks to be profiled, else None."""
+    flag = (args.get("profile") or headers.get("X-Profile") or "").strip().lower()
+    return KINDS.get(flag)
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class RequestProfile:
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.perf_counter()
+        if kind == "sample":
+            self._profiler = StackSampler(threading.get_ident())
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self, method, path):
+        """Stops profiling, writes the file and returns its id."""
+        if self.kind == "sample":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        elapsed_ms = int((time.perf_counter() - self.started) * 1000)
+
+        slug = re.sub(r"[^\w]+", "_", path).strip("_") or "root"
+        profile_id = (
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{method.lower()}-{slug}"
+            f"-{elapsed_ms}ms-{uuid.uuid4().hex[:6]}{EXTENSIONS[self.kind]}"
+        )
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, profile_id)
+
+        if self.kind == "sample":
+            with open(path, "w") as f:
+                f.write(self._profiler.collapsed())
+        else:
+            self._profiler.dump_stats(path)
+
+        _prune()
+        return profile_id
+
+
+def _prune():
+    files = sorted(list_profiles(), key=lambda p: p["id"], reverse=True)
+    for p in files[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, p["id"]))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for name in os.listdir(PROFILE_DIR):
+        kind = next((k for k, ext in EXTENSIONS.items() if name.endswith(ext)), None)
+        if kind is None:
+            continue
+        st = os.stat(os.path.join(PROFILE_DIR, name))
+        out.append({
+            "id": name,
+            "kind": kind,
+            "bytes": st.st_size,
+            "created_at": datetime.fromtimestamp(st.st_mtime).isoformat(timespec="seconds"),
+        })
+    out.sort(key=lambda p: p["id"], reverse=True)
+    return out
+
+
+def profile_path(profile_id):
+    """Absolute path of a stored profile, or None (also for bad ids)."""
+    if not _ID_RE.match(profile_id or "") or profile_id.startswith("."):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id)
+    return path if os.path.isfile(path) else None
+
+
+def pstats_text(path, limit=60, sort="cumulative"):
+    buf = io.StringIO()
+    stats = pstats.Stats(path, stream=buf)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return buf.getvalue()
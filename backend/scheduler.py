@@ -0,0 +1,189 @@
+"""
+Background forecast scheduler.
+
+Precomputes tomorrow's forecast off the request path and stores it in a
+forecast_runs row (with the data version, training profile and engine it
+was built with), so /forecast can serve the snapshot instead of training.
+The forecasts are also archived in forecast_history as "scheduler" rows,
+next to (never over) rows users saved through /forecast/save.
+
+Runs either inside the Flask process (FORECAST_SCHEDULER=1) or as its
+own worker:
+
+    cd backend
+    python -m scheduler              # loop forever
+    python -m scheduler --once       # compute one snapshot and exit
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+
+from backtest import refresh_selection
+from database import db, init_db, data_version, bump_version
+from forecasters import selection_age_days
+from forecasting import compute_forecast, forecast_date, FORECAST_MODE, FORECAST_ENGINE, FORECAST_PROFILE
+
+
+SCHEDULE_AT = os.getenv("FORECAST_SCHEDULE_AT", "00:05")
+POLL_SECONDS = int(os.getenv("FORECAST_POLL_SECONDS", "60"))
+# FORECAST_ENGINE=auto: re-run the LightGBM vs statistical backtests
+# at the daily refresh once the stored selection is this many days old
+SELECT_EVERY_DAYS = float(os.getenv("FORECAST_SELECT_DAYS", "7"))
+
+
+def _version_str(version):
+    return json.dumps(list(version))
+
+
+# ======================================
+# ✅ Snapshot read / write
+# ======================================
+def save_snapshot(conn, fc, version, profile=FORECAST_PROFILE, engine=FORECAST_ENGINE):
+    """
+    Replaces the stored forecast for fc["date"] in one transaction.
+    Only the scheduler's own archive rows for the date are replaced;
+    items a user already saved keep their saved row.
+    """
+    forecast_date_str = fc["date"]
+
+    conn.execute("""
+        DELETE FROM forecast_history WHERE forecast_date=? AND source='scheduler'
+    """, (forecast_date_str,))
+    conn.executemany("""
+        INSERT INTO forecast_history
+        (forecast_date, food_name, avg_last7_qty, predicted_qty, confidence, suggestion, tag, history_points, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'scheduler')
+        ON CONFLICT(forecast_date, food_name) DO NOTHING
+    """, [
+        (
+            forecast_date_str,
+            f["food_name"],
+            float(f["avg_last7_qty"]),
+            float(f["predicted_qty"]),
+            int(f["confidence"]),
+            f["suggestion"],
+            f["tag"],
+            int(f["history_points"])
+        )
+        for f in fc["forecasts"]
+    ])
+    conn.execute("""
+        INSERT OR REPLACE INTO forecast_runs
+        (forecast_date, mode, data_version, items, profile, engine, forecasts, generated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    """, (
+        forecast_date_str, fc["mode"], _version_str(version), len(fc["forecasts"]),
+        profile, engine, json.dumps(fc["forecasts"])
+    ))
+    bump_version(conn, "forecast_history")
+    conn.commit()
+
+
+def load_snapshot(conn, forecast_date_str, mode, version, profile=FORECAST_PROFILE, engine=FORECAST_ENGINE):
+    """
+    Stored forecast for the date if it was built with the same mode,
+    training profile and engine from the same data version, else None.
+    """
+    run = conn.execute("""
+        SELECT mode, data_version, profile, engine, forecasts FROM forecast_runs WHERE forecast_date=?
+    """, (forecast_date_str,)).fetchone()
+
+    if (not run or run["forecasts"] is None
+            or (run["mode"], run["profile"], run["engine"]) != (mode, profile, engine)
+            or run["data_version"] != _version_str(version)):
+        return None
+
+    return {
+        "date": forecast_date_str,
+        "mode": mode,
+        "forecasts": json.loads(run["forecasts"])
+    }
+
+
+def run_once(mode=None, force=False):
+    """
+    Computes and stores tomorrow's forecast unless a snapshot for the
+    current data version already exists. Returns a small status dict.
+    A forced run also refreshes a stale forecaster selection first.
+    """
+    mode = mode or FORECAST_MODE
+    tomorrow = forecast_date()
+    with db() as conn:
+        if force and FORECAST_ENGINE == "auto" and mode == "per_item":
+            age = selection_age_days(conn)
+            if age is None or age >= SELECT_EVERY_DAYS:
+                picked = [s["method"] for s in refresh_selection(conn).values()]
+                print(f"✅ forecaster selection refreshed: {picked.count('lgbm')} of {len(picked)} items use LightGBM")
+
+        version = data_version(conn)
+        if not force and load_snapshot(conn, tomorrow.isoformat(), mode, version) is not None:
+            return {"date": tomorrow.isoformat(), "computed": False}
+
+        fc = compute_forecast(conn, tomorrow, mode, profile=FORECAST_PROFILE, engine=FORECAST_ENGINE)
+        save_snapshot(conn, fc, version, FORECAST_PROFILE, FORECAST_ENGINE)
+        return {"date": fc["date"], "computed": True, "items": len(fc["forecasts"])}
+
+
+# ======================================
+# ✅ Scheduler thread
+# ======================================
+class ForecastScheduler(threading.Thread):
+    """
+    Every poll interval: recompute if billing/events changed or there is
+    no snapshot for tomorrow yet. Once a day at run_at (HH:MM): force a
+    full refresh.
+    """
+
+    def __init__(self, run_at=SCHEDULE_AT, poll_seconds=POLL_SECONDS, mode=None):
+        super().__init__(name="forecast-scheduler", daemon=True)
+        self.run_at = datetime.strptime(run_at, "%H:%M").time()
+        self.poll_seconds = poll_seconds
+        self.mode = mode
+        self._stop_event = threading.Event()
+        self._last_daily = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def tick(self):
+        now = datetime.now()
+        force = now.time() >= self.run_at and self._last_daily != now.date()
+        try:
+            status = run_once(self.mode, force=force)
+        except Exception as e:
+            print("⚠️ forecast scheduler failed:", e)
+            return None
+
+        if force:
+            self._last_daily = now.date()
+        if status.get("computed"):
+            print(f"✅ forecast snapshot stored for {status['date']} ({status['items']} items)")
+        return status
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.tick()
+            self._stop_event.wait(self.poll_seconds)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Precompute tomorrow's forecast")
+    ap.add_argument("--once", action="store_true", help="compute one snapshot and exit")
+    ap.add_argument("--force", action="store_true", help="recompute even if up to date")
+    ap.add_argument("--at", default=SCHEDULE_AT, help="daily refresh time HH:MM")
+    ap.add_argument("--poll", type=int, default=POLL_SECONDS, help="seconds between data checks")
+    ap.add_argument("--mode", default=None, help="per_item or global")
+    args = ap.parse_args()
+
+    init_db()
+
+    if args.once:
+        print(run_once(args.mode, force=args.force))
+    else:
+        scheduler = ForecastScheduler(args.at, args.poll, args.mode)
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,37 @@
+import { useEffect, useRef } from "react";
+import api from "../api";
+
+/**
+ * ✅ useLiveStream
+ * Subscribes to the backend /stream (server-sent events) and calls
+ * handlers[topic](data) whenever the server pushes a new state.
+ *
+ * - only the topics in "handlers" are requested
+ * - EventSource reconnects by itself after network drops
+ * - no-op in browsers without EventSource
+ */
+export default function useLiveStream(handlers) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    if (typeof EventSource === "undefined") return;
+
+    const topics = Object.keys(handlersRef.current);
+    const es = new EventSource(
+      `${api.defaults.baseURL}/stream?topics=${topics.join(",")}`
+    );
+
+    topics.forEach((topic) => {
+      es.addEventListener(topic, (e) => {
+        try {
+          handlersRef.current[topic]?.(JSON.parse(e.data));
+        } catch {
+          // ignore malformed messages
+        }
+      });
+    });
+
+    return () => es.close();
+  }, []);
+}
@@ -2,6 +2,7 @@ import { useEffect, useMemo, useRef, useState } from "react";
 import api from "../api";
 import useCountUp from "../hooks/useCountUp";
 import useFlashOnChange from "../hooks/useFlashOnChange";
+import useLiveStream from "../hooks/useLiveStream";
 import "../styles/winnow.css";
 import AIFloatButton from "../components/AIFloatButton";
 
@@ -57,6 +58,18 @@ export default function Dashboard() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // ✅ server pushes new insights / waste cost when billing or events change
+  useLiveStream({
+    insights: (data) => {
+      setInsights(data);
+      setLastUpdated(formatNow());
+    },
+    waste: (data) => {
+      setWasteCost(data);
+      setLastUpdated(formatNow());
+    },
+  });
+
   const wasteRiskValue = useMemo(
     () => Number(wasteCost.estimated_waste_cost || 0),
     [wasteCost]